@@ -127,7 +127,7 @@ async def test_e2e_zip_upload_parse_match_save_chat_presence_download(settings):
     # ----- Download zip & verify persisted edit -----
     dl_url = reverse("community:project-download-zip", args=[proj.id])
     r = await ac.get(dl_url); assert r.status_code == 200
-    z = zipfile.ZipFile(io.BytesIO(r.content))
+    z = zipfile.ZipFile(io.BytesIO(b"".join([c async for c in r.streaming_content])))
     with z.open("index.html") as f:
         assert f.read().decode("utf-8") == new_html
 
@@ -210,7 +210,7 @@ async def test_e2e_github_import_parse_match_save_chat_presence_download(monkeyp
     # Download zip & verify edited content
     dl_url = reverse("community:project-download-zip", args=[proj.id])
     r = await ac.get(dl_url); assert r.status_code == 200
-    z = zipfile.ZipFile(io.BytesIO(r.content))
+    z = zipfile.ZipFile(io.BytesIO(b"".join([c async for c in r.streaming_content])))
     with z.open("index.html") as f:
         assert f.read().decode("utf-8") == new_html
 
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
     User, Notification, Thread, Message,
-    Conversation, PrivateMessage, Project, ProjectFile
+    Conversation, PrivateMessage, Project, ProjectFile, ProjectStats, Job, GithubSource, UploadSession
 )
 
 @admin.register(User)
@@ -47,5 +47,27 @@ class ProjectAdmin(admin.ModelAdmin):
 
 @admin.register(ProjectFile)
 class ProjectFileAdmin(admin.ModelAdmin):
-    list_display = ("id", "project", "path")
+    list_display = ("id", "project", "path", "language", "size", "line_count")
     search_fields = ("path", "project__name")
+    readonly_fields = ("size", "line_count", "language")
+
+@admin.register(ProjectStats)
+class ProjectStatsAdmin(admin.ModelAdmin):
+    list_display = ("project", "file_count", "total_bytes", "total_lines", "last_modified", "version")
+    search_fields = ("project__name",)
+
+@admin.register(GithubSource)
+class GithubSourceAdmin(admin.ModelAdmin):
+    list_display = ("project", "owner", "repo", "ref", "subdir", "commit_sha", "synced_at")
+    search_fields = ("project__name", "owner", "repo")
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "project", "kind", "status", "files_done", "files_total", "created_at", "finished_at")
+    list_filter = ("kind", "status")
+    search_fields = ("project__name",)
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ("id", "project", "filename", "offset", "size", "status", "updated_at")
+    list_filter = ("status",)
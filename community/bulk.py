@@ -0,0 +1,89 @@
+# community/bulk.py
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from django.conf import settings
+
+from .models import ProjectFile
+from .search import glob_prefix, path_matches
+
+FETCH_CHUNK = 200  # paths per query; content is only ever loaded for one chunk
+BULK_FIELDS = ("content", "hash", "size", "lines", "language")
+METADATA_FIELDS = ("hash", "size", "lines", "language")
+
+# response key -> ProjectFile column
+_COLUMNS = {"hash": "content_hash", "size": "size", "lines": "line_count", "language": "language"}
+
+
+def max_bulk_paths() -> int:
+    return int(getattr(settings, "FILES_BULK_MAX_PATHS", 20000))
+
+
+def chunked(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    chunk: List[str] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _glob_paths(project_id: int, globs: List[str], skip: set) -> Iterator[str]:
+    prefix = glob_prefix(globs)
+    qs = ProjectFile.objects.filter(project_id=project_id)
+    if prefix:
+        qs = qs.filter(path__startswith=prefix)
+    for path in qs.order_by("path").values_list("path", flat=True).iterator(chunk_size=FETCH_CHUNK * 5):
+        if path not in skip and path_matches(path, globs):
+            yield path
+
+
+def iter_bulk_files(project_id: int, paths: Sequence[str] = (), globs: Sequence[str] = (),
+                    fields: Sequence[str] = BULK_FIELDS, known: Dict[str, str] | None = None) -> Iterator[Dict[str, Any]]:
+    """
+    One dict per requested file: the explicit `paths` first (request order,
+    {"path", "found": False} for unknown ones), then files matching any of
+    `globs` in path order. Only the requested `fields` are included. With
+    `known` ({path: sha256} the client already holds) a file whose hash
+    still matches comes back as "unchanged" and its content is not read.
+    Rows are fetched FETCH_CHUNK paths at a time, so memory stays flat
+    however many files are asked for.
+    """
+    known = known or {}
+    want_content = "content" in fields
+    meta = [k for k in METADATA_FIELDS if k in fields]
+    explicit = list(dict.fromkeys(paths))
+
+    def rows(chunk: List[str], report_missing: bool) -> Iterator[Dict[str, Any]]:
+        found: Dict[str, Tuple] = {
+            row[0]: row[1:] for row in ProjectFile.objects.filter(project_id=project_id, path__in=chunk)
+            .values_list("path", *_COLUMNS.values())
+        }
+        fresh = [p for p in chunk if p in found and known.get(p) != found[p][0]]
+        contents: Dict[str, str] = {}
+        if want_content and fresh:
+            contents = dict(ProjectFile.objects.filter(project_id=project_id, path__in=fresh)
+                            .values_list("path", "content"))
+        for path in chunk:
+            row = found.get(path)
+            if row is None:
+                if report_missing:
+                    yield {"path": path, "found": False}
+                continue
+            values = dict(zip(_COLUMNS, row))
+            item: Dict[str, Any] = {"path": path, "found": True}
+            item.update((k, values[k]) for k in meta)
+            if path in known and known[path] == values["hash"]:
+                item["unchanged"] = True
+            elif want_content:
+                item["content"] = contents.get(path, "")
+            yield item
+
+    for chunk in chunked(explicit, FETCH_CHUNK):
+        yield from rows(chunk, report_missing=True)
+    if globs:
+        for chunk in chunked(_glob_paths(project_id, list(globs), set(explicit)), FETCH_CHUNK):
+            yield from rows(chunk, report_missing=False)
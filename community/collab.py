@@ -0,0 +1,333 @@
+# community/collab.py
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+from collections import deque
+from typing import Any, Dict, List, Tuple
+
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+
+from . import writebehind
+from .models import ProjectFile
+
+log = logging.getLogger(__name__)
+
+# An operation walks the whole document, counted in UTF-16 code units (JS
+# string .length; an emoji is 2):
+#   n > 0  retain n units
+#   n < 0  delete -n units
+#   "str"  insert the string
+# The same shape, units and transform as ot.js' TextOperation, so its client
+# works as is. An operation that would split a surrogate pair is refused.
+Op = List[Any]
+
+
+def units(s: str) -> int:
+    """Length in UTF-16 code units."""
+    return len(s) if s.isascii() else len(s.encode("utf-16-le")) // 2
+
+
+class OpError(ValueError):
+    """An operation that is malformed or does not fit the document."""
+
+
+def save_delay() -> float:
+    """Seconds an edited document may stay unsaved; all edits in that window become one write."""
+    return float(getattr(settings, "COLLAB_SAVE_DELAY", 2.0))
+
+
+def history_size() -> int:
+    """Operations kept for transforming late clients; older revisions must resync."""
+    return int(getattr(settings, "COLLAB_HISTORY", 500))
+
+
+class _Builder:
+    def __init__(self):
+        self.ops: Op = []
+
+    def retain(self, n: int) -> None:
+        if n <= 0:
+            return
+        if self.ops and isinstance(self.ops[-1], int) and self.ops[-1] > 0:
+            self.ops[-1] += n
+        else:
+            self.ops.append(n)
+
+    def insert(self, s: str) -> None:
+        if not s:
+            return
+        ops = self.ops
+        if ops and isinstance(ops[-1], str):
+            ops[-1] += s
+        elif ops and isinstance(ops[-1], int) and ops[-1] < 0:
+            # keep inserts before deletes so equal operations look the same
+            if len(ops) > 1 and isinstance(ops[-2], str):
+                ops[-2] += s
+            else:
+                ops.insert(len(ops) - 1, s)
+        else:
+            ops.append(s)
+
+    def delete(self, n: int) -> None:
+        if n <= 0:
+            return
+        if self.ops and isinstance(self.ops[-1], int) and self.ops[-1] < 0:
+            self.ops[-1] -= n
+        else:
+            self.ops.append(-n)
+
+
+def normalize(op: Any) -> Op:
+    """Validate an operation and merge its neighbouring components."""
+    if not isinstance(op, list):
+        raise OpError("'op' must be a list")
+    b = _Builder()
+    for c in op:
+        if isinstance(c, str):
+            if not c.isascii():
+                try:
+                    c.encode("utf-16-le")
+                except UnicodeEncodeError:
+                    raise OpError("inserts must not contain lone surrogates") from None
+            b.insert(c)
+        elif isinstance(c, int) and not isinstance(c, bool) and c > 0:
+            b.retain(c)
+        elif isinstance(c, int) and not isinstance(c, bool) and c < 0:
+            b.delete(-c)
+        else:
+            raise OpError("components are non-zero integers or strings")
+    return b.ops
+
+
+def base_length(op: Op) -> int:
+    return sum(abs(c) for c in op if isinstance(c, int))
+
+
+def apply(text: str, op: Op) -> str:
+    if base_length(op) != units(text):
+        raise OpError("operation does not span the document")
+    data = None if text.isascii() else text.encode("utf-16-le")
+
+    def piece(a: int, b: int) -> str:
+        if data is None:
+            return text[a:b]  # units are characters
+        try:
+            return data[2 * a:2 * b].decode("utf-16-le")
+        except UnicodeDecodeError:
+            raise OpError("operation splits a surrogate pair") from None
+
+    out: List[str] = []
+    pos = 0
+    for c in op:
+        if isinstance(c, str):
+            out.append(c)
+        elif c > 0:
+            out.append(piece(pos, pos + c))
+            pos += c
+        else:
+            piece(pos, pos - c)  # deleting half a character is as wrong as keeping one
+            pos -= c
+    return "".join(out)
+
+
+def transform(a: Op, b: Op) -> Tuple[Op, Op]:
+    """
+    (a', b') for two operations on the same document, so that applying
+    a then b' equals b then a'. Inserts at the same spot put a's first.
+    """
+    if base_length(a) != base_length(b):
+        raise OpError("operations are on different documents")
+    a1, b1 = _Builder(), _Builder()
+    ia, ib = iter(a), iter(b)
+    x, y = next(ia, None), next(ib, None)
+    while x is not None or y is not None:
+        if isinstance(x, str):
+            a1.insert(x)
+            b1.retain(units(x))
+            x = next(ia, None)
+            continue
+        if isinstance(y, str):
+            a1.retain(units(y))
+            b1.insert(y)
+            y = next(ib, None)
+            continue
+        n = min(abs(x), abs(y))
+        if x > 0 and y > 0:
+            a1.retain(n)
+            b1.retain(n)
+        elif x < 0 and y > 0:
+            a1.delete(n)
+        elif x > 0 and y < 0:
+            b1.delete(n)
+        # both delete: already gone on either side
+        x = x - n if x > 0 else x + n
+        y = y - n if y > 0 else y + n
+        if x == 0:
+            x = next(ia, None)
+        if y == 0:
+            y = next(ib, None)
+    return a1.ops, b1.ops
+
+
+class Document:
+    """
+    The live copy of one file while someone has it open for collaborative
+    editing. Operations are numbered by revision; one that was made against an
+    older revision is transformed over everything since before it is applied,
+    so editors never have to refetch or retry. The content reaches the
+    database at most once per save_delay() seconds, and when the last editor
+    leaves, but only over the row it was loaded from: if someone else saved
+    the file meanwhile, their content wins, the document is reloaded and the
+    editors get a fresh "doc.init".
+
+    Documents live in this process: every editor of a file must be routed to
+    the same worker.
+    """
+
+    def __init__(self, project_id: int, path: str, text: str, base: str):
+        self.project_id = project_id
+        self.path = path
+        self.text = text
+        self.base = base  # content_hash of the row as last loaded or saved
+        self.rev = 0
+        self.saved_rev = 0
+        self.history: deque = deque(maxlen=history_size())
+        self.editors = 0
+        self.lock = asyncio.Lock()  # one operation (and its broadcast) at a time
+        self.group = "fileedit_%d_%s" % (project_id, hashlib.sha1(path.encode("utf-8")).hexdigest()[:20])
+        self._flush_lock = asyncio.Lock()
+        self._timer: asyncio.TimerHandle | None = None
+        self._task: asyncio.Future | None = None  # the timer's flush, while it runs
+
+    def receive(self, rev: Any, op: Any) -> Op:
+        """Apply an operation made against `rev`; returns it as applied at the new self.rev."""
+        first = self.rev - len(self.history)
+        if not isinstance(rev, int) or isinstance(rev, bool) or not first <= rev <= self.rev:
+            raise OpError("unknown revision")
+        op = normalize(op)
+        for done in list(self.history)[rev - first:]:
+            op, _ = transform(op, done)
+        self.text = apply(self.text, op)
+        self.history.append(op)
+        self.rev += 1
+        self._schedule()
+        return op
+
+    def _schedule(self) -> None:
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(save_delay(), self._due)
+
+    def _due(self) -> None:
+        self._timer = None
+        self._task = asyncio.ensure_future(self.flush())
+        self._task.add_done_callback(self._flushed)
+
+    def _flushed(self, task: asyncio.Future) -> None:
+        if self._task is task:
+            self._task = None
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            log.error("collab: saving %s in project %s failed, retrying in %.1fs",
+                      self.path, self.project_id, save_delay(), exc_info=error)
+            self._schedule()
+        elif self.editors == 0:
+            _forget(self)  # a retried save after the last editor left
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            if self.saved_rev == self.rev:
+                return
+            text, rev = self.text, self.rev
+            saved = await _persist(self.project_id, self.path, text, self.base)
+            if saved is not None:
+                self.base, self.saved_rev = saved, rev
+                return
+            log.info("collab: %s in project %s changed underneath, reloading it", self.path, self.project_id)
+            await self._reload()
+
+    async def _reload(self) -> None:
+        loaded = await _load(self.project_id, self.path)
+        async with self.lock:
+            if loaded is not None:
+                self.text, self.base = loaded
+            # edits made before this cannot be transformed onto the new text: clients must resync
+            self.rev += 1
+            self.saved_rev = self.rev
+            self.history.clear()
+            if self.editors:
+                await get_channel_layer().group_send(self.group, {"type": "doc.reload"})
+
+    async def close(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        await self.flush()
+
+
+_documents: Dict[Tuple[int, str], Document] = {}
+
+
+@database_sync_to_async
+def _load(project_id: int, path: str) -> Tuple[str, str] | None:
+    """(content, content_hash) of the file, or None if there is no such file."""
+    writebehind.flush(project_id, path)
+    return ProjectFile.objects.filter(project_id=project_id, path=path).values_list("content", "content_hash").first()
+
+
+@database_sync_to_async
+def _persist(project_id: int, path: str, text: str, base: str) -> str | None:
+    """Save `text` if the row still has content_hash `base`; the new hash, or None if it moved (or is gone)."""
+    with transaction.atomic():
+        pf = ProjectFile.objects.select_for_update().defer("content").filter(
+            project_id=project_id, path=path).first()
+        if pf is None or pf.content_hash != base:
+            return None
+        pf.content = text
+        pf.save(update_fields=["content"])
+        return pf.content_hash
+
+
+async def open_document(project_id: int, path: str) -> Document | None:
+    """The shared Document for a file (loading it on first open), or None if there is no such file."""
+    key = (project_id, path)
+    if key not in _documents:
+        loaded = await _load(project_id, path)
+        if loaded is None:
+            return None
+        # another editor may have opened it while we were loading; theirs wins
+        _documents.setdefault(key, Document(project_id, path, *loaded))
+    doc = _documents[key]
+    doc.editors += 1
+    return doc
+
+
+def _forget(doc: Document) -> None:
+    # someone may have reopened it during the save; then it stays
+    if doc.editors == 0 and doc.saved_rev == doc.rev and _documents.get((doc.project_id, doc.path)) is doc:
+        del _documents[(doc.project_id, doc.path)]
+
+
+async def release_document(doc: Document) -> None:
+    """
+    An editor left; the last one out saves the document and drops it. If
+    that save fails the document stays, and the save is retried until it
+    succeeds (or an editor comes back).
+    """
+    doc.editors -= 1
+    if doc.editors > 0:
+        return
+    try:
+        await doc.close()
+    except Exception:
+        log.exception("collab: saving %s in project %s failed, retrying in %.1fs",
+                      doc.path, doc.project_id, save_delay())
+        doc._schedule()
+        return
+    _forget(doc)
@@ -9,6 +9,7 @@ import logging
 
 # NEW: use Mongo-backed presence
 from . import presence_repo
+from . import collab
 
 log = logging.getLogger(__name__)
 
@@ -187,6 +188,9 @@ class ProjectChatConsumer(AsyncJsonWebsocketConsumer):
             }
         )
 
+    async def job_progress(self, event):
+        await self.send_json({"type": "job.progress", "job": event["job"]})
+
     # --- DB helpers ---
     @database_sync_to_async
     def _user_can_join(self, user, project_id: int) -> bool:
@@ -208,3 +212,87 @@ class ProjectChatConsumer(AsyncJsonWebsocketConsumer):
             "content": msg.content,
             "timestamp": msg.timestamp.isoformat(),
         }
+
+
+class FileEditConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Collaborative editing of one file. On connect the client gets
+    {"type": "doc.init", "rev", "content"}; it then sends
+    {"type": "op", "rev": <revision it was made against>, "op": [...]}
+    (see collab.py for the operation format). The sender gets
+    {"type": "ack", "rev"}, everyone else {"type": "op", "rev", "op",
+    "user_id"} with the operation as it was applied. When the file was
+    saved outside the session the document is reloaded and every editor
+    gets a new "doc.init".
+    """
+
+    async def connect(self):
+        self.project_id = int(self.scope["url_route"]["kwargs"]["project_id"])
+        self.path = self.scope["url_route"]["kwargs"]["path"]
+        self.user = self.scope.get("user")
+        self.doc = None
+        self.synced_rev = 0
+
+        allowed = await self._user_can_join(self.user, self.project_id)
+        if not allowed:
+            await self.close(code=4001)
+            return
+        self.doc = await collab.open_document(self.project_id, self.path)
+        if self.doc is None:
+            await self.close(code=4004)
+            return
+
+        await self.channel_layer.group_add(self.doc.group, self.channel_name)
+        await self.accept()
+        await self._send_document()
+
+    async def disconnect(self, code):
+        if self.doc is None:
+            return
+        doc, self.doc = self.doc, None
+        try:
+            await self.channel_layer.group_discard(doc.group, self.channel_name)
+        finally:
+            await collab.release_document(doc)
+
+    async def receive_json(self, content, **kwargs):
+        if content.get("type") != "op" or self.doc is None:
+            return
+        doc = self.doc
+        async with doc.lock:
+            try:
+                op = doc.receive(content.get("rev"), content.get("op"))
+            except collab.OpError as e:
+                # the client is out of step; hand it the current document
+                await self.send_json({"type": "error", "error": str(e)})
+                await self._send_document()
+                return
+            # the ack rides the group too, so each editor sees revisions in order
+            await self.channel_layer.group_send(
+                doc.group,
+                {"type": "doc.op", "rev": doc.rev, "op": op,
+                 "user_id": getattr(self.user, "id", None), "origin": self.channel_name},
+            )
+
+    async def _send_document(self):
+        # revisions up to here are in the snapshot; their queued events are skipped
+        self.synced_rev = self.doc.rev
+        await self.send_json({"type": "doc.init", "rev": self.doc.rev, "content": self.doc.text})
+
+    async def doc_op(self, event):
+        if event["rev"] <= self.synced_rev:
+            return
+        if event["origin"] == self.channel_name:
+            await self.send_json({"type": "ack", "rev": event["rev"]})
+            return
+        await self.send_json({"type": "op", "rev": event["rev"], "op": event["op"], "user_id": event["user_id"]})
+
+    async def doc_reload(self, event):
+        await self._send_document()
+
+    @database_sync_to_async
+    def _user_can_join(self, user, project_id: int) -> bool:
+        if not user or isinstance(user, AnonymousUser) or not user.is_authenticated:
+            return False
+        project = Project.objects.filter(pk=project_id).first()
+        return project is not None and _user_in_project(user, project)
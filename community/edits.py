@@ -0,0 +1,87 @@
+# community/edits.py
+from __future__ import annotations
+
+import re
+from typing import Any, List, Tuple
+
+# LSP splits lines on \n, \r\n and \r only
+_LSP_BREAK_RE = re.compile(r"\r\n|\r|\n")
+ENCODINGS = ("utf-16", "utf-32")  # LSP positionEncoding: UTF-16 code units (default) or code points
+
+
+class EditError(ValueError):
+    """An edit list we cannot apply (malformed, overlapping, ...)."""
+
+
+def _line_starts(text: str) -> List[int]:
+    return [0] + [m.end() for m in _LSP_BREAK_RE.finditer(text)]
+
+
+def _column(line: str, character: int, encoding: str) -> int:
+    """Index into `line` of an LSP character offset; past the end clamps to the line end, as LSP says."""
+    if encoding == "utf-32" or line.isascii():
+        return min(character, len(line))
+    units = 0
+    for i, c in enumerate(line):
+        if units >= character:
+            return i
+        units += 2 if ord(c) > 0xFFFF else 1
+    return len(line)
+
+
+def _position(pos: Any) -> Tuple[int, int]:
+    if not isinstance(pos, dict):
+        raise EditError("positions must be {line, character} objects")
+    line, character = pos.get("line"), pos.get("character")
+    if not isinstance(line, int) or not isinstance(character, int) or line < 0 or character < 0:
+        raise EditError("line and character must be non-negative integers")
+    return line, character
+
+
+def _offset(text: str, starts: List[int], pos: Any, encoding: str) -> int:
+    line, character = _position(pos)
+    if line >= len(starts):
+        return len(text)
+    start = starts[line]
+    end = starts[line + 1] if line + 1 < len(starts) else len(text)
+    body = text[start:end].rstrip("\r\n")
+    return start + _column(body, character, encoding)
+
+
+def apply_text_edits(text: str, edits: Any, encoding: str = "utf-16") -> str:
+    """
+    Apply LSP TextEdits ([{"range": {"start": {line, character}, "end": ...},
+    "newText": str}, ...]). Like LSP, every range refers to the original
+    text, ranges may not overlap, and several inserts at one position keep
+    their order in the list.
+    """
+    if encoding not in ENCODINGS:
+        raise EditError(f"positionEncoding must be one of {list(ENCODINGS)}")
+    if not isinstance(edits, list):
+        raise EditError("'edits' must be a list")
+    starts = _line_starts(text)
+    spans: List[Tuple[int, int, str]] = []
+    for edit in edits:
+        if not isinstance(edit, dict) or not isinstance(edit.get("range"), dict):
+            raise EditError("each edit needs a 'range'")
+        new_text = edit.get("newText")
+        if not isinstance(new_text, str):
+            raise EditError("each edit needs a string 'newText'")
+        start = _offset(text, starts, edit["range"].get("start"), encoding)
+        end = _offset(text, starts, edit["range"].get("end"), encoding)
+        if end < start:
+            raise EditError("range end is before its start")
+        spans.append((start, end, new_text))
+
+    spans.sort(key=lambda s: (s[0], s[1]))  # stable: same-position inserts stay in list order
+    out: List[str] = []
+    pos = 0
+    for start, end, new_text in spans:
+        if start < pos:
+            raise EditError("edits overlap")
+        out.append(text[pos:start])
+        out.append(new_text)
+        pos = end
+    out.append(text[pos:])
+    return "".join(out)
+
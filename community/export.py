@@ -0,0 +1,218 @@
+# community/export.py
+from __future__ import annotations
+
+import os
+import struct
+import time
+import uuid
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Tuple
+
+from django.conf import settings
+
+from .models import ProjectFile, ProjectStats
+
+STORED, DEFLATED = 0, 8
+COMPRESSIONS = {"stored": STORED, "deflate": DEFLATED}
+DEFAULT_LEVEL = 6
+FETCH_CHUNK = 200
+
+ZIP_EPOCH = 315532800.0  # 1980-01-01, the earliest time a zip header can hold
+_UTF8_FLAG = 0x800
+_U32 = 0xFFFFFFFF
+_U16 = 0xFFFF
+
+
+def export_workers() -> int:
+    return int(getattr(settings, "EXPORT_WORKERS", min(4, os.cpu_count() or 1)))
+
+
+def _dos_datetime(ts: float) -> Tuple[int, int]:
+    t = time.localtime(ts)
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    dos_date = ((max(t.tm_year, 1980) - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    return dos_time, dos_date
+
+
+class ZipStreamWriter:
+    """
+    Minimal append-only zip writer for members compressed ahead of time
+    (zipfile can't take pre-deflated data). Sizes and CRC are known before
+    each local header, so no data descriptors are needed; ZIP64 records are
+    added only when offsets or the entry count outgrow the classic format.
+    """
+
+    def __init__(self, mtime: float | None = None):
+        self.offset = 0
+        self.entries: List[Tuple[bytes, int, int, int, int, int]] = []
+        self.dos_time, self.dos_date = _dos_datetime(mtime if mtime is not None else time.time())
+
+    def member(self, name: str, crc: int, size: int, method: int, data: bytes) -> bytes:
+        fname = name.encode("utf-8")
+        header = struct.pack(
+            "<IHHHHHIIIHH", 0x04034B50, 20, _UTF8_FLAG, method, self.dos_time, self.dos_date,
+            crc, len(data), size, len(fname), 0,
+        )
+        self.entries.append((fname, crc, size, len(data), method, self.offset))
+        self.offset += len(header) + len(fname) + len(data)
+        return header + fname + data
+
+    def finish(self) -> bytes:
+        cd_start = self.offset
+        parts = []
+        for fname, crc, size, csize, method, offset in self.entries:
+            extra = b""
+            if offset > _U32:
+                extra = struct.pack("<HHQ", 0x0001, 8, offset)
+            parts.append(struct.pack(
+                "<IHHHHHHIIIHHHHHII", 0x02014B50, (3 << 8) | (45 if extra else 20), 45 if extra else 20,
+                _UTF8_FLAG, method, self.dos_time, self.dos_date, crc, csize, size,
+                len(fname), len(extra), 0, 0, 0, 0o100644 << 16, _U32 if extra else offset,
+            ) + fname + extra)
+        central = b"".join(parts)
+        cd_size = len(central)
+        count = len(self.entries)
+
+        tail = b""
+        if count > _U16 or cd_start > _U32 or cd_size > _U32:
+            zip64_at = cd_start + cd_size
+            tail += struct.pack("<IQHHIIQQQQ", 0x06064B50, 44, 45, 45, 0, 0, count, count, cd_size, cd_start)
+            tail += struct.pack("<IIQI", 0x07064B50, 0, zip64_at, 1)
+        tail += struct.pack(
+            "<IHHHHIIH", 0x06054B50, 0, 0, min(count, _U16), min(count, _U16),
+            min(cd_size, _U32), min(cd_start, _U32), 0,
+        )
+        self.offset += cd_size + len(tail)
+        return central + tail
+
+
+def compress_member(name: str, text: str, method: int, level: int) -> Tuple[str, int, int, int, bytes]:
+    """(name, crc, size, method, payload). crc32 and deflate release the GIL on big buffers."""
+    data = text.encode("utf-8")
+    crc = zlib.crc32(data)
+    if method == STORED:
+        return name, crc, len(data), STORED, data
+    co = zlib.compressobj(level, zlib.DEFLATED, -15)  # raw deflate stream, as zip stores it
+    return name, crc, len(data), DEFLATED, co.compress(data) + co.flush()
+
+
+def iter_project_zip(project_id: int, compression: str = "deflate", level: int = DEFAULT_LEVEL,
+                     workers: int | None = None, mtime: float | None = None) -> Iterator[bytes]:
+    """
+    Yield a zip of the project's files piece by piece: rows come from a
+    server-side iterator and members are compressed on a thread pool with a
+    bounded window of 2 x workers in flight, so memory stays flat and the
+    first bytes go out before the whole archive is built. `mtime` stamps
+    every member (default: now); pass a fixed one for reproducible bytes.
+    """
+    method = COMPRESSIONS[compression]
+    workers = export_workers() if workers is None else workers
+    rows = (ProjectFile.objects.filter(project_id=project_id).order_by("path")
+            .values_list("path", "content").iterator(chunk_size=FETCH_CHUNK))
+    writer = ZipStreamWriter(mtime)
+
+    if workers <= 1:
+        for path, content in rows:
+            yield writer.member(*compress_member(path, content or "", method, level))
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="zip-export") as pool:
+            window: deque = deque()
+            for path, content in rows:
+                window.append(pool.submit(compress_member, path, content or "", method, level))
+                if len(window) >= workers * 2:
+                    yield writer.member(*window.popleft().result())
+            while window:
+                yield writer.member(*window.popleft().result())
+    yield writer.finish()
+
+
+# -------------------------
+# On-disk artifact cache
+# -------------------------
+
+def export_cache_dir(project_id: int) -> str:
+    root = getattr(settings, "EXPORT_CACHE_DIR", None) or os.path.join(settings.MEDIA_ROOT, "export-cache")
+    return os.path.join(str(root), str(project_id))
+
+
+def artifact_name(version: int, compression: str, level: int) -> str:
+    return f"v{version}-{compression}-{level}.zip"
+
+
+def export_etag(project_id: int, version: int, compression: str, level: int) -> str:
+    return f'"{project_id}-{version}-{compression}-{level}"'
+
+
+def _version_mtime(project_id: int) -> float:
+    """The member timestamp for the project's current content: when it was last written."""
+    modified = ProjectStats.objects.filter(project_id=project_id).values_list("last_modified", flat=True).first()
+    return modified.timestamp() if modified else ZIP_EPOCH
+
+
+def cached_artifact(project_id: int, version: int, compression: str, level: int) -> str | None:
+    path = os.path.join(export_cache_dir(project_id), artifact_name(version, compression, level))
+    return path if os.path.exists(path) else None
+
+
+def iter_project_zip_cached(project_id: int, version: int, compression: str = "deflate",
+                            level: int = DEFAULT_LEVEL) -> Iterator[bytes]:
+    """
+    iter_project_zip that also tees the archive into the cache. The file is
+    renamed into place only once complete, so an aborted download leaves
+    nothing behind; storing it drops the project's older versions.
+    `version` is ProjectStats.version read before the rows: every write
+    bumps it, which is what invalidates an artifact. Members are stamped
+    with the content's last write, so every build of a version has the
+    same bytes and a Range resume against its strong ETag stays valid
+    even if the cached file is rebuilt in between.
+    """
+    folder = export_cache_dir(project_id)
+    os.makedirs(folder, exist_ok=True)
+    name = artifact_name(version, compression, level)
+    tmp = os.path.join(folder, f".{uuid.uuid4().hex}.tmp")
+    done = False
+    try:
+        with open(tmp, "wb") as fh:
+            for chunk in iter_project_zip(project_id, compression=compression, level=level,
+                                          mtime=_version_mtime(project_id)):
+                fh.write(chunk)
+                yield chunk
+        os.replace(tmp, os.path.join(folder, name))
+        done = True
+        _drop_stale(folder, version)
+    finally:
+        if not done:
+            _remove(tmp)
+
+
+def build_artifact(project_id: int, version: int, compression: str = "deflate", level: int = DEFAULT_LEVEL) -> str:
+    for _ in iter_project_zip_cached(project_id, version, compression, level):
+        pass
+    return os.path.join(export_cache_dir(project_id), artifact_name(version, compression, level))
+
+
+def _drop_stale(folder: str, version: int) -> None:
+    keep = f"v{version}-"
+    for entry in os.listdir(folder):
+        if entry.endswith(".zip") and not entry.startswith(keep):
+            _remove(os.path.join(folder, entry))
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def purge_export_cache(project_id: int) -> None:
+    folder = export_cache_dir(project_id)
+    if os.path.isdir(folder):
+        for entry in os.listdir(folder):
+            _remove(os.path.join(folder, entry))
+        try:
+            os.rmdir(folder)
+        except OSError:
+            pass
@@ -1,33 +1,36 @@
 # community/formatters.py
 from __future__ import annotations
-from typing import Tuple
+import logging
+import multiprocessing
+import threading
+import time
+from typing import Dict, List, Tuple
 
-# Lazy imports so the app runs even if tools aren't installed
-try:
-    import black
-except Exception:  # pragma: no cover
-    black = None
+from django.conf import settings
+
+log = logging.getLogger(__name__)
 
 MAX_FORMAT_BYTES = 1_000_000  # 1 MB safety cap
 
+
+class FormatterBusy(Exception):
+    """Every formatter worker is busy and the wait queue is full; the caller should answer 503."""
+
+
 def _is(path: str, *exts: str) -> bool:
     p = (path or "").lower()
     return any(p.endswith(e) for e in exts)
 
-def format_for_path(path: str, content: str) -> Tuple[str, str | None]:
-    """
-    Returns (formatted_content, tool_name or None).
-    Never raises; returns original content on any error.
-    """
-    if not isinstance(content, str):
-        return content, None
-    if len(content.encode("utf-8", "ignore")) > MAX_FORMAT_BYTES:
-        # too large to format safely
-        return content, None
+def _has_formatter(path: str) -> bool:
+    return _is(path, ".py")
 
+def _format(path: str, content: str) -> Tuple[str, str | None]:
+    """The formatting itself; runs in a pool worker, so tools are imported there, not in the web process."""
     # Python -> Black (if available)
     if _is(path, ".py"):
-        if black is None:
+        try:
+            import black
+        except Exception:  # pragma: no cover
             return content, None
         try:
             mode = black.FileMode()  # defaults: PEP8 line length 88
@@ -39,3 +42,168 @@ def format_for_path(path: str, content: str) -> Tuple[str, str | None]:
     # TODO: add more languages later (Prettier for js/ts/html/css via a worker, clang-format for C, etc.)
 
     return content, None
+
+
+def _worker_main(conn) -> None:
+    try:
+        import black  # noqa: F401  (paid once here, before the first job)
+    except Exception:  # pragma: no cover
+        pass
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        conn.send(_format(*job))
+
+
+class _Worker:
+    def __init__(self, ctx):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child,), name="formatter", daemon=True)
+        self.process.start()
+        child.close()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join(1)
+        self.conn.close()
+
+
+class FormatterPool:
+    """
+    A few warm formatter processes. A job waits for an idle worker (at most
+    `queue_max` jobs may wait; beyond that run() raises FormatterBusy) and
+    gets `timeout` seconds; a worker that overruns is killed and replaced,
+    and the job returns its input unformatted. Counters for monitoring come
+    from stats().
+    """
+
+    def __init__(self, workers: int, timeout: float, queue_max: int):
+        self.size = workers
+        self.timeout = timeout
+        self.queue_max = queue_max
+        self._ctx = multiprocessing.get_context("spawn")  # no forked DB connections or threads
+        self._idle: List[_Worker] = []
+        self._started = 0
+        self._cond = threading.Condition()
+        self.queued = 0
+        self.busy = 0
+        self.completed = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.restarts = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "workers": self.size, "busy": self.busy, "queued": self.queued,
+                "completed": self.completed, "timeouts": self.timeouts,
+                "rejected": self.rejected, "restarts": self.restarts,
+            }
+
+    def _checkout(self) -> _Worker:
+        with self._cond:
+            if self._started < self.size:
+                # start the whole pool at once, so later jobs find warm workers
+                self._idle.extend(_Worker(self._ctx) for _ in range(self.size - self._started))
+                self._started = self.size
+            if not self._idle and self.queued >= self.queue_max:
+                self.rejected += 1
+                raise FormatterBusy()
+            self.queued += 1
+            try:
+                if not self._cond.wait_for(lambda: self._idle, self.timeout):
+                    self.rejected += 1
+                    raise FormatterBusy()
+            finally:
+                self.queued -= 1
+            self.busy += 1
+            return self._idle.pop()
+
+    def _checkin(self, worker: _Worker) -> None:
+        with self._cond:
+            self.busy -= 1
+            self._idle.append(worker)
+            self._cond.notify()
+
+    def run(self, path: str, content: str) -> Tuple[str, str | None]:
+        worker = self._checkout()
+        started = time.monotonic()
+        try:
+            try:
+                worker.conn.send((path, content))
+                if worker.conn.poll(self.timeout):
+                    result = worker.conn.recv()
+                    with self._cond:
+                        self.completed += 1
+                    return result
+                log.warning("formatting %s took over %.1fs; restarting its worker", path, self.timeout)
+                with self._cond:
+                    self.timeouts += 1
+            except (EOFError, OSError) as e:
+                log.warning("formatter worker died after %.1fs on %s: %s", time.monotonic() - started, path, e)
+            # timed out or died: swap in a fresh worker
+            worker.kill()
+            worker = _Worker(self._ctx)
+            with self._cond:
+                self.restarts += 1
+            return content, None
+        finally:
+            self._checkin(worker)
+
+    def close(self) -> None:
+        with self._cond:
+            workers, self._idle, self._started = self._idle, [], 0
+        for w in workers:
+            w.kill()
+
+
+_POOL: FormatterPool | None = None
+_POOL_LOCK = threading.Lock()
+
+
+def formatter_runner() -> str:
+    """"pool" (default): warm worker processes; "inline": format in the request thread."""
+    return getattr(settings, "FORMAT_RUNNER", "pool")
+
+
+def formatter_pool() -> FormatterPool:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = FormatterPool(
+                workers=int(getattr(settings, "FORMAT_WORKERS", 2)),
+                timeout=float(getattr(settings, "FORMAT_TIMEOUT", 5.0)),
+                queue_max=int(getattr(settings, "FORMAT_QUEUE_MAX", 8)),
+            )
+        return _POOL
+
+
+def reset_formatter_pool() -> None:
+    """Stop the workers; the next job starts a pool from the current settings."""
+    global _POOL
+    with _POOL_LOCK:
+        pool, _POOL = _POOL, None
+    if pool is not None:
+        pool.close()
+
+
+def format_for_path(path: str, content: str) -> Tuple[str, str | None]:
+    """
+    Returns (formatted_content, tool_name or None).
+    Never raises, except FormatterBusy when the pool is saturated; returns
+    original content on any other error, or if the formatter times out.
+    """
+    if not isinstance(content, str):
+        return content, None
+    if len(content.encode("utf-8", "ignore")) > MAX_FORMAT_BYTES:
+        # too large to format safely
+        return content, None
+    if not _has_formatter(path):
+        return content, None
+    if formatter_runner() == "inline":
+        return _format(path, content)
+    return formatter_pool().run(path, content)
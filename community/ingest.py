@@ -0,0 +1,624 @@
+# community/ingest.py
+from __future__ import annotations
+
+import codecs
+import contextlib
+import os
+import queue
+import re
+import shutil
+import tarfile
+import tempfile
+import threading
+import zipfile
+from typing import Any, Callable, ContextManager, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Project, ProjectFile, ProjectStats, content_hash
+from .signals import stats_rebuilt_by_caller
+
+# zstd for tar.zst: stdlib on Python 3.14+, otherwise the optional "zstandard" package
+try:
+    from compression import zstd as _stdlib_zstd
+except ImportError:  # pragma: no cover
+    _stdlib_zstd = None
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+MB = 1024 * 1024
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_BATCH_BYTES = 32 * MB
+SNIFF_BYTES = 8192        # read before deciding text vs binary
+READ_CHUNK = 64 * 1024
+RATIO_MIN_BYTES = 1 * MB  # tiny members compress absurdly well; only judge ratios above this
+
+_SHA_RE = re.compile(r"[0-9a-f]{40}")
+
+
+class ArchiveRejected(ValueError):
+    """The archive breaks an ingest limit (total size budget, compression ratio)."""
+
+
+class IngestLimits:
+    """
+    Budgets for one archive. Defaults come from settings:
+      INGEST_MAX_MEMBER_BYTES       larger members are skipped without being read
+      INGEST_MAX_TOTAL_BYTES        inflated bytes across the archive -> ArchiveRejected
+      INGEST_MAX_COMPRESSION_RATIO  uncompressed/compressed, per member and overall
+    """
+
+    def __init__(self, max_member_bytes=None, max_total_bytes=None, max_ratio=None):
+        self.max_member_bytes = int(max_member_bytes or getattr(settings, "INGEST_MAX_MEMBER_BYTES", 20 * MB))
+        self.max_total_bytes = int(max_total_bytes or getattr(settings, "INGEST_MAX_TOTAL_BYTES", 1024 * MB))
+        self.max_ratio = float(max_ratio or getattr(settings, "INGEST_MAX_COMPRESSION_RATIO", 100))
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def take(self, n: int) -> None:
+        with self._lock:  # shared by the readers of iter_zip_texts_parallel
+            self.used += n
+            used = self.used
+        if used > self.max_total_bytes:
+            raise ArchiveRejected(f"Archive expands beyond {self.max_total_bytes} bytes")
+
+    def check_ratio(self, name: str, size: int, compressed: int) -> None:
+        if size >= RATIO_MIN_BYTES and size > self.max_ratio * max(compressed, 1):
+            raise ArchiveRejected(f"Suspicious compression ratio for {name!r}")
+
+
+def ingest_batch_size() -> int:
+    return int(getattr(settings, "INGEST_BATCH_SIZE", DEFAULT_BATCH_SIZE))
+
+
+def ingest_batch_bytes() -> int:
+    return int(getattr(settings, "INGEST_BATCH_BYTES", DEFAULT_BATCH_BYTES))
+
+
+def _flush(project: Project, batch: dict[str, ProjectFile], created: set[str], was_empty: bool) -> None:
+    """Upsert one batch; the paths it creates (rather than updates) are added to `created`."""
+    if was_empty:
+        existing = created  # only what earlier batches wrote
+    else:
+        existing = set(ProjectFile.objects.filter(project=project, path__in=list(batch))
+                       .values_list("path", flat=True))
+    created.update([path for path in batch if path not in existing])
+    ProjectFile.objects.bulk_create(
+        list(batch.values()),
+        update_conflicts=True,
+        unique_fields=["project", "path"],
+        update_fields=["content", *ProjectFile.DERIVED_FIELDS],
+    )
+
+
+def write_files(project: Project, items: Iterable[Tuple[str, str]], batch_size: int | None = None,
+                progress=None, rebuild_stats: bool = True, created: set[str] | None = None) -> int:
+    """
+    Upsert (path, text) pairs with one INSERT ... ON CONFLICT per batch, all
+    inside a single transaction. A batch is flushed at `batch_size` rows or
+    settings.INGEST_BATCH_BYTES of content, whichever comes first, so memory
+    stays bounded whatever the archive size. bulk_create skips save(), so
+    derived columns are filled here and ProjectStats is rebuilt once at the end.
+    Returns the number of items written. `progress.advance(files, bytes)`
+    is called after every flushed batch (see community.jobs.JobProgress).
+    Paths that did not exist before are added to `created`, for a caller
+    that rebuilds the stats itself (rebuild_stats=False).
+    """
+    size = max(int(batch_size or ingest_batch_size()), 1)
+    max_bytes = ingest_batch_bytes()
+    created = set() if created is None else created
+    count = 0
+    batch: dict[str, ProjectFile] = {}
+    held = 0
+    with transaction.atomic():
+        # into an empty project (a first import) every path is new: no need to ask per batch
+        was_empty = not ProjectFile.objects.filter(project=project).exists()
+        for path, text in items:
+            pf = ProjectFile(project=project, path=path, content=text)
+            pf.refresh_derived_fields()
+            batch[path] = pf  # a repeated path in one batch: last one wins
+            held += pf.size
+            count += 1
+            if len(batch) >= size or held >= max_bytes:
+                _flush(project, batch, created, was_empty)
+                if progress is not None:
+                    progress.advance(len(batch), held)
+                batch = {}
+                held = 0
+        if batch:
+            _flush(project, batch, created, was_empty)
+            if progress is not None:
+                progress.advance(len(batch), held)
+        if count and rebuild_stats:
+            ProjectStats.rebuild(project.pk, added=created)
+    return count
+
+
+def delete_paths(project: Project, paths: Iterable[str], batch_size: int | None = None,
+                 rebuild_stats: bool = True, deleted_paths: set[str] | None = None) -> int:
+    """
+    Delete the given paths in batches; ProjectStats is rebuilt once. Returns
+    rows deleted; the paths actually removed are added to `deleted_paths`.
+    """
+    size = max(int(batch_size or ingest_batch_size()), 1)
+    paths = sorted(set(paths))
+    deleted_paths = set() if deleted_paths is None else deleted_paths
+    deleted = 0
+    # the per-row stats updates in post_delete are skipped; the single rebuild
+    # (ours, or the caller's with rebuild_stats=False) covers them
+    with transaction.atomic(), stats_rebuilt_by_caller():
+        for i in range(0, len(paths), size):
+            qs = ProjectFile.objects.filter(project=project, path__in=paths[i:i + size])
+            deleted_paths.update(qs.values_list("path", flat=True))
+            # the signal handlers never need the content; don't fetch it
+            _, per_model = qs.only("id", "project_id", "path").delete()
+            deleted += per_model.get(ProjectFile._meta.label, 0)
+        if deleted and rebuild_stats:
+            ProjectStats.rebuild(project.pk, removed=deleted_paths)
+    return deleted
+
+
+def diff_manifest(project: Project, manifest: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Compare a client's {path: sha256 of UTF-8 content} with what is stored:
+    "missing" (not on the server), "changed" (hash differs), "delete" (on
+    the server but not in the manifest), plus the count left unchanged.
+    """
+    known = dict(ProjectFile.objects.filter(project=project).values_list("path", "content_hash"))
+    missing, changed = [], []
+    for path, digest in manifest.items():
+        have = known.get(path)
+        if have is None:
+            missing.append(path)
+        elif have != digest:
+            changed.append(path)
+    return {
+        "missing": sorted(missing),
+        "changed": sorted(changed),
+        "delete": sorted(set(known) - set(manifest)),
+        "unchanged": len(manifest) - len(missing) - len(changed),
+    }
+
+
+def apply_sync(project: Project, items: Iterable[Tuple[str, str]], delete: Iterable[str] = (),
+               batch_size: int | None = None) -> Dict[str, int]:
+    """Second phase of a manifest sync: upsert `items` and drop `delete` in one transaction."""
+    created: set[str] = set()
+    removed: set[str] = set()
+    with transaction.atomic():
+        written = write_files(project, items, batch_size=batch_size, rebuild_stats=False, created=created)
+        deleted = delete_paths(project, delete, batch_size=batch_size, rebuild_stats=False, deleted_paths=removed)
+        if written or deleted:
+            ProjectStats.rebuild(project.pk, added=created, removed=removed)
+    return {"written": written, "deleted": deleted}
+
+
+def sync_files(project: Project, items: Iterable[Tuple[str, str]], delete_missing: bool = False,
+               batch_size: int | None = None, progress=None) -> Dict[str, int]:
+    """
+    Like write_files, but rows whose stored content_hash already matches are
+    not rewritten, and with `delete_missing` paths absent from `items` are
+    removed. Returns {"files", "written", "unchanged", "deleted"}.
+    """
+    size = max(int(batch_size or ingest_batch_size()), 1)
+    known = dict(ProjectFile.objects.filter(project=project).values_list("path", "content_hash"))
+    seen: set[str] = set()
+    counts = {"files": 0, "written": 0, "unchanged": 0, "deleted": 0}
+    pending = 0  # unchanged files not yet reported to `progress`
+
+    def changed() -> Iterator[Tuple[str, str]]:
+        nonlocal pending
+        for path, text in items:
+            seen.add(path)
+            counts["files"] += 1
+            if known.get(path) == content_hash(text):
+                counts["unchanged"] += 1
+                pending += 1
+                if progress is not None and pending >= size:
+                    progress.advance(pending, 0)
+                    pending = 0
+                continue
+            yield path, text
+
+    created: set[str] = set()
+    removed: set[str] = set()
+    with transaction.atomic():
+        counts["written"] = write_files(project, changed(), batch_size=size, progress=progress,
+                                        rebuild_stats=False, created=created)
+        if progress is not None and pending:
+            progress.advance(pending, 0)
+        if delete_missing:
+            counts["deleted"] = delete_paths(project, set(known) - seen, batch_size=size, rebuild_stats=False,
+                                             deleted_paths=removed)
+        if counts["written"] or counts["deleted"]:
+            ProjectStats.rebuild(project.pk, added=created, removed=removed)
+    return counts
+
+
+def read_text(fh, limits: IngestLimits) -> str | None:
+    """
+    Stream-decode one member as UTF-8 in READ_CHUNK pieces. Returns None for
+    binary content, sniffed from the first SNIFF_BYTES before reading further.
+    """
+    head = fh.read(SNIFF_BYTES)
+    limits.take(len(head))
+    if b"\x00" in head:
+        return None
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        parts = [decoder.decode(head)]
+        while True:
+            chunk = fh.read(READ_CHUNK)
+            if not chunk:
+                break
+            limits.take(len(chunk))
+            parts.append(decoder.decode(chunk))
+        parts.append(decoder.decode(b"", final=True))
+    except UnicodeDecodeError:
+        return None
+    return "".join(parts)
+
+
+def _plan_members(zf: zipfile.ZipFile, limits: IngestLimits, rename, progress) -> List[Tuple[zipfile.ZipInfo, str]]:
+    infos = [i for i in zf.infolist() if not i.is_dir()]
+    if rename is not None:
+        named = [(i, name) for i in infos if (name := rename(i.filename))]
+    else:
+        named = [(i, i.filename) for i in infos]
+    # a repeated name is written last-one-wins anyway: only read the last copy
+    # (keeps the outcome independent of the order parallel readers finish in)
+    last = {name: n for n, (_, name) in enumerate(named)}
+    planned = [entry for n, entry in enumerate(named) if last[entry[1]] == n]
+    declared = sum(i.file_size for i, _ in planned)
+    limits.check_ratio("<archive>", declared, sum(i.compress_size for i, _ in planned))
+    if progress is not None:
+        progress.start(len(planned), declared)
+    return planned
+
+
+def _read_member(zf: zipfile.ZipFile, info: zipfile.ZipInfo, limits: IngestLimits) -> str | None:
+    if info.flag_bits & 0x1:  # encrypted
+        return None
+    if info.file_size > limits.max_member_bytes:
+        return None
+    limits.check_ratio(info.filename, info.file_size, info.compress_size)
+    # zipfile never inflates past the declared file_size (and checks the
+    # CRC at EOF), so the header sizes above are hard upper bounds
+    with zf.open(info) as fh:
+        return read_text(fh, limits)
+
+
+def iter_zip_texts(zf: zipfile.ZipFile, limits: IngestLimits | None = None,
+                   rename: Callable[[str], Optional[str]] | None = None,
+                   progress=None) -> Iterator[Tuple[str, str]]:
+    """
+    (path, text) for every UTF-8 member; folders, binary, encrypted and
+    oversized members are skipped. Members are streamed through zf.open(),
+    never read whole. Raises ArchiveRejected on zip-bomb shaped input.
+
+    `rename` maps a member name to the stored path, or None to leave the
+    member out; it is applied before any budget is charged. `progress.start`
+    gets the member count and declared uncompressed size up front.
+    """
+    limits = limits or IngestLimits()
+    for info, name in _plan_members(zf, limits, rename, progress):
+        text = _read_member(zf, info, limits)
+        if text is not None:
+            yield name, text
+
+
+def ingest_workers() -> int:
+    return int(getattr(settings, "INGEST_WORKERS", 1))
+
+
+def ingest_queue_bytes() -> int:
+    """Decoded text (in characters) the reader threads may hold ready for the DB writer."""
+    return int(getattr(settings, "INGEST_QUEUE_BYTES", 32 * 1024 * 1024))
+
+
+@contextlib.contextmanager
+def zip_opener(source) -> Iterator[Callable[[], ContextManager[zipfile.ZipFile]]]:
+    """
+    How each worker gets its own handle on the archive: paths (and uploads
+    Django already spooled to disk) are reopened per worker, so reads never
+    contend on one file position; anything else shares one ZipFile, whose
+    reads are serialized by zipfile while inflate/decode still overlap. The
+    shared ZipFile is closed when the block exits.
+    """
+    if hasattr(source, "temporary_file_path"):
+        source = source.temporary_file_path()
+    if isinstance(source, (str, os.PathLike)):
+        yield lambda: zipfile.ZipFile(source)
+        return
+    with zipfile.ZipFile(source) as shared:
+        yield lambda: contextlib.nullcontext(shared)
+
+
+_DONE = object()
+
+
+class _ByteBudget:
+    """How much decoded text is waiting in the queue; a reader blocks while adding its file would overrun it."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, n: int, stop: threading.Event) -> bool:
+        with self._cond:
+            # one file always fits, however large, or a big member would wait forever
+            while self.used and self.used + n > self.limit:
+                if stop.is_set():
+                    return False
+                self._cond.wait(0.1)
+            if stop.is_set():
+                return False
+            self.used += n
+            return True
+
+    def release(self, n: int) -> None:
+        with self._cond:
+            self.used -= n
+            self._cond.notify_all()
+
+
+def iter_zip_texts_parallel(open_zip: Callable[[], ContextManager[zipfile.ZipFile]], workers: int,
+                            limits: IngestLimits | None = None,
+                            rename: Callable[[str], Optional[str]] | None = None,
+                            progress=None) -> Iterator[Tuple[str, str]]:
+    """
+    iter_zip_texts spread over `workers` threads: each opens the archive via
+    `open_zip` and inflates + decodes a disjoint, contiguous range of members
+    (zlib releases the GIL while inflating). Results reach the caller, the
+    single DB writer, through a queue holding at most ingest_queue_bytes()
+    of decoded text (plus one file, if a single one is larger), so memory
+    stays flat however far the readers run ahead. Order across
+    ranges is not preserved. Limits are shared; the first error (e.g.
+    ArchiveRejected) stops every worker and is re-raised here.
+    """
+    limits = limits or IngestLimits()
+    with open_zip() as zf:
+        planned = _plan_members(zf, limits, rename, progress)
+    workers = max(1, min(workers, len(planned)))
+    step = -(-len(planned) // workers) if planned else 0
+    ranges = [planned[i:i + step] for i in range(0, len(planned), step)] if step else []
+
+    # texts are charged to the budget; the queue itself only ever holds a few items beyond them
+    results: queue.Queue = queue.Queue()
+    budget = _ByteBudget(ingest_queue_bytes())
+    stop = threading.Event()
+
+    def work(members) -> None:
+        try:
+            with open_zip() as wzf:
+                for info, name in members:
+                    if stop.is_set():
+                        return
+                    text = _read_member(wzf, info, limits)
+                    if text is None:
+                        continue
+                    if not budget.acquire(len(text), stop):
+                        return
+                    results.put((name, text))
+        except BaseException as e:  # handed to the consumer
+            results.put(e)
+            return
+        results.put(_DONE)
+
+    threads = [threading.Thread(target=work, args=(r,), name=f"zip-ingest-{n}", daemon=True)
+               for n, r in enumerate(ranges)]
+    for t in threads:
+        t.start()
+    try:
+        running = len(threads)
+        while running:
+            item = results.get()
+            if item is _DONE:
+                running -= 1
+            elif isinstance(item, BaseException):
+                raise item
+            else:
+                budget.release(len(item[1]))
+                yield item
+    finally:
+        stop.set()  # consumer done, failed or abandoned: release blocked workers
+        for t in threads:
+            t.join()
+
+
+# -------------------------
+# Tar streams (tar, tar.gz/bz2/xz, tar.zst)
+# -------------------------
+
+ZIP_MAGICS = (b"PK\x03\x04", b"PK\x05\x06")
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+_TAR_SNIFF = 512  # one tar header block: "ustar" sits at offset 257
+
+
+class _ReplayReader:
+    """
+    Read-only stream over `fh` that first replays bytes already consumed
+    while sniffing. Counts bytes handed out (the compressed size, for the
+    archive-wide ratio check).
+    """
+
+    def __init__(self, head: bytes, fh):
+        self._head = head
+        self._fh = fh
+        self.count = 0
+
+    def read(self, n: int = -1) -> bytes:
+        if self._head:
+            if n is None or n < 0:
+                data, self._head = self._head + self._fh.read(), b""
+            else:
+                data, self._head = self._head[:n], self._head[n:]
+        else:
+            data = self._fh.read() if n is None or n < 0 else self._fh.read(n)
+        self.count += len(data)
+        return data
+
+
+def sniff_archive(fh) -> Tuple[str, _ReplayReader]:
+    """("zip" | "tar" | "tar.zst", stream replaying the sniffed bytes). gz/bz2/xz count as "tar"."""
+    head = b""
+    while len(head) < _TAR_SNIFF:
+        chunk = fh.read(_TAR_SNIFF - len(head))
+        if not chunk:
+            break
+        head += chunk
+    if head.startswith(ZIP_MAGICS):
+        kind = "zip"
+    elif head.startswith(ZSTD_MAGIC):
+        kind = "tar.zst"
+    else:
+        kind = "tar"  # tarfile's "r|*" tells plain/gz/bz2/xz apart (and rejects junk)
+    return kind, _ReplayReader(head, fh)
+
+
+def _zstd_reader(raw):
+    if _stdlib_zstd is not None:
+        return _stdlib_zstd.ZstdFile(raw)
+    if zstandard is not None:
+        return zstandard.ZstdDecompressor().stream_reader(raw)
+    raise ArchiveRejected("tar.zst archives need the 'zstandard' package")
+
+
+def _tar_name(name: str) -> str:
+    while name.startswith("./"):
+        name = name[2:]
+    return name.lstrip("/")
+
+
+def iter_tar_texts(stream, compression: str = "", limits: IngestLimits | None = None,
+                   rename: Callable[[str], Optional[str]] | None = None) -> Iterator[Tuple[str, str]]:
+    """
+    (path, text) for every UTF-8 regular file of a tar stream, read front to
+    back with tarfile's stream mode: no seeking, nothing buffered beyond the
+    member being decoded, so rows are written while the upload is still
+    arriving. `compression` is "" (auto: plain/gz/bz2/xz) or "zst".
+
+    A stream has to be inflated in full, skipped members included, so every
+    member's size counts against the total budget; the compression ratio is
+    checked against the bytes consumed so far.
+    """
+    limits = limits or IngestLimits()
+    raw = stream if isinstance(stream, _ReplayReader) else _ReplayReader(b"", stream)
+    src, mode = (_zstd_reader(raw), "r|") if compression == "zst" else (raw, "r|*")
+    with tarfile.open(fileobj=src, mode=mode) as tf:
+        for member in tf:
+            if not member.isfile():  # dirs, links, devices
+                continue
+            name = _tar_name(member.name)
+            if rename is not None:
+                name = rename(name)
+            if not name:
+                continue
+            text = None
+            before = limits.used
+            if member.size <= limits.max_member_bytes:
+                text = read_text(tf.extractfile(member), limits)
+            limits.take(max(member.size - (limits.used - before), 0))  # what tarfile will skip over
+            limits.check_ratio("<archive>", limits.used, raw.count)
+            if text is not None:
+                yield name, text
+
+
+def ingest_archive(project: Project, source, batch_size: int | None = None, progress=None) -> int:
+    """
+    Ingest a zip or tar(.gz/.bz2/.xz/.zst) from a path or a readable stream.
+    Tar streams are consumed as they are read; zip needs random access, so
+    a non-seekable zip stream is spooled to a temporary file first.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as fh:
+            kind, _ = sniff_archive(fh)
+        if kind == "zip":
+            return project.ingest_zip(source, batch_size=batch_size, progress=progress)
+        with open(source, "rb") as fh:
+            return ingest_archive(project, fh, batch_size=batch_size, progress=progress)
+
+    kind, stream = sniff_archive(source)
+    if kind != "zip":
+        texts = iter_tar_texts(stream, compression="zst" if kind == "tar.zst" else "")
+        return write_files(project, texts, batch_size=batch_size, progress=progress)
+    if _seekable(source):
+        source.seek(0)
+        return project.ingest_zip(source, batch_size=batch_size, progress=progress)
+    with tempfile.SpooledTemporaryFile(max_size=8 * MB) as spool:
+        shutil.copyfileobj(stream, spool, READ_CHUNK)
+        spool.seek(0)
+        return project.ingest_zip(spool, batch_size=batch_size, progress=progress)
+
+
+def iter_archive_texts(source, limits: IngestLimits | None = None) -> Iterator[Tuple[str, str]]:
+    """
+    (path, text) for every UTF-8 file of a zip or tar stream, under the same
+    limits as ingest_archive but without a project (nothing touches the DB).
+    A non-seekable zip is spooled to a temporary file first.
+    """
+    kind, stream = sniff_archive(source)
+    if kind != "zip":
+        yield from iter_tar_texts(stream, compression="zst" if kind == "tar.zst" else "", limits=limits)
+        return
+    with contextlib.ExitStack() as stack:
+        if _seekable(source):
+            source.seek(0)
+            fh = source
+        else:
+            fh = stack.enter_context(tempfile.SpooledTemporaryFile(max_size=8 * MB))
+            shutil.copyfileobj(stream, fh, READ_CHUNK)
+            fh.seek(0)
+        zf = stack.enter_context(zipfile.ZipFile(fh))
+        yield from iter_zip_texts(zf, limits=limits)
+
+
+def _seekable(fh) -> bool:
+    try:
+        return bool(fh.seekable())
+    except (AttributeError, ValueError):
+        return False
+
+
+def zipball_renamer(zf: zipfile.ZipFile, subdir: str = "") -> Callable[[str], Optional[str]]:
+    """
+    GitHub zipballs nest everything under <repo>-<sha>/. Strip that top
+    folder (detected from the first entry) and, with `subdir`, keep only
+    members below it, relative to the subdir.
+    """
+    names = zf.namelist()
+    top = names[0].split("/")[0] if names else ""
+    prefix = "/".join(p for p in (top, subdir.strip("/")) if p) + "/"
+
+    def rename(name: str) -> Optional[str]:
+        if not name.startswith(prefix):
+            return None
+        return name[len(prefix):] or None
+
+    return rename
+
+
+def zipball_commit(zf: zipfile.ZipFile) -> str:
+    """GitHub (git archive) stores the commit SHA as the zip comment."""
+    comment = zf.comment.decode("ascii", "replace").strip()
+    return comment if _SHA_RE.fullmatch(comment) else ""
+
+
+def ingest_zipball(project: Project, fileobj, subdir: str = "", delete_missing: bool = False,
+                   batch_size: int | None = None, progress=None) -> Dict[str, Any]:
+    """
+    Ingest a GitHub zipball (a seekable file: spooled download, temp file)
+    straight from the original archive; member names are rewritten on the
+    fly by zipball_renamer, so nothing is repacked. Unchanged files are
+    skipped (see sync_files). Returns the sync_files counts plus "commit".
+    """
+    with zipfile.ZipFile(fileobj) as zf:
+        texts = iter_zip_texts(zf, rename=zipball_renamer(zf, subdir), progress=progress)
+        result: Dict[str, Any] = sync_files(project, texts, delete_missing=delete_missing,
+                                            batch_size=batch_size, progress=progress)
+        result["commit"] = zipball_commit(zf)
+    return result
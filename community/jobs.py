@@ -0,0 +1,297 @@
+# community/jobs.py
+from __future__ import annotations
+
+import glob
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .models import Job
+
+log = logging.getLogger(__name__)
+
+# fn(job, progress, *args) -> result dict stored on the job
+JobFn = Callable[..., Dict[str, Any]]
+
+
+class JobFailed(Exception):
+    """An expected failure: `detail` is shown to the client as-is (with `status` for sync callers)."""
+
+    def __init__(self, detail: str, status: int = 400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status = status
+
+
+def job_runner() -> str:
+    """"thread" (default): in-process pool; "inline": run inside submit (tests, management commands)."""
+    return getattr(settings, "JOB_RUNNER", "thread")
+
+
+def job_workers() -> int:
+    return int(getattr(settings, "JOB_WORKERS", 2))
+
+
+def spool_dir(create: bool = True) -> str:
+    path = getattr(settings, "JOB_SPOOL_DIR", None) or os.path.join(tempfile.gettempdir(), "flowchart-jobs")
+    if create:
+        os.makedirs(path, exist_ok=True)
+    return path
+
+
+def spool_max_age() -> int:
+    """Spooled uploads older than this belong to no live job and are swept by recover_orphaned_jobs()."""
+    return int(getattr(settings, "JOB_SPOOL_MAX_AGE_SECONDS", 24 * 3600))
+
+
+def spool_upload(uploaded_file) -> str:
+    """Copy an upload (or a raw request body) to JOB_SPOOL_DIR so it outlives the request; the job removes it."""
+    path = os.path.join(spool_dir(), f"{uuid.uuid4().hex}.upload")
+    if hasattr(uploaded_file, "chunks"):
+        chunks = uploaded_file.chunks()
+    else:
+        chunks = iter(lambda: uploaded_file.read(64 * 1024), b"")
+    with open(path, "wb") as out:
+        for chunk in chunks:
+            out.write(chunk)
+    return path
+
+
+# -------------------------
+# Progress
+# -------------------------
+
+def notify(job: Job) -> None:
+    """Push the job state to the project's chat group (best effort)."""
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    try:
+        async_to_sync(layer.group_send)(
+            f"projectchat_{job.project_id}", {"type": "job.progress", "job": job.as_dict()}
+        )
+    except Exception as e:
+        log.warning("job progress push failed: %s", e)
+
+
+class JobProgress:
+    """
+    Receives start/advance calls from the ingest pipeline (community.ingest)
+    and persists them on the job row, then notifies listeners.
+    """
+
+    def __init__(self, job: Job):
+        self.job = job
+
+    def start(self, files_total: int, bytes_total: int) -> None:
+        self._save(files_total=files_total, bytes_total=bytes_total)
+
+    def advance(self, files: int, nbytes: int) -> None:
+        self._save(files_done=self.job.files_done + files, bytes_done=self.job.bytes_done + nbytes)
+
+    def _save(self, **fields) -> None:
+        for k, v in fields.items():
+            setattr(self.job, k, v)
+        _write_progress(self.job.pk, fields)
+        notify(self.job)
+
+
+_PROGRESS_WRITER: ThreadPoolExecutor | None = None
+_PROGRESS_LOCK = threading.Lock()
+
+
+def _progress_writer() -> ThreadPoolExecutor:
+    global _PROGRESS_WRITER
+    with _PROGRESS_LOCK:
+        if _PROGRESS_WRITER is None:
+            _PROGRESS_WRITER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-progress")
+        return _PROGRESS_WRITER
+
+
+def _update_job(job_id: int, fields: dict) -> None:
+    Job.objects.filter(pk=job_id).update(**fields)
+
+
+def _write_progress(job_id: int, fields: dict) -> None:
+    """
+    Progress arrives from inside the ingest transaction; written on the same
+    connection it would only show (and survive) once the whole ingest commits.
+    So it is written from a thread of its own, which has its own connection
+    in autocommit. SQLite allows one writer at a time and the ingest holds
+    it, so there it is written in line and shows at commit.
+    """
+    if not connection.in_atomic_block or connection.vendor == "sqlite":
+        _update_job(job_id, fields)
+        return
+    _progress_writer().submit(_update_job, job_id, fields).result()
+
+
+# -------------------------
+# Recovery
+# -------------------------
+
+_WORKER: tuple[int, str] | None = None
+_RECOVERED_PID: int | None = None
+_RECOVER_LOCK = threading.Lock()
+
+
+def worker_id() -> str:
+    """"host:pid:token" naming this process on the jobs it runs (recomputed after a fork)."""
+    global _WORKER
+    pid = os.getpid()
+    if _WORKER is None or _WORKER[0] != pid:
+        _WORKER = (pid, f"{socket.gethostname()}:{pid}:{uuid.uuid4().hex[:8]}")
+    return _WORKER[1]
+
+
+def _worker_gone(worker: str) -> bool:
+    """
+    Whether the process that took a job is certainly gone. Only processes on
+    this host can be checked; a job from another host is left to that host.
+    """
+    host, _, rest = worker.partition(":")
+    pid, _, _ = rest.partition(":")
+    if not worker or not pid.isdigit():
+        return True  # recorded before jobs named their worker
+    if host != socket.gethostname():
+        return False
+    if int(pid) == os.getpid():
+        return worker != worker_id()  # an earlier process that had our pid
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False  # alive, someone else's
+    return False
+
+
+def recover_orphaned_jobs() -> int:
+    """
+    Jobs run on an in-process pool, so a restart or crash leaves the ones it
+    had queued or running unfinished forever. Mark those whose process is
+    gone as failed, and remove spooled uploads older than spool_max_age()
+    (only their job would have). Returns the number of jobs failed.
+    """
+    failed = 0
+    stuck = Job.objects.filter(status__in=(Job.QUEUED, Job.RUNNING)).only("pk", "project_id", "worker")
+    for job in stuck:
+        if not _worker_gone(job.worker):
+            continue
+        fields = {"status": Job.FAILED, "error": "Interrupted: the server restarted before the job finished",
+                  "finished_at": timezone.now()}
+        if Job.objects.filter(pk=job.pk, status__in=(Job.QUEUED, Job.RUNNING), worker=job.worker).update(**fields):
+            failed += 1
+            job.refresh_from_db()
+            notify(job)
+    cutoff = time.time() - spool_max_age()
+    for path in glob.glob(os.path.join(spool_dir(create=False), "*.upload")):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                remove_spooled(path)
+        except FileNotFoundError:
+            pass
+    if failed:
+        log.warning("marked %d job(s) left behind by a previous process as failed", failed)
+    return failed
+
+
+def ensure_recovered() -> None:
+    """recover_orphaned_jobs() once per process, on the first use of jobs."""
+    global _RECOVERED_PID
+    with _RECOVER_LOCK:
+        if _RECOVERED_PID == os.getpid():
+            return
+        _RECOVERED_PID = os.getpid()
+    try:
+        recover_orphaned_jobs()
+    except Exception:
+        log.exception("job recovery failed")
+
+
+# -------------------------
+# Execution
+# -------------------------
+
+_EXECUTOR: ThreadPoolExecutor | None = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=job_workers(), thread_name_prefix="job")
+        return _EXECUTOR
+
+
+def _finish(job: Job, **fields) -> None:
+    fields["finished_at"] = timezone.now()
+    for k, v in fields.items():
+        setattr(job, k, v)
+    Job.objects.filter(pk=job.pk).update(**fields)
+    notify(job)
+
+
+def run_job(job_id: int, fn: JobFn, *args) -> None:
+    job = Job.objects.get(pk=job_id)
+    job.status, job.started_at = Job.RUNNING, timezone.now()
+    Job.objects.filter(pk=job.pk).update(status=job.status, started_at=job.started_at)
+    notify(job)
+    try:
+        result = fn(job, JobProgress(job), *args)
+    except JobFailed as e:
+        _finish(job, status=Job.FAILED, error=e.detail)
+    except Exception as e:
+        log.exception("job %s (%s) crashed", job.pk, job.kind)
+        _finish(job, status=Job.FAILED, error=f"Internal error: {e}")
+    else:
+        _finish(job, status=Job.SUCCEEDED, result=result)
+
+
+def _run_in_worker(job_id: int, fn: JobFn, *args) -> None:
+    # each worker thread owns its DB connection; don't keep it open between jobs
+    close_old_connections()
+    try:
+        run_job(job_id, fn, *args)
+    finally:
+        connection.close()
+
+
+def start_job(project, kind: str, fn: JobFn, *args, params: dict | None = None, user=None) -> Job:
+    """
+    Record a queued job and hand `fn` to the executor once the row is
+    committed. Returns immediately with the job (inline runner: finished).
+    The first job of a process also recovers those a previous one left
+    behind (recover_orphaned_jobs).
+    """
+    ensure_recovered()
+    creator = user if getattr(user, "is_authenticated", False) else None
+    job = Job.objects.create(project=project, kind=kind, params=params or {}, created_by=creator,
+                             worker=worker_id())
+    if job_runner() == "inline":
+        run_job(job.pk, fn, *args)
+        job.refresh_from_db()
+    else:
+        transaction.on_commit(lambda: _executor().submit(_run_in_worker, job.pk, fn, *args))
+    return job
+
+
+def remove_spooled(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
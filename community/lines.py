@@ -0,0 +1,110 @@
+# community/lines.py
+from __future__ import annotations
+
+import bisect
+import re
+from typing import Any, Dict, Tuple
+
+from django.conf import settings
+from django.db.models.functions import Substr
+
+from .models import ProjectFile
+
+STEP = 64  # lines between checkpoints of the offset index
+
+# the boundaries str.splitlines() uses, so line numbers agree with ProjectFile.line_count
+_BREAK_RE = re.compile(r"\r\n|[\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]")
+
+
+def line_index_min_bytes() -> int:
+    """Smaller files are just read whole; no index is built for them."""
+    return int(getattr(settings, "LINE_INDEX_MIN_BYTES", 256 * 1024))
+
+
+def build_offsets(text: str, step: int = STEP) -> Dict[str, Any]:
+    """
+    {"step": step, "marks": [[char offset, UTF-8 byte offset], ...]} for the
+    start of line 1, step + 1, 2 * step + 1, ...
+    """
+    marks = [[0, 0]]
+    line, char, nbytes = 1, 0, 0
+    for m in _BREAK_RE.finditer(text):
+        line += 1
+        if (line - 1) % step == 0 and m.end() < len(text):
+            nbytes += len(text[char:m.end()].encode("utf-8"))
+            char = m.end()
+            marks.append([char, nbytes])
+    return {"step": step, "marks": marks}
+
+
+class FileWindow:
+    """
+    Reads slices of one file's content without loading the rest. The file's
+    checkpoints (ProjectFile.line_offsets) are built on first use and kept
+    until the content changes; a read fetches only the span between the two
+    checkpoints around the window (Substr in the database), so it costs
+    O(window + STEP lines) whatever the file size.
+    """
+
+    def __init__(self, pf_id: int, size: int, line_count: int, content_hash: str, offsets: Dict[str, Any] | None):
+        self.pf_id = pf_id
+        self.size = size
+        self.line_count = line_count
+        self.content_hash = content_hash
+        self._offsets = offsets
+
+    @classmethod
+    def for_file(cls, project_id: int, path: str) -> "FileWindow | None":
+        row = (ProjectFile.objects.filter(project_id=project_id, path=path)
+               .values_list("id", "size", "line_count", "content_hash", "line_offsets").first())
+        return cls(*row) if row else None
+
+    @property
+    def offsets(self) -> Dict[str, Any]:
+        if self._offsets is None:
+            if self.size < line_index_min_bytes():
+                # one span, the whole (small) file
+                self._offsets = {"step": self.line_count + 1, "marks": [[0, 0]]}
+            else:
+                row = ProjectFile.objects.filter(pk=self.pf_id).values_list("content", "content_hash").first()
+                text, digest = row or ("", None)
+                self._offsets = build_offsets(text or "")
+                if digest == self.content_hash:
+                    # a plain UPDATE: no save(), so stats and the content version stay put; and only
+                    # onto the content it was built from, should a save have landed since the read
+                    ProjectFile.objects.filter(pk=self.pf_id, content_hash=self.content_hash).update(
+                        line_offsets=self._offsets)
+        return self._offsets
+
+    def content(self) -> str:
+        return ProjectFile.objects.filter(pk=self.pf_id).values_list("content", flat=True).first() or ""
+
+    def _span(self, first: int, last: int) -> Tuple[str, int]:
+        """Content from checkpoint `first` up to checkpoint `last` (or the end) -> (text, its byte offset)."""
+        marks = self.offsets["marks"]
+        char, nbytes = marks[first]
+        if last >= len(marks):
+            expr = Substr("content", char + 1)
+        else:
+            expr = Substr("content", char + 1, marks[last][0] - char)
+        text = ProjectFile.objects.filter(pk=self.pf_id).annotate(span=expr).values_list("span", flat=True).first()
+        return text or "", nbytes
+
+    def lines(self, start: int, end: int | None = None) -> Tuple[str, int, int]:
+        """Lines start..end (1-based, inclusive, end clamped) -> (text with line endings, start, end)."""
+        start = max(start, 1)
+        end = self.line_count if end is None else min(end, self.line_count)
+        if start > end:
+            return "", start, start - 1
+        step = self.offsets["step"]
+        first = (start - 1) // step
+        text, _ = self._span(first, (end - 1) // step + 1)
+        skip = start - 1 - first * step
+        return "".join(text.splitlines(keepends=True)[skip:skip + end - start + 1]), start, end
+
+    def byte_range(self, start: int, end: int) -> bytes:
+        """Bytes start..end (inclusive) of the UTF-8 content; caller has checked them against `size`."""
+        byte_starts = [b for _, b in self.offsets["marks"]]
+        first = bisect.bisect_right(byte_starts, start) - 1
+        text, base = self._span(first, bisect.bisect_right(byte_starts, end))
+        return text.encode("utf-8")[start - base:end - base + 1]
@@ -1,6 +1,18 @@
 # community/linters.py
 from __future__ import annotations
-from typing import List, Dict
+import bisect
+import copy
+import functools
+import platform
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Dict, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import content_hash
 
 # LSP-like positions are 0-based (line & character)
 def _diag(line0: int, col0: int, line1: int, col1: int, message: str, severity: str, source: str) -> Dict:
@@ -11,49 +23,76 @@ def _diag(line0: int, col0: int, line1: int, col1: int, message: str, severity:
         "source": source,
     }
 
-def _balance_check(text: str, pairs: dict[str, str], source: str) -> List[Dict]:
-    """Generic bracket/brace balancing diagnostics for JS/CSS/HTML fallbacks."""
-    openers = set(pairs.keys())
+# the rest of a string, comment or template literal after its opening marker; a backslash
+# escapes the next character, newlines included, and anything unclosed runs to the end
+_REST = {
+    "//": re.compile(r"[^\n]*"),
+    "/*": re.compile(r".*?(?:\*/|\Z)", re.S),
+    "'": re.compile(r"[^'\\]*(?:\\.[^'\\]*)*(?:'|\\?\Z)", re.S),
+    '"': re.compile(r'[^"\\]*(?:\\.[^"\\]*)*(?:"|\\?\Z)', re.S),
+}
+# template literal text up to its closing backtick, the next ${, or the end
+_TEMPLATE_TEXT = re.compile(r"[^`\\$]*(?:(?:\\.|\$(?!\{))[^`\\$]*)*(?:(`|\$\{)|\\?\Z)", re.S)
+
+
+@functools.lru_cache(maxsize=None)
+def _token_re(brackets: str, comments: Tuple[str, ...], templates: bool) -> "re.Pattern[str]":
+    single = "[%s]" % re.escape(brackets + "'\"" + "`" * templates)
+    return re.compile("|".join([re.escape(c) for c in comments] + [single]))
+
+
+def _balance_check(text: str, pairs: dict[str, str], source: str,
+                   comments: Tuple[str, ...] = (), templates: bool = False) -> List[Dict]:
+    """
+    Generic bracket/brace balancing diagnostics for JS/CSS/HTML fallbacks.
+
+    Jumps between the characters that matter (brackets, quotes, the comment
+    markers in `comments`, backticks if `templates`) with a regex and skips
+    strings, comments and template text whole, so plain code is never looked
+    at from Python. Line and column are worked out only for diagnostics.
+    """
     closers = set(pairs.values())
-    stack: list[tuple[str, int, int]] = []  # (char, line, col)
-    diags: List[Dict] = []
-    line, col = 0, 0
-    in_str = None
-    esc = False
-
-    for ch in text:
-        if ch == "\n":
-            line += 1
-            col = 0
-        else:
-            col += 1
-
-        # very light string handling to not flag braces inside quotes too much
-        if in_str:
-            if not esc and ch == in_str:
-                in_str = None
-            esc = (ch == "\\" and not esc)
-            continue
-        if ch in ('"', "'"):
-            in_str = ch
-            esc = False
-            continue
-
-        if ch in openers:
-            stack.append((ch, line, col))
-        elif ch in closers:
+    token = _token_re("".join(dict.fromkeys(list(pairs) + list(closers))), tuple(comments), templates)
+    stack: list[tuple[str, int]] = []  # (opener, offset); "${" is an open template substitution
+    bad: list[tuple[int, str]] = []  # (offset, message)
+
+    def template_text(at: int) -> int:
+        m = _TEMPLATE_TEXT.match(text, at)
+        if m.group(1) == "${":
+            stack.append(("${", m.end() - 2))
+        return m.end()
+
+    pos = 0
+    while True:
+        m = token.search(text, pos)
+        if m is None:
+            break
+        tok, i, pos = m.group(), m.start(), m.end()
+        if tok in pairs:
+            stack.append((tok, i))
+        elif tok in closers:
             if not stack:
-                diags.append(_diag(line, max(col - 1, 0), line, col, f"Unmatched '{ch}'", "error", source))
+                bad.append((i, f"Unmatched '{tok}'"))
+            elif stack[-1][0] == "${" and tok == "}":
+                stack.pop()
+                pos = template_text(pos)
+            elif pairs.get(stack[-1][0]) == tok:
+                stack.pop()
             else:
-                top, tl, tc = stack[-1][0], stack[-1][1], stack[-1][2]
-                if pairs.get(top) == ch:
-                    stack.pop()
-                else:
-                    diags.append(_diag(line, max(col - 1, 0), line, col, f"Mismatched '{top}' vs '{ch}'", "error", source))
-
-    # any unclosed
-    for opener, l, c in stack:
-        diags.append(_diag(l, max(c - 1, 0), l, c, f"Unclosed '{opener}'", "error", source))
+                bad.append((i, f"Mismatched '{stack[-1][0]}' vs '{tok}'"))
+        elif tok == "`":
+            pos = template_text(pos)
+        else:
+            pos = _REST[tok].match(text, pos).end()
+
+    if not bad and not stack:
+        return []
+    newlines = [m.start() for m in re.finditer("\n", text)]
+    diags: List[Dict] = []
+    for i, message in bad + [(i, f"Unclosed '{opener}'") for opener, i in stack]:
+        line = bisect.bisect_left(newlines, i)
+        col = i - (newlines[line - 1] + 1 if line else 0)
+        diags.append(_diag(line, col, line, col + 1, message, "error", source))
     return diags
 
 def lint_python(path: str, content: str) -> List[Dict]:
@@ -71,21 +110,114 @@ def lint_python(path: str, content: str) -> List[Dict]:
 
 def lint_js(path: str, content: str) -> List[Dict]:
     # Lightweight structural check (braces/parens/brackets)
-    return _balance_check(content, {"{": "}", "(": ")", "[": "]"}, "js")
+    return _balance_check(content, {"{": "}", "(": ")", "[": "]"}, "js", comments=("//", "/*"), templates=True)
 
 def lint_css(path: str, content: str) -> List[Dict]:
     # Basic: ensure braces are balanced; catch obvious mistakes
-    return _balance_check(content, {"{": "}"}, "css")
+    return _balance_check(content, {"{": "}"}, "css", comments=("/*",))
 
 def lint_html(path: str, content: str) -> List[Dict]:
     # Very light: angle brackets balance check
     return _balance_check(content, {"<": ">"}, "html")
 
-def lint_for_path(path: str, content: str) -> List[Dict]:
-    p = (path or "").lower()
-    if p.endswith(".py"):   return lint_python(path, content)
-    if p.endswith(".js"):   return lint_js(path, content)
-    if p.endswith(".css"):  return lint_css(path, content)
-    if p.endswith(".html") or p.endswith(".htm"): return lint_html(path, content)
+# (extensions, linter, version); bump a version when its diagnostics change, so cached results go stale
+LINTERS: List[Tuple[Tuple[str, ...], Callable[[str, str], List[Dict]], str]] = [
+    ((".py",), lint_python, "python-" + platform.python_version()),
+    ((".js",), lint_js, "balance-2"),
+    ((".css",), lint_css, "balance-2"),
+    ((".html", ".htm"), lint_html, "balance-1"),
     # add more: ts/tsx/vue/json/yaml/c/…
-    return []
+]
+
+
+def _linter_for(path: str):
+    p = (path or "").lower()
+    for exts, fn, version in LINTERS:
+        for ext in exts:
+            if p.endswith(ext):
+                return ext, fn, version
+    return None
+
+
+class LintCache:
+    """
+    Diagnostics by (extension, content hash, linter version), least recently
+    used dropped first. With LINT_CACHE_PERSIST on, results also go to the
+    Django cache, so they outlive the process and are shared between workers.
+    """
+
+    def __init__(self):
+        self._items: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _persist() -> bool:
+        return bool(getattr(settings, "LINT_CACHE_PERSIST", False))
+
+    @staticmethod
+    def _shared_key(key: Tuple[str, str, str]) -> str:
+        return "lint:%s:%s:%s" % key
+
+    def get(self, key: Tuple[str, str, str]) -> List[Dict] | None:
+        with self._lock:
+            diags = self._items.get(key)
+            if diags is not None:
+                self._items.move_to_end(key)
+        if diags is None and self._persist():
+            diags = cache.get(self._shared_key(key))
+            if diags is not None:
+                self._remember(key, diags)
+        with self._lock:
+            if diags is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return copy.deepcopy(diags)
+
+    def put(self, key: Tuple[str, str, str], diags: List[Dict]) -> None:
+        diags = copy.deepcopy(diags)
+        self._remember(key, diags)
+        if self._persist():
+            cache.set(self._shared_key(key), diags, getattr(settings, "LINT_CACHE_SECONDS", 7 * 24 * 3600))
+
+    def _remember(self, key: Tuple[str, str, str], diags: List[Dict]) -> None:
+        size = int(getattr(settings, "LINT_CACHE_SIZE", 4096))
+        with self._lock:
+            self._items[key] = diags
+            self._items.move_to_end(key)
+            while len(self._items) > size:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self.hits = self.misses = 0
+
+
+lint_cache = LintCache()
+
+
+def run_linter(path: str, content: str) -> List[Dict]:
+    """The linter for `path` run on `content`, bypassing the cache (also the process-pool entry point)."""
+    linter = _linter_for(path)
+    return linter[1](path, content) if linter else []
+
+
+def lint_key(path: str, digest: str) -> Tuple[str, str, str] | None:
+    """lint_cache key for a file at `path` with content_hash `digest`; None if nothing lints it."""
+    linter = _linter_for(path)
+    return (linter[0], digest, linter[2]) if linter else None
+
+
+def lint_for_path(path: str, content: str, digest: str | None = None) -> List[Dict]:
+    """Diagnostics for `content` as a file at `path`; `digest` is its content_hash, if the caller has it."""
+    if _linter_for(path) is None:
+        return []
+    key = lint_key(path, digest or content_hash(content))
+    diags = lint_cache.get(key)
+    if diags is None:
+        diags = run_linter(path, content)
+        lint_cache.put(key, diags)
+    return diags
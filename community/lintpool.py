@@ -0,0 +1,141 @@
+# community/lintpool.py
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterator, Tuple
+
+import django
+from django.conf import settings
+
+from .bulk import FETCH_CHUNK, chunked
+from .linters import lint_cache, lint_key, run_linter
+from .models import ProjectFile
+
+log = logging.getLogger(__name__)
+
+
+def lint_runner() -> str:
+    """"process" (default): a pool of worker processes; "inline": lint in the request thread."""
+    return getattr(settings, "LINT_RUNNER", "process")
+
+
+def lint_workers() -> int:
+    return int(getattr(settings, "LINT_WORKERS", 0)) or os.cpu_count() or 1
+
+
+_POOL: ProcessPoolExecutor | None = None
+_POOL_LOCK = threading.Lock()
+
+
+def _pool() -> ProcessPoolExecutor:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            # spawned, not forked: no copies of the web process' DB connections and threads
+            _POOL = ProcessPoolExecutor(max_workers=lint_workers(), mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=django.setup)
+        return _POOL
+
+
+def _drop_pool(pool: ProcessPoolExecutor) -> None:
+    """A worker died and took `pool` down with it; the next _pool() starts a fresh one."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is pool:
+            _POOL = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _submit(path: str, text: str) -> Future:
+    """run_linter on the pool, replacing the pool once if it turns out to be broken."""
+    for _ in range(2):
+        pool = _pool()
+        try:
+            return pool.submit(run_linter, path, text)
+        except BrokenProcessPool as e:
+            _drop_pool(pool)
+            error = e
+    fut: Future = Future()
+    fut.set_exception(error)
+    return fut
+
+
+def iter_project_lint(project_id: int, prefix: str = "", known: Dict[str, str] | None = None) -> Iterator[Dict[str, Any]]:
+    """
+    Diagnostics for every lintable file of a project (under `prefix`), one
+    {"path", "hash", "diagnostics"} dict per file, in the order they finish.
+    A file whose hash is in `known` ({path: sha256} the client already has
+    results for) comes back as {"path", "hash", "unchanged": True}; one whose
+    content was linted before is answered from lint_cache. Only the rest is
+    read and sent to the pool, FETCH_CHUNK files at a time, with at most a
+    few chunks in flight. Files caught in a crash of the pool are sent once
+    more to a new one; a file that fails again gets {"path", "hash", "error"}.
+    """
+    known = known or {}
+    qs = ProjectFile.objects.filter(project_id=project_id)
+    if prefix:
+        qs = qs.filter(path__startswith=prefix)
+    listing = qs.order_by("path").values_list("path", "content_hash").iterator(chunk_size=FETCH_CHUNK * 5)
+
+    def todo() -> Iterator[Tuple[str, str, Dict[str, Any] | None]]:
+        """(path, hash, answer if one is already at hand) for each lintable file."""
+        for path, digest in listing:
+            key = lint_key(path, digest)
+            if key is None:
+                continue
+            if known.get(path) == digest:
+                yield path, digest, {"path": path, "hash": digest, "unchanged": True}
+                continue
+            diags = lint_cache.get(key)
+            yield path, digest, None if diags is None else {"path": path, "hash": digest, "diagnostics": diags}
+
+    def done(path: str, digest: str, fut: Future) -> Dict[str, Any]:
+        try:
+            diags = fut.result()
+        except Exception as e:  # a crashed worker fails its file, not the stream
+            log.warning("linting %s in project %s failed: %s", path, project_id, e)
+            return {"path": path, "hash": digest, "error": str(e) or type(e).__name__}
+        lint_cache.put(lint_key(path, digest), diags)
+        return {"path": path, "hash": digest, "diagnostics": diags}
+
+    inline = lint_runner() == "inline"
+    pending: Dict[Future, Tuple[str, str, str, bool]] = {}
+
+    def settle(finished) -> Iterator[Dict[str, Any]]:
+        for fut in finished:
+            path, digest, text, retried = pending.pop(fut)
+            if not retried and isinstance(fut.exception(), BrokenProcessPool):
+                # most likely another file's crash; _submit replaces the broken pool
+                pending[_submit(path, text)] = (path, digest, text, True)
+                continue
+            yield done(path, digest, fut)
+
+    for chunk in chunked(todo(), FETCH_CHUNK):
+        for _, _, answer in chunk:
+            if answer is not None:
+                yield answer
+        misses = [(path, digest) for path, digest, answer in chunk if answer is None]
+        if not misses:
+            continue
+        rows = dict(qs.filter(path__in=[p for p, _ in misses]).values_list("path", "content"))
+        for path, digest in misses:
+            if path not in rows:
+                continue  # deleted meanwhile
+            if inline:
+                fut: Future = Future()
+                fut.set_result(run_linter(path, rows[path]))
+                yield done(path, digest, fut)
+            else:
+                pending[_submit(path, rows[path])] = (path, digest, rows[path], False)
+        # keep a bounded amount of content in flight
+        while len(pending) > FETCH_CHUNK * 2:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            yield from settle(finished)
+    while pending:
+        finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+        yield from settle(finished)
@@ -0,0 +1,52 @@
+import logging
+
+from django.db import ProgrammingError, migrations, transaction
+
+log = logging.getLogger(__name__)
+
+INDEX_NAME = "community_projectfile_content_trgm"
+INSUFFICIENT_PRIVILEGE = "42501"
+
+
+def _sqlstate(error: Exception) -> str | None:
+    cause = error.__cause__
+    return getattr(cause, "sqlstate", None) or getattr(cause, "pgcode", None)  # psycopg 3 / psycopg2
+
+
+def create_trgm_index(apps, schema_editor):
+    # Trigram GIN index for code search; Postgres only (other DBs use the
+    # in-process index in community/search.py). Creating the extension may
+    # need privileges we don't have: search still works, just unindexed.
+    # Any other failure is a real one and stops the migration.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except ProgrammingError as e:
+        if _sqlstate(e) != INSUFFICIENT_PRIVILEGE:
+            raise
+        log.warning("pg_trgm could not be enabled (%s); code search runs unindexed until a superuser "
+                    "creates the extension and the %s index", e, INDEX_NAME)
+        return
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {INDEX_NAME} "
+        "ON community_projectfile USING gin (content gin_trgm_ops)"
+    )
+
+
+def drop_trgm_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"DROP INDEX IF EXISTS {INDEX_NAME}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("community", "0003_presence"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trgm_index, drop_trgm_index),
+    ]
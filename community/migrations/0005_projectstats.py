@@ -0,0 +1,89 @@
+# Generated by Django 5.2.5 on 2026-10-19 06:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+_LANGS = {"py": "python", "js": "javascript", "html": "html", "htm": "html", "css": "css"}
+
+
+def backfill(apps, schema_editor):
+    ProjectFile = apps.get_model("community", "ProjectFile")
+    ProjectStats = apps.get_model("community", "ProjectStats")
+    Project = apps.get_model("community", "Project")
+
+    batch = []
+    for pf in ProjectFile.objects.only("id", "path", "content").iterator(chunk_size=500):
+        text = pf.content or ""
+        ext = (pf.path.rsplit(".", 1)[-1] if "." in pf.path else "").lower()
+        pf.size = len(text.encode("utf-8"))
+        pf.line_count = len(text.splitlines())
+        pf.language = _LANGS.get(ext, ext or "unknown")
+        batch.append(pf)
+        if len(batch) >= 500:
+            ProjectFile.objects.bulk_update(batch, ["size", "line_count", "language"])
+            batch = []
+    if batch:
+        ProjectFile.objects.bulk_update(batch, ["size", "line_count", "language"])
+
+    now = timezone.now()
+    for project_id in Project.objects.values_list("id", flat=True).iterator():
+        files = ProjectFile.objects.filter(project_id=project_id)
+        agg = files.aggregate(files=Count("id"), bytes=Sum("size"), lines=Sum("line_count"))
+        ProjectStats.objects.create(
+            project_id=project_id,
+            file_count=agg["files"] or 0,
+            total_bytes=agg["bytes"] or 0,
+            total_lines=agg["lines"] or 0,
+            languages=dict(files.order_by().values_list("language").annotate(n=Count("id"))),
+            last_modified=now,
+            version=1,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("community", "0004_projectfile_content_trgm"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProjectStats",
+            fields=[
+                (
+                    "project",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to="community.project",
+                    ),
+                ),
+                ("file_count", models.PositiveIntegerField(default=0)),
+                ("total_bytes", models.PositiveBigIntegerField(default=0)),
+                ("total_lines", models.PositiveBigIntegerField(default=0)),
+                ("languages", models.JSONField(blank=True, default=dict)),
+                ("last_modified", models.DateTimeField(blank=True, null=True)),
+                ("version", models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="projectfile",
+            name="language",
+            field=models.CharField(blank=True, default="", max_length=32),
+        ),
+        migrations.AddField(
+            model_name="projectfile",
+            name="line_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="projectfile",
+            name="size",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
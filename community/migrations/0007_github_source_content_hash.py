@@ -0,0 +1,57 @@
+# Generated by Django 5.2.5 on 2026-10-19 06:38
+
+import hashlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_hashes(apps, schema_editor):
+    ProjectFile = apps.get_model("community", "ProjectFile")
+    batch = []
+    for pf in ProjectFile.objects.only("id", "content").iterator(chunk_size=500):
+        pf.content_hash = hashlib.sha256((pf.content or "").encode("utf-8")).hexdigest()
+        batch.append(pf)
+        if len(batch) >= 500:
+            ProjectFile.objects.bulk_update(batch, ["content_hash"])
+            batch = []
+    if batch:
+        ProjectFile.objects.bulk_update(batch, ["content_hash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("community", "0006_job"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GithubSource",
+            fields=[
+                (
+                    "project",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="github_source",
+                        serialize=False,
+                        to="community.project",
+                    ),
+                ),
+                ("owner", models.CharField(max_length=100)),
+                ("repo", models.CharField(max_length=100)),
+                ("ref", models.CharField(blank=True, max_length=255)),
+                ("subdir", models.CharField(blank=True, max_length=512)),
+                ("commit_sha", models.CharField(blank=True, max_length=40)),
+                ("etag", models.CharField(blank=True, max_length=255)),
+                ("synced_at", models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="projectfile",
+            name="content_hash",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+        migrations.RunPython(backfill_hashes, migrations.RunPython.noop),
+    ]
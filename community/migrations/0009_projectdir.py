@@ -0,0 +1,96 @@
+# Generated by Django 5.2.5 on 2026-10-19 07:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_dirs(apps, schema_editor):
+    ProjectFile = apps.get_model("community", "ProjectFile")
+    ProjectDir = apps.get_model("community", "ProjectDir")
+    counts = {}  # (project, dir) -> [file_count, child_files, child_dirs]
+    batch = []
+    for pf in ProjectFile.objects.only("id", "project_id", "path").iterator(chunk_size=500):
+        parts = pf.path.split("/")[:-1]
+        pf.directory = "/".join(parts)
+        batch.append(pf)
+        if len(batch) >= 500:
+            ProjectFile.objects.bulk_update(batch, ["directory"])
+            batch = []
+        for i in range(1, len(parts) + 1):
+            key = (pf.project_id, "/".join(parts[:i]))
+            if key not in counts:
+                counts[key] = [0, 0, 0]
+                if i > 1:
+                    counts[(pf.project_id, "/".join(parts[:i - 1]))][2] += 1
+            counts[key][0] += 1
+        if parts:
+            counts[(pf.project_id, pf.directory)][1] += 1
+    if batch:
+        ProjectFile.objects.bulk_update(batch, ["directory"])
+    ProjectDir.objects.bulk_create(
+        [ProjectDir(project_id=pid, path=d, parent=d.rpartition("/")[0], file_count=n, child_files=f, child_dirs=c)
+         for (pid, d), (n, f, c) in counts.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("community", "0008_uploadsession"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProjectDir",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("path", models.CharField(max_length=512)),
+                ("parent", models.CharField(blank=True, default="", max_length=512)),
+                ("file_count", models.PositiveIntegerField(default=0)),
+                ("child_files", models.PositiveIntegerField(default=0)),
+                ("child_dirs", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="projectfile",
+            name="directory",
+            field=models.CharField(blank=True, default="", max_length=512),
+        ),
+        migrations.AddIndex(
+            model_name="projectfile",
+            index=models.Index(
+                fields=["project", "directory", "path"],
+                name="community_p_project_641a0e_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="projectdir",
+            name="project",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="dirs",
+                to="community.project",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="projectdir",
+            index=models.Index(
+                fields=["project", "parent", "path"],
+                name="community_p_project_260426_idx",
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="projectdir",
+            unique_together={("project", "path")},
+        ),
+        migrations.RunPython(backfill_dirs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 07:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("community", "0009_projectdir"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="projectfile",
+            name="line_offsets",
+            field=models.JSONField(blank=True, default=None, null=True),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("community", "0010_projectfile_line_offsets"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="uploadsession",
+            name="status",
+            field=models.CharField(
+                choices=[("open", "open"), ("finalizing", "finalizing"), ("complete", "complete"), ("failed", "failed")],
+                default="open",
+                max_length=16,
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("community", "0011_uploadsession_finalizing"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="job",
+            name="worker",
+            field=models.CharField(blank=True, max_length=128),
+        ),
+    ]
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import hashlib
 import io
+import uuid
 import zipfile
 from datetime import timedelta
+from typing import Iterable
 
 import jwt
 from django.conf import settings
@@ -10,7 +13,7 @@ from django.contrib.auth.models import AbstractUser
 from django.core.files.base import ContentFile
 from django.db import models, transaction
 from django.utils import timezone
-from django.db.models import Q
+from django.db.models import Count, Q, Sum
 
 # -------------------------
 # Users & Notifications
@@ -191,6 +194,40 @@ class PrivateMessage(models.Model):
 # Projects & “Files”
 # -------------------------
 
+def language_from_path(path: str) -> str:
+    ext = (path.rsplit(".", 1)[-1] if "." in path else "").lower()
+    return {
+        "py": "python",
+        "js": "javascript",
+        "html": "html",
+        "htm": "html",
+        "css": "css",
+    }.get(ext, ext or "unknown")
+
+
+def count_lines(text: str) -> int:
+    if not text:
+        return 0
+    # count lines like editors do: splitlines then len
+    return len(text.splitlines())
+
+
+def content_hash(text: str) -> str:
+    """sha256 of the UTF-8 content; also the file ETag."""
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def directory_of(path: str) -> str:
+    """"a/b/c.py" -> "a/b"; "" for top-level files."""
+    return path.rpartition("/")[0]
+
+
+def parent_dirs(path: str) -> list[str]:
+    """"a/b/c.py" -> ["a", "a/b"] (outermost first)."""
+    parts = path.split("/")[:-1]
+    return ["/".join(parts[:i]) for i in range(1, len(parts) + 1)]
+
+
 class Project(models.Model):
     name = models.CharField(max_length=255, unique=True)
     description = models.TextField(blank=True)
@@ -264,47 +301,463 @@ class Project(models.Model):
     def as_zip_bytes(self) -> bytes:
         """
         Produce a ZIP of all ProjectFile rows as in-memory bytes.
+        Prefer community.export.iter_project_zip for anything large.
         """
-        buffer = io.BytesIO()
-        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-            for f in self.files.all():
-                zf.writestr(f.path, f.content or "")
-        buffer.seek(0)
-        return buffer.read()
-
-    def ingest_zip(self, uploaded_file) -> int:
+        from .export import iter_project_zip
+
+        return b"".join(iter_project_zip(self.pk))
+
+    def ingest_zip(self, uploaded_file, batch_size: int | None = None, progress=None,
+                   workers: int | None = None) -> int:
         """
         Read an uploaded zip file (InMemoryUploadedFile/TemporaryUploadedFile),
-        store each member as a ProjectFile row. Returns number of files ingested.
+        store each text member as a ProjectFile row. Returns number of files ingested.
+        Rows are upserted in batches of `batch_size` (default settings.INGEST_BATCH_SIZE)
+        inside one transaction; members are streamed under the size/ratio budgets
+        of community.ingest.IngestLimits (raises ArchiveRejected, nothing is written).
+        `progress` receives start/advance calls (community.jobs.JobProgress).
+        With `workers` > 1 (default settings.INGEST_WORKERS) members are inflated
+        and decoded on that many threads (community.ingest.iter_zip_texts_parallel).
         """
-        count = 0
+        from .ingest import ingest_workers, iter_zip_texts, iter_zip_texts_parallel, write_files, zip_opener
+
+        workers = ingest_workers() if workers is None else workers
+        if workers > 1:
+            with zip_opener(uploaded_file) as open_zip:
+                texts = iter_zip_texts_parallel(open_zip, workers, progress=progress)
+                return write_files(self, texts, batch_size=batch_size, progress=progress)
         with zipfile.ZipFile(uploaded_file) as zf:
-            for name in zf.namelist():
-                if name.endswith("/"):  # skip folders
-                    continue
-                data = zf.read(name)
-                # We assume text files; adapt if you want binary files
-                try:
-                    text = data.decode("utf-8")
-                except UnicodeDecodeError:
-                    # store binary as base64 or skip; here we skip to keep parity with your text-only approach
-                    continue
-                self.add_text_file(name, text)
-                count += 1
-        return count
+            texts = iter_zip_texts(zf, progress=progress)
+            return write_files(self, texts, batch_size=batch_size, progress=progress)
 
 
+    def ingest_archive(self, source, batch_size: int | None = None, progress=None) -> int:
+        """
+        Like ingest_zip, but also takes tar, tar.gz/.bz2/.xz and tar.zst (sniffed
+        from the first bytes), from a path or any readable stream. Tar is
+        ingested while the stream is being read (community.ingest.iter_tar_texts).
+        """
+        from .ingest import ingest_archive
+
+        return ingest_archive(self, source, batch_size=batch_size, progress=progress)
+
 class ProjectFile(models.Model):
     project = models.ForeignKey(Project, related_name="files", on_delete=models.CASCADE)
     path = models.CharField(max_length=512)  # e.g., "src/app.py"
     content = models.TextField(blank=True)
+    # Derived from path/content on save (see refresh_derived_fields); feed ProjectStats
+    size = models.PositiveBigIntegerField(default=0)  # UTF-8 bytes
+    line_count = models.PositiveIntegerField(default=0)
+    language = models.CharField(max_length=32, blank=True, default="")
+    content_hash = models.CharField(max_length=64, blank=True, default="")  # lets re-imports skip unchanged files
+    directory = models.CharField(max_length=512, blank=True, default="")  # parent dir, for tree listings
+    # checkpoints for windowed reads, built on first use (community.lines); reset by every content write
+    line_offsets = models.JSONField(null=True, blank=True, default=None)
+
+    DERIVED_FIELDS = ("size", "line_count", "language", "content_hash", "directory", "line_offsets")
+    ROLLUP_FIELDS = ("size", "line_count", "language")
 
     class Meta:
         unique_together = (("project", "path"),)
+        indexes = [models.Index(fields=["project", "directory", "path"])]
 
     def __str__(self) -> str:
         return f"{self.project.name}:{self.path}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remember what this row contributed to ProjectStats, so save() can apply a delta
+        if all(f in field_names for f in cls.ROLLUP_FIELDS):
+            instance._loaded_rollup = instance.rollup()
+        if "path" in field_names:
+            instance._loaded_path = instance.path
+        return instance
+
+    def rollup(self) -> tuple[int, int, str]:
+        return self.size, self.line_count, self.language
+
+    def refresh_derived_fields(self) -> None:
+        text = self.content or ""
+        self.size = len(text.encode("utf-8"))
+        self.line_count = count_lines(text)
+        self.language = language_from_path(self.path)
+        self.content_hash = content_hash(text)
+        self.directory = directory_of(self.path)
+        self.line_offsets = None
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            if not {"path", "content"} & set(update_fields):
+                return super().save(*args, **kwargs)
+            kwargs["update_fields"] = set(update_fields) | set(self.DERIVED_FIELDS)
+
+        self.refresh_derived_fields()
+        old, old_path = None, None
+        if not self._state.adding:
+            old = getattr(self, "_loaded_rollup", None)
+            old_path = getattr(self, "_loaded_path", None)
+            if old is None or old_path is None:
+                row = ProjectFile.objects.filter(pk=self.pk).values_list("path", *self.ROLLUP_FIELDS).first()
+                if row is not None:
+                    old_path, old = row[0], tuple(row[1:])
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            ProjectStats.apply_change(self.project_id, old, self.rollup(), old_path, self.path)
+        self._loaded_rollup = self.rollup()
+        self._loaded_path = self.path
+
+
+class ProjectStats(models.Model):
+    """
+    Per-project rollups kept in step with ProjectFile writes, so summaries and
+    listings read one row instead of every file. `version` moves on every
+    content write; caches derived from file contents are keyed by it.
+    """
+    project = models.OneToOneField(Project, related_name="stats", on_delete=models.CASCADE, primary_key=True)
+    file_count = models.PositiveIntegerField(default=0)
+    total_bytes = models.PositiveBigIntegerField(default=0)
+    total_lines = models.PositiveBigIntegerField(default=0)
+    languages = models.JSONField(default=dict, blank=True)  # language -> file count
+    last_modified = models.DateTimeField(null=True, blank=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"Stats({self.project_id}): {self.file_count} files"
+
+    def as_dict(self) -> dict:
+        return {
+            "files": self.file_count,
+            "bytes": self.total_bytes,
+            "lines": self.total_lines,
+            "languages": self.languages,
+            "last_modified": self.last_modified.isoformat() if self.last_modified else None,
+            "version": self.version,
+        }
+
+    @classmethod
+    def version_for(cls, project_id: int) -> int:
+        return cls.objects.filter(project_id=project_id).values_list("version", flat=True).first() or 0
+
+    @classmethod
+    def apply_change(cls, project_id: int, old: tuple | None, new: tuple | None,
+                     old_path: str | None = None, new_path: str | None = None) -> None:
+        """
+        Apply one file's (size, line_count, language) transition: old=None for
+        a create, new=None for a delete. Row-locked, so concurrent writers to
+        the same project serialize here. Given the file's paths, ProjectDir is
+        moved along under the same lock.
+        """
+        with transaction.atomic():
+            stats = cls.objects.select_for_update().filter(project_id=project_id).first()
+            if stats is None:
+                if new is not None:
+                    cls.rebuild(project_id)
+                return
+            langs = dict(stats.languages or {})
+            if old is not None:
+                size, lines, lang = old
+                stats.file_count = max(stats.file_count - 1, 0)
+                stats.total_bytes = max(stats.total_bytes - size, 0)
+                stats.total_lines = max(stats.total_lines - lines, 0)
+                langs[lang] = langs.get(lang, 0) - 1
+                if langs[lang] <= 0:
+                    del langs[lang]
+            if new is not None:
+                size, lines, lang = new
+                stats.file_count += 1
+                stats.total_bytes += size
+                stats.total_lines += lines
+                langs[lang] = langs.get(lang, 0) + 1
+            stats.languages = langs
+            stats.last_modified = timezone.now()
+            stats.version += 1
+            stats.save()
+            ProjectDir.apply_change(project_id, old_path if old is not None else None,
+                                    new_path if new is not None else None)
+
+    @classmethod
+    def rebuild(cls, project_id: int, added: Iterable[str] | None = None,
+                removed: Iterable[str] | None = None) -> "ProjectStats":
+        """
+        Recompute from the stored per-file columns (after bulk writes, or to
+        repair drift). A bulk write passes the paths it created and deleted,
+        and ProjectDir is moved by just that delta; without them (repair)
+        ProjectDir is rebuilt from every path.
+        """
+        files = ProjectFile.objects.filter(project_id=project_id)
+        agg = files.aggregate(files=Count("id"), bytes=Sum("size"), lines=Sum("line_count"))
+        langs = dict(files.order_by().values_list("language").annotate(n=Count("id")))
+        with transaction.atomic():
+            stats, created = cls.objects.select_for_update().get_or_create(project_id=project_id)
+            stats.file_count = agg["files"] or 0
+            stats.total_bytes = agg["bytes"] or 0
+            stats.total_lines = agg["lines"] or 0
+            stats.languages = langs
+            stats.last_modified = timezone.now()
+            stats.version += 1
+            stats.save()
+            if created or (added is None and removed is None):
+                ProjectDir.rebuild(project_id)
+            else:
+                ProjectDir.apply_delta(project_id, added or (), removed or ())
+        return stats
+
+
+class ProjectDir(models.Model):
+    """
+    Materialized directories of a project's file paths, so a tree listing
+    reads one folder's children instead of every path. Counts:
+      file_count   files anywhere below
+      child_files  files directly inside
+      child_dirs   directories directly inside
+    The root is implicit (path ""). Kept in step by ProjectStats: single-file
+    writes adjust the ancestors, rebuild() recomputes after bulk writes.
+    """
+    project = models.ForeignKey(Project, related_name="dirs", on_delete=models.CASCADE)
+    path = models.CharField(max_length=512)  # e.g. "src/app", no trailing slash
+    parent = models.CharField(max_length=512, blank=True, default="")  # "" for top-level dirs
+    file_count = models.PositiveIntegerField(default=0)
+    child_files = models.PositiveIntegerField(default=0)
+    child_dirs = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = (("project", "path"),)
+        indexes = [models.Index(fields=["project", "parent", "path"])]
+
+    def __str__(self) -> str:
+        return f"{self.project_id}:{self.path}/"
+
+    @property
+    def name(self) -> str:
+        return self.path.rpartition("/")[2]
+
+    @classmethod
+    def apply_change(cls, project_id: int, old_path: str | None, new_path: str | None) -> None:
+        """A file appeared at `new_path` and/or left `old_path` (either may be None)."""
+        if old_path == new_path:
+            return
+        with transaction.atomic():
+            if new_path is not None:
+                cls._add_file(project_id, new_path)
+            if old_path is not None:
+                cls._remove_file(project_id, old_path)
+
+    @classmethod
+    def _add_file(cls, project_id: int, path: str) -> None:
+        chain = parent_dirs(path)
+        if not chain:
+            return
+        rows = {d.path: d for d in cls.objects.filter(project_id=project_id, path__in=chain)}
+        for d in chain:
+            row = rows.get(d)
+            if row is None:
+                row = rows[d] = cls(project_id=project_id, path=d, parent=directory_of(d))
+                if row.parent:
+                    rows[row.parent].child_dirs += 1
+            row.file_count += 1
+        rows[chain[-1]].child_files += 1
+        for row in rows.values():
+            row.save()
+
+    @classmethod
+    def _remove_file(cls, project_id: int, path: str) -> None:
+        chain = parent_dirs(path)
+        rows = {d.path: d for d in cls.objects.filter(project_id=project_id, path__in=chain)}
+        if chain and chain[-1] in rows:
+            rows[chain[-1]].child_files = max(rows[chain[-1]].child_files - 1, 0)
+        gone = []
+        for d in chain:
+            row = rows.get(d)
+            if row is None:
+                continue
+            row.file_count = max(row.file_count - 1, 0)
+            if row.file_count == 0:
+                gone.append(row.pk)
+                parent = rows.get(row.parent)
+                if parent is not None and parent.file_count:
+                    parent.child_dirs = max(parent.child_dirs - 1, 0)
+        for row in rows.values():
+            if row.pk not in gone:
+                row.save()
+        if gone:
+            cls.objects.filter(pk__in=gone).delete()
+
+    @classmethod
+    def apply_delta(cls, project_id: int, added: Iterable[str], removed: Iterable[str]) -> None:
+        """
+        Many files appeared at `added` and left `removed` (a bulk write):
+        _add_file/_remove_file for all of them at once, reading and writing
+        only the directories above those paths.
+        """
+        files: dict[str, int] = {}  # dir -> change in file_count
+        direct: dict[str, int] = {}  # dir -> change in child_files
+        for paths, sign in ((added, 1), (removed, -1)):
+            for path in paths:
+                chain = parent_dirs(path)
+                for d in chain:
+                    files[d] = files.get(d, 0) + sign
+                if chain:
+                    direct[chain[-1]] = direct.get(chain[-1], 0) + sign
+        if not files:
+            return
+        rows = {d.path: d for d in cls.objects.filter(project_id=project_id, path__in=list(files))}
+        existed = {d for d, row in rows.items() if row.file_count > 0}
+        for d, n in files.items():
+            row = rows.get(d)
+            if row is None:
+                row = rows[d] = cls(project_id=project_id, path=d, parent=directory_of(d))
+            row.file_count = max(row.file_count + n, 0)
+            row.child_files = max(row.child_files + direct.get(d, 0), 0)
+        # a directory that appeared or emptied changes its parent's child_dirs
+        for d in files:
+            was, now = d in existed, rows[d].file_count > 0
+            parent = rows[d].parent
+            if was != now and parent:
+                rows[parent].child_dirs = max(rows[parent].child_dirs + (1 if now else -1), 0)
+        gone = [row.pk for row in rows.values() if row.file_count == 0 and row.pk is not None]
+        cls.objects.bulk_update([row for row in rows.values() if row.pk is not None and row.file_count],
+                                ["file_count", "child_files", "child_dirs"], batch_size=1000)
+        cls.objects.bulk_create([row for row in rows.values() if row.pk is None and row.file_count],
+                                batch_size=1000)
+        if gone:
+            cls.objects.filter(pk__in=gone).delete()
+
+    @classmethod
+    def rebuild(cls, project_id: int) -> None:
+        """Recompute from the file paths (backfill and repair; bulk writes use apply_delta). Runs inside ProjectStats.rebuild's transaction and row lock."""
+        counts: dict[str, list[int]] = {}  # path -> [file_count, child_files, child_dirs]
+        paths = ProjectFile.objects.filter(project_id=project_id).values_list("path", flat=True)
+        for path in paths.iterator(chunk_size=2000):
+            chain = parent_dirs(path)
+            for d in chain:
+                entry = counts.get(d)
+                if entry is None:
+                    entry = counts[d] = [0, 0, 0]
+                    parent = directory_of(d)
+                    if parent:
+                        counts[parent][2] += 1
+                entry[0] += 1
+            if chain:
+                counts[chain[-1]][1] += 1
+        cls.objects.filter(project_id=project_id).delete()
+        cls.objects.bulk_create(
+            (cls(project_id=project_id, path=d, parent=directory_of(d), file_count=n, child_files=f,
+                 child_dirs=c) for d, (n, f, c) in counts.items()),
+            batch_size=1000,
+        )
+
+
+class GithubSource(models.Model):
+    """
+    Where a project was imported from on GitHub, so a re-import can ask
+    whether anything changed (commit SHA + ETag) and sync only the delta.
+    """
+    project = models.OneToOneField(Project, related_name="github_source", on_delete=models.CASCADE, primary_key=True)
+    owner = models.CharField(max_length=100)
+    repo = models.CharField(max_length=100)
+    ref = models.CharField(max_length=255, blank=True)  # "" = default branch
+    subdir = models.CharField(max_length=512, blank=True)
+    commit_sha = models.CharField(max_length=40, blank=True)
+    etag = models.CharField(max_length=255, blank=True)  # of the commit lookup, for If-None-Match
+    synced_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f"{self.owner}/{self.repo}@{self.ref or 'default'} ({self.commit_sha[:7] or '?'})"
+
+    def matches(self, owner: str, repo: str, ref: str, subdir: str) -> bool:
+        return (self.owner, self.repo, self.ref, self.subdir.strip("/")) == (owner, repo, ref, subdir.strip("/"))
+
+
+class Job(models.Model):
+    """
+    A long-running project operation (zip upload, GitHub import) executed
+    off the request by community.jobs. Progress columns are updated as the
+    work advances and mirrored to the project's chat group.
+    """
+    QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+    STATUS_CHOICES = [(s, s) for s in (QUEUED, RUNNING, SUCCEEDED, FAILED)]
+    FINISHED = (SUCCEEDED, FAILED)
+
+    project = models.ForeignKey(Project, related_name="jobs", on_delete=models.CASCADE)
+    created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name="jobs")
+    kind = models.CharField(max_length=32)  # "zip_upload", "github_import", ...
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED, db_index=True)
+    params = models.JSONField(default=dict, blank=True)
+    files_done = models.PositiveIntegerField(default=0)
+    files_total = models.PositiveIntegerField(null=True, blank=True)
+    bytes_done = models.PositiveBigIntegerField(default=0)
+    bytes_total = models.PositiveBigIntegerField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=128, blank=True)  # "host:pid:token" of the process that runs it
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["project", "-created_at"])]
+
+    def __str__(self) -> str:
+        return f"Job({self.pk}) {self.kind} [{self.status}]"
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.pk,
+            "project_id": self.project_id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": {
+                "files_done": self.files_done,
+                "files_total": self.files_total,
+                "bytes_done": self.bytes_done,
+                "bytes_total": self.bytes_total,
+            },
+            "result": self.result,
+            "error": self.error or None,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class UploadSession(models.Model):
+    """
+    A resumable archive upload: chunks are appended to a file on local disk
+    (community.uploads) at `offset`, and the finished file is handed to the
+    ingest path on finalize, which first moves the row from OPEN to
+    FINALIZING so only one request ever ingests it.
+    """
+    OPEN, FINALIZING, COMPLETE, FAILED = "open", "finalizing", "complete", "failed"
+    STATUS_CHOICES = [(s, s) for s in (OPEN, FINALIZING, COMPLETE, FAILED)]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    project = models.ForeignKey(Project, related_name="uploads", on_delete=models.CASCADE)
+    created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name="uploads")
+    filename = models.CharField(max_length=255, blank=True)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True)  # of the whole file, checked on finalize
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=OPEN)
+    job = models.ForeignKey(Job, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"Upload({self.pk}) {self.offset}/{self.size} [{self.status}]"
+
+    def as_dict(self) -> dict:
+        return {
+            "upload_id": str(self.pk),
+            "project_id": self.project_id,
+            "filename": self.filename,
+            "size": self.size,
+            "offset": self.offset,
+            "status": self.status,
+            "job_id": self.job_id,
+        }
+
 
 class Presence(models.Model):
     project = models.ForeignKey("community.Project", on_delete=models.CASCADE, db_index=True)
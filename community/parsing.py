@@ -1,10 +1,18 @@
 # community/parsing.py
 from __future__ import annotations
 
-from typing import Dict, Any, List, Set, DefaultDict
+from typing import Dict, Any, Iterable, List, Set, DefaultDict, Tuple
 from collections import defaultdict
 
-from codeparsers.parsers import parse_code
+from codeparsers.parsers import CssParser, HtmlParser, parse_code
+
+
+# language -> (parse_code language, graph node prefix)
+_SYMBOL_LANGS = {
+    "python": ("python", "py"),
+    "javascript": ("js", "js"),
+    "c": ("c", "c"),
+}
 
 
 def _is(path: str, *exts: str) -> bool:
@@ -12,10 +20,125 @@ def _is(path: str, *exts: str) -> bool:
     return any(p.endswith(e) for e in exts)
 
 
-def parse_project_files(files: Dict[str, str]) -> Dict[str, Any]:
+def _symbol_lang(path: str) -> str | None:
+    if _is(path, ".py"):
+        return "python"
+    if _is(path, ".js"):
+        return "javascript"
+    if _is(path, ".c", ".h"):
+        return "c"
+    return None
+
+
+def analysis_cache_key(project_id: int, version: int) -> str:
+    return f"project-analysis:{project_id}:{version}"
+
+
+class ProjectAnalyzer:
+    """
+    Incremental form of analyze_project_files: feed (path, content) pairs
+    with add() in any order and call result() once. Only the derived names
+    are kept, never file contents, so an archive can be analyzed while it
+    is read. HTML needs every CSS file, so each HTML file keeps just its
+    candidate selectors until result() matches them.
     """
-    Build a project graph from {path: content} using codeparsers.parse_code.
 
+    def __init__(self):
+        self.files: List[str] = []
+        self._seen: Set[str] = set()
+        self.symbols: Dict[str, Dict[str, DefaultDict[str, Set[str]]]] = {
+            lang: {"defs": defaultdict(set), "calls": defaultdict(set)} for lang in _SYMBOL_LANGS
+        }
+        self.css_classes: DefaultDict[str, Set[str]] = defaultdict(set)
+        self.css_ids: DefaultDict[str, Set[str]] = defaultdict(set)
+        self._css_selectors: List[Set[str]] = []          # per CSS file, ".cls" / "#id"
+        self._html_selectors: Dict[str, List[str]] = {}   # per HTML file, in first-use order
+
+    def add(self, path: str, content: str) -> None:
+        if path in self._seen:  # a repeated archive member: the first copy wins
+            return
+        self._seen.add(path)
+        self.files.append(path)
+
+        lang = _symbol_lang(path)
+        if lang is not None:
+            rel = parse_code(_SYMBOL_LANGS[lang][0], path, content, {})
+            defs, calls = self.symbols[lang]["defs"], self.symbols[lang]["calls"]
+            for d in rel.get("defined", []) + rel.get("arrow_functions", []):
+                n = d.get("name")
+                if n:
+                    defs[n].add(path)
+            for n in (rel.get("called") or {}):
+                if n:
+                    calls[n].add(path)
+
+        elif _is(path, ".css"):
+            cp = CssParser(path, content, {})
+            cp.parse()
+            for sel in cp.class_selectors:
+                if sel.startswith("."):
+                    self.css_classes[sel[1:]].add(path)
+            for sel in cp.id_selectors:
+                if sel.startswith("#"):
+                    self.css_ids[sel[1:]].add(path)
+            self._css_selectors.append(set(cp.class_selectors) | set(cp.id_selectors))
+
+        elif _is(path, ".html", ".htm"):
+            hp = HtmlParser(path, content, {})
+            hp.parse([])
+            used: Dict[str, None] = {}
+            for tag in hp.tags:  # same tokens HtmlParser._match_css looks up
+                attrs = tag["attributes"]
+                for c in (attrs.get("class") or attrs.get("className") or "").split():
+                    used.setdefault(f".{c}")
+                if attrs.get("id"):
+                    used.setdefault(f"#{attrs['id']}")
+            self._html_selectors[path] = list(used)
+
+    def result(self) -> Dict[str, Any]:
+        html: Dict[str, List[str]] = {}
+        for path, used in self._html_selectors.items():
+            matched: Dict[str, None] = {}
+            for declared in self._css_selectors:  # CSS file order, like HtmlParser.matched_css
+                for sel in used:
+                    if sel in declared:
+                        matched.setdefault(sel)
+            html[path] = list(matched)
+        return {
+            "files": list(self.files),
+            "symbols": {lang: {k: dict(v) for k, v in parts.items()} for lang, parts in self.symbols.items()},
+            "css": {"classes": dict(self.css_classes), "ids": dict(self.css_ids)},
+            "html": html,
+        }
+
+
+def analyze_project_files(files: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Parse every file exactly once and return the intermediate representation
+    both the graph and the summary are derived from:
+
+      files:   [path, ...]                      (input order)
+      symbols: {lang: {"defs":  {name: {path, ...}},
+                       "calls": {name: {path, ...}}}}   lang: python|javascript|c
+      css:     {"classes": {name: {css path, ...}}, "ids": {...}}
+      html:    {html path: [".cls" / "#id" selectors matched in project CSS]}
+
+    CSS files are parsed once and shared by every HTML file (parse_code("html")
+    would re-parse the whole CSS map per HTML file).
+    """
+    return analyze_files(files.items())
+
+
+def analyze_files(items: Iterable[Tuple[str, str]]) -> Dict[str, Any]:
+    """analyze_project_files over a stream of (path, content) pairs."""
+    analyzer = ProjectAnalyzer()
+    for path, content in items:
+        analyzer.add(path, content)
+    return analyzer.result()
+
+
+def graph_from_analysis(analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """
     Nodes:
       - file:<path>
       - py.def:<name> / js.def:<name> / c.def:<name>
@@ -29,116 +152,37 @@ def parse_project_files(files: Dict[str, str]) -> Dict[str, Any]:
     nodes: Dict[str, Dict[str, Any]] = {}
     edges: List[Dict[str, Any]] = []
 
-    # file nodes
-    for path in files:
+    for path in analysis["files"]:
         nodes.setdefault(f"file:{path}", {"id": f"file:{path}", "type": "file", "label": path})
 
-    # aggregates
-    py_defs: DefaultDict[str, Set[str]] = defaultdict(set)
-    py_calls: DefaultDict[str, Set[str]] = defaultdict(set)
-
-    js_defs: DefaultDict[str, Set[str]] = defaultdict(set)
-    js_calls: DefaultDict[str, Set[str]] = defaultdict(set)
-
-    c_defs: DefaultDict[str, Set[str]] = defaultdict(set)
-    c_calls: DefaultDict[str, Set[str]] = defaultdict(set)
-
-    css_classes: Set[str] = set()
-    css_ids: Set[str] = set()
-
-    html_results: Dict[str, Dict[str, Any]] = {}
-    css_map = {p: c for p, c in files.items() if _is(p, ".css")}
-
-    # run per-file parsers
-    for path, content in files.items():
-        if _is(path, ".py"):
-            rel = parse_code("python", path, content, files)
-            for d in rel.get("defined", []):
-                n = d.get("name")
-                if n:
-                    py_defs[n].add(path)
-            for n in (rel.get("called") or {}).keys():
-                if n:
-                    py_calls[n].add(path)
-
-        elif _is(path, ".js"):
-            rel = parse_code("js", path, content, files)
-            for d in rel.get("defined", []):
-                n = d.get("name")
-                if n:
-                    js_defs[n].add(path)
-            for d in rel.get("arrow_functions", []):
-                n = d.get("name")
-                if n:
-                    js_defs[n].add(path)
-            for n in (rel.get("called") or {}).keys():
-                if n:
-                    js_calls[n].add(path)
-
-        elif _is(path, ".c", ".h"):
-            rel = parse_code("c", path, content, files)
-            for d in rel.get("defined", []):
-                n = d.get("name")
-                if n:
-                    c_defs[n].add(path)
-            for n in (rel.get("called") or {}).keys():
-                if n:
-                    c_calls[n].add(path)
-
-        elif _is(path, ".css"):
-            rel = parse_code("css", path, content, files)
-            for cls in rel.get("class_selectors", []):
-                if cls.startswith("."):
-                    css_classes.add(cls[1:])
-            for i in rel.get("id_selectors", []):
-                if i.startswith("#"):
-                    css_ids.add(i[1:])
-
-        elif _is(path, ".html", ".htm"):
-            # pass CSS map so HtmlParser can populate matched_css
-            rel = parse_code("html", path, content, css_map)
-            html_results[path] = rel
-
     # symbol nodes
-    for n in py_defs:
-        nodes.setdefault(f"py.def:{n}", {"id": f"py.def:{n}", "type": "py.def", "label": n})
-    for n in js_defs:
-        nodes.setdefault(f"js.def:{n}", {"id": f"js.def:{n}", "type": "js.def", "label": n})
-    for n in c_defs:
-        nodes.setdefault(f"c.def:{n}", {"id": f"c.def:{n}", "type": "c.def", "label": n})
+    for lang, (_, prefix) in _SYMBOL_LANGS.items():
+        for n in analysis["symbols"][lang]["defs"]:
+            nodes.setdefault(f"{prefix}.def:{n}", {"id": f"{prefix}.def:{n}", "type": f"{prefix}.def", "label": n})
+    css_classes = analysis["css"]["classes"]
+    css_ids = analysis["css"]["ids"]
     for n in css_classes:
         nodes.setdefault(f"css.class:{n}", {"id": f"css.class:{n}", "type": "css.class", "label": f".{n}"})
     for n in css_ids:
         nodes.setdefault(f"css.id:{n}", {"id": f"css.id:{n}", "type": "css.id", "label": f"#{n}"})
 
     # defines edges
-    for n, paths in py_defs.items():
-        for p in paths:
-            edges.append({"from": f"file:{p}", "to": f"py.def:{n}", "type": "defines"})
-    for n, paths in js_defs.items():
-        for p in paths:
-            edges.append({"from": f"file:{p}", "to": f"js.def:{n}", "type": "defines"})
-    for n, paths in c_defs.items():
-        for p in paths:
-            edges.append({"from": f"file:{p}", "to": f"c.def:{n}", "type": "defines"})
+    for lang, (_, prefix) in _SYMBOL_LANGS.items():
+        for n, paths in analysis["symbols"][lang]["defs"].items():
+            for p in paths:
+                edges.append({"from": f"file:{p}", "to": f"{prefix}.def:{n}", "type": "defines"})
 
     # calls edges (simple name-based within same language)
-    for n, callers in py_calls.items():
-        if n in py_defs:
-            for p in callers:
-                edges.append({"from": f"file:{p}", "to": f"py.def:{n}", "type": "calls"})
-    for n, callers in js_calls.items():
-        if n in js_defs:
-            for p in callers:
-                edges.append({"from": f"file:{p}", "to": f"js.def:{n}", "type": "calls"})
-    for n, callers in c_calls.items():
-        if n in c_defs:
-            for p in callers:
-                edges.append({"from": f"file:{p}", "to": f"c.def:{n}", "type": "calls"})
+    for lang, (_, prefix) in _SYMBOL_LANGS.items():
+        defs = analysis["symbols"][lang]["defs"]
+        for n, callers in analysis["symbols"][lang]["calls"].items():
+            if n in defs:
+                for p in callers:
+                    edges.append({"from": f"file:{p}", "to": f"{prefix}.def:{n}", "type": "calls"})
 
     # HTML uses CSS (from HtmlParser.matched_css)
-    for html_path, rel in html_results.items():
-        for sel in (rel.get("matched_css") or {}).keys():
+    for html_path, selectors in analysis["html"].items():
+        for sel in selectors:
             if sel.startswith("."):
                 cls = sel[1:]
                 if cls in css_classes:
@@ -151,91 +195,39 @@ def parse_project_files(files: Dict[str, str]) -> Dict[str, Any]:
     return {"nodes": list(nodes.values()), "edges": edges}
 
 
-def build_project_summary(files: Dict[str, str]) -> Dict[str, Any]:
-    # aggregates
-    py_defs: DefaultDict[str, Set[str]] = defaultdict(set)
-    py_calls: DefaultDict[str, Set[str]] = defaultdict(set)
-    js_defs: DefaultDict[str, Set[str]] = defaultdict(set)
-    js_calls: DefaultDict[str, Set[str]] = defaultdict(set)
-    c_defs:  DefaultDict[str, Set[str]] = defaultdict(set)
-    c_calls: DefaultDict[str, Set[str]] = defaultdict(set)
-
-    css_classes_def: DefaultDict[str, Set[str]] = defaultdict(set)  # class -> css files
-    css_ids_def:     DefaultDict[str, Set[str]] = defaultdict(set)  # id    -> css files
+def summary_from_analysis(analysis: Dict[str, Any]) -> Dict[str, Any]:
     css_classes_use: DefaultDict[str, Set[str]] = defaultdict(set)  # class -> html files
     css_ids_use:     DefaultDict[str, Set[str]] = defaultdict(set)  # id    -> html files
     html_uses: Dict[str, Dict[str, List[str]]] = {}  # html file -> {classes, ids}
 
-    css_map = {p: c for p, c in files.items() if _is(p, ".css")}
-
-    for path, content in files.items():
-        if _is(path, ".py"):
-            rel = parse_code("python", path, content, files)
-            for d in rel.get("defined", []):
-                n = d.get("name")
-                if n: py_defs[n].add(path)
-            for n in (rel.get("called") or {}):
-                py_calls[n].add(path)
-
-        elif _is(path, ".js"):
-            rel = parse_code("js", path, content, files)
-            for d in rel.get("defined", []):
-                n = d.get("name")
-                if n: js_defs[n].add(path)
-            for d in rel.get("arrow_functions", []):
-                n = d.get("name")
-                if n: js_defs[n].add(path)
-            for n in (rel.get("called") or {}):
-                js_calls[n].add(path)
-
-        elif _is(path, ".c", ".h"):
-            rel = parse_code("c", path, content, files)
-            for d in rel.get("defined", []):
-                n = d.get("name")
-                if n: c_defs[n].add(path)
-            for n in (rel.get("called") or {}):
-                c_calls[n].add(path)
-
-        elif _is(path, ".css"):
-            rel = parse_code("css", path, content, files)
-            for sel in rel.get("class_selectors", []):
-                if sel.startswith("." ):
-                    css_classes_def[sel[1:]].add(path)
-            for sel in rel.get("id_selectors", []):
-                if sel.startswith("#"):
-                    css_ids_def[sel[1:]].add(path)
-
-        elif _is(path, ".html", ".htm"):
-            rel = parse_code("html", path, content, css_map)
-            classes, ids = [], []
-            for sel in (rel.get("matched_css") or {}):
-                if sel.startswith("."):
-                    cls = sel[1:]
-                    css_classes_use[cls].add(path)
-                    classes.append(cls)
-                elif sel.startswith("#"):
-                    i = sel[1:]
-                    css_ids_use[i].add(path)
-                    ids.append(i)
-            html_uses[path] = {"classes": sorted(set(classes)), "ids": sorted(set(ids))}
-
-    def _sym_list(lang: str, defs: dict, calls: dict) -> List[Dict[str, Any]]:
-        names = sorted(set(defs.keys()) | set(calls.keys()))
-        out = []
-        for n in names:
-            out.append({
+    for path, selectors in analysis["html"].items():
+        classes = {sel[1:] for sel in selectors if sel.startswith(".")}
+        ids = {sel[1:] for sel in selectors if sel.startswith("#")}
+        for cls in classes:
+            css_classes_use[cls].add(path)
+        for i in ids:
+            css_ids_use[i].add(path)
+        html_uses[path] = {"classes": sorted(classes), "ids": sorted(ids)}
+
+    def _sym_list(lang: str) -> List[Dict[str, Any]]:
+        defs = analysis["symbols"][lang]["defs"]
+        calls = analysis["symbols"][lang]["calls"]
+        return [
+            {
                 "language": lang,
                 "name": n,
                 "defined_in": sorted(defs.get(n, [])),
                 "called_from": sorted(calls.get(n, [])),
-            })
-        return out
+            }
+            for n in sorted(set(defs) | set(calls))
+        ]
 
     symbols: List[Dict[str, Any]] = []
-    symbols += _sym_list("python", py_defs, py_calls)
-    symbols += _sym_list("javascript", js_defs, js_calls)
-    symbols += _sym_list("c", c_defs, c_calls)
+    for lang in _SYMBOL_LANGS:
+        symbols += _sym_list(lang)
 
+    css_classes_def = analysis["css"]["classes"]
+    css_ids_def = analysis["css"]["ids"]
     styles = {
         "classes": [
             {"name": k, "defined_in_css": sorted(css_classes_def.get(k, [])),
@@ -250,12 +242,12 @@ def build_project_summary(files: Dict[str, str]) -> Dict[str, Any]:
     }
 
     return {
-        "files": sorted(files.keys()),
+        "files": sorted(analysis["files"]),
         "symbols": symbols,
         "styles": styles,
         "html_usage": [{"file": f, **html_uses[f]} for f in sorted(html_uses.keys())],
         "totals": {
-            "files": len(files),
+            "files": len(analysis["files"]),
             "symbols": len(symbols),
             "css_classes": len(styles["classes"]),
             "css_ids": len(styles["ids"]),
@@ -263,6 +255,15 @@ def build_project_summary(files: Dict[str, str]) -> Dict[str, Any]:
     }
 
 
+def parse_project_files(files: Dict[str, str]) -> Dict[str, Any]:
+    """Build a project graph from {path: content} using codeparsers.parse_code."""
+    return graph_from_analysis(analyze_project_files(files))
+
+
+def build_project_summary(files: Dict[str, str]) -> Dict[str, Any]:
+    return summary_from_analysis(analyze_project_files(files))
+
+
 # Optional compatibility alias
 def parse_project(files: Dict[str, str]) -> Dict[str, Any]:
     return parse_project_files(files)
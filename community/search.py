@@ -0,0 +1,233 @@
+# community/search.py
+from __future__ import annotations
+
+import fnmatch
+import os
+import re
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Any, DefaultDict, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+from django.db.models.lookups import Contains
+
+from .models import ProjectFile, ProjectStats
+
+try:  # Python 3.11+
+    from re import _parser as _sre_parse
+except ImportError:  # pragma: no cover
+    import sre_parse as _sre_parse  # type: ignore[no-redef]
+
+SNIPPET_MAX_CHARS = 240
+FETCH_CHUNK = 200  # rows whose content is loaded per query while scanning
+
+
+class SearchQueryError(ValueError):
+    """Raised for queries we cannot run (empty, bad regex, ...)."""
+
+
+# -------------------------
+# Query helpers
+# -------------------------
+
+def compile_query(query: str, regex: bool = False, ignore_case: bool = False) -> re.Pattern:
+    if not query:
+        raise SearchQueryError("Empty query")
+    flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+    try:
+        return re.compile(query if regex else re.escape(query), flags)
+    except re.error as e:
+        raise SearchQueryError(f"Invalid regex: {e}") from e
+
+
+def required_literals(query: str, regex: bool = False) -> List[str]:
+    """
+    Substrings every match must contain. Used to narrow candidate files
+    before running the real pattern. For regexes only top-level literal runs
+    count (anything inside groups, repeats or alternations is skipped), so the
+    result is always safe - possibly empty, never wrong.
+    """
+    if not regex:
+        return [query]
+    try:
+        parsed = _sre_parse.parse(query)
+    except Exception:
+        return []
+    out: List[str] = []
+    run: List[str] = []
+    for op, arg in parsed:
+        if op is _sre_parse.LITERAL:
+            run.append(chr(arg))
+            continue
+        if run:
+            out.append("".join(run))
+            run = []
+    if run:
+        out.append("".join(run))
+    return out
+
+
+def glob_prefix(globs: Iterable[str]) -> str:
+    """Longest literal path prefix shared by all globs (for an indexed startswith)."""
+    heads = [re.split(r"[*?\[]", g, maxsplit=1)[0] for g in globs]
+    return os.path.commonprefix(heads) if heads else ""
+
+
+def path_matches(path: str, globs: List[str]) -> bool:
+    return not globs or any(fnmatch.fnmatchcase(path, g) for g in globs)
+
+
+# -------------------------
+# Pure-Python trigram index (non-Postgres fallback)
+# -------------------------
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """
+    Inverted index trigram -> file ids for one project. Content is lowercased
+    so the same index serves case-sensitive and -insensitive queries (the
+    real pattern is always re-checked against the content).
+    """
+
+    def __init__(self, rows: Iterable[Tuple[int, str, str]]):
+        self.paths: Dict[int, str] = {}
+        self.postings: DefaultDict[str, Set[int]] = defaultdict(set)
+        for pk, path, content in rows:
+            self.paths[pk] = path
+            for gram in _trigrams((content or "").lower()):
+                self.postings[gram].add(pk)
+
+    def candidates(self, literals: List[str]) -> Optional[Set[int]]:
+        """Ids that may contain all literals, or None when nothing can be narrowed."""
+        result: Optional[Set[int]] = None
+        for lit in literals:
+            grams = _trigrams(lit.lower())
+            if not grams:
+                continue  # shorter than a trigram: no help
+            for gram in grams:
+                ids = self.postings.get(gram, set())
+                result = set(ids) if result is None else (result & ids)
+                if not result:
+                    return set()
+        return result
+
+
+_INDEXES: "OrderedDict[int, Tuple[int, TrigramIndex]]" = OrderedDict()  # project -> (version, index)
+_INDEX_LOCK = threading.Lock()
+
+
+def _index_cache_size() -> int:
+    return int(getattr(settings, "CODE_SEARCH_INDEX_CACHE_SIZE", 8))
+
+
+def get_index(project_id: int) -> TrigramIndex:
+    """Cached per project and rebuilt whenever ProjectStats.version moved."""
+    version = ProjectStats.version_for(project_id)
+    with _INDEX_LOCK:
+        entry = _INDEXES.get(project_id)
+        if entry is not None and entry[0] == version:
+            _INDEXES.move_to_end(project_id)
+            return entry[1]
+    rows = (ProjectFile.objects.filter(project_id=project_id)
+            .values_list("id", "path", "content")
+            .iterator(chunk_size=FETCH_CHUNK))
+    index = TrigramIndex(rows)
+    with _INDEX_LOCK:
+        _INDEXES[project_id] = (version, index)
+        _INDEXES.move_to_end(project_id)
+        while len(_INDEXES) > _index_cache_size():
+            _INDEXES.popitem(last=False)
+    return index
+
+
+# -------------------------
+# Search
+# -------------------------
+
+class ILikeContains(Contains):
+    """
+    content ILIKE '%lit%'. icontains compiles to UPPER(content) LIKE UPPER(...)
+    on Postgres, which a gin_trgm_ops index on plain `content` cannot serve.
+    """
+    lookup_name = "ilike_contains"
+
+    def get_rhs_op(self, connection, rhs):
+        return "ILIKE %s" % rhs
+
+
+def _candidates(project_id: int, literals: List[str], ignore_case: bool, globs: List[str]) -> List[Tuple[str, int]]:
+    """(path, id) pairs worth scanning, sorted by path."""
+    prefix = glob_prefix(globs)
+    if connection.vendor == "postgresql":
+        # LIKE/ILIKE '%lit%' is served by the pg_trgm GIN index (migration 0004)
+        qs = ProjectFile.objects.filter(project_id=project_id)
+        for lit in literals:
+            qs = qs.filter(ILikeContains(F("content"), lit) if ignore_case else Contains(F("content"), lit))
+        if prefix:
+            qs = qs.filter(path__startswith=prefix)
+        pairs = list(qs.order_by("path").values_list("path", "id"))
+    else:
+        index = get_index(project_id)
+        ids = index.candidates(literals)
+        if ids is None:
+            ids = index.paths.keys()
+        pairs = sorted((index.paths[pk], pk) for pk in ids if index.paths[pk].startswith(prefix))
+    return [(path, pk) for path, pk in pairs if path_matches(path, globs)]
+
+
+def _snippet(line: str, start: int, end: int) -> Tuple[str, int, int]:
+    if len(line) <= SNIPPET_MAX_CHARS:
+        return line, start, end
+    lo = max(0, min(start - SNIPPET_MAX_CHARS // 4, len(line) - SNIPPET_MAX_CHARS))
+    hi = lo + SNIPPET_MAX_CHARS
+    return line[lo:hi], start - lo, min(end, hi) - lo
+
+
+def file_hits(path: str, content: str, pattern: re.Pattern) -> Iterator[Dict[str, Any]]:
+    """One hit per matching line: 1-based line number plus the match span inside the snippet."""
+    line_no, pos, last_line = 1, 0, 0
+    for m in pattern.finditer(content):
+        start = m.start()
+        line_no += content.count("\n", pos, start)
+        pos = start
+        if line_no == last_line:
+            continue
+        last_line = line_no
+        ls = content.rfind("\n", 0, start) + 1
+        le = content.find("\n", start)
+        if le == -1:
+            le = len(content)
+        text, s, e = _snippet(content[ls:le], start - ls, min(m.end(), le) - ls)
+        yield {"path": path, "line": line_no, "snippet": text, "match": {"start": s, "end": e}}
+
+
+def search_project(project_id: int, query: str, *, regex: bool = False, ignore_case: bool = False,
+                   globs: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Validate the query and return a lazy iterator of hits in path/line order.
+    Raises SearchQueryError up front; no DB work happens until iteration.
+    """
+    pattern = compile_query(query, regex, ignore_case)
+    literals = required_literals(query, regex)
+    # inline flags like (?i) make literal narrowing case-insensitive too
+    loose = bool(pattern.flags & re.IGNORECASE)
+    return _iter_hits(project_id, pattern, literals, loose, [g for g in (globs or []) if g])
+
+
+def _iter_hits(project_id: int, pattern: re.Pattern, literals: List[str], loose: bool,
+               globs: List[str]) -> Iterator[Dict[str, Any]]:
+    # Content is loaded FETCH_CHUNK candidate rows at a time, so a caller that
+    # stops early (paging, streaming client gone) never reads the rest.
+    candidates = _candidates(project_id, literals, loose, globs)
+    for i in range(0, len(candidates), FETCH_CHUNK):
+        chunk = candidates[i:i + FETCH_CHUNK]
+        contents = dict(ProjectFile.objects.filter(id__in=[pk for _, pk in chunk]).values_list("id", "content"))
+        for path, pk in chunk:
+            content = contents.get(pk)
+            if content:
+                yield from file_hits(path, content, pattern)
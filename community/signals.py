@@ -1,8 +1,42 @@
-from django.db.models.signals import post_save
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from .models import Project
+from .export import purge_export_cache
+from .models import Project, ProjectFile, ProjectStats
 
 @receiver(post_save, sender=Project)
 def add_creator_as_participant(sender, instance: Project, created: bool, **kwargs):
     if created:
         instance.participants.add(instance.creator)
+        ProjectStats.objects.get_or_create(project=instance)
+
+_stats_rebuilt_by_caller = ContextVar("stats_rebuilt_by_caller", default=False)
+
+@contextmanager
+def stats_rebuilt_by_caller():
+    """
+    Deletes of ProjectFile rows inside this block leave ProjectStats alone:
+    for bulk paths that call ProjectStats.rebuild once when they are done.
+    post_delete still fires for every row; only the stats update is skipped.
+    """
+    token = _stats_rebuilt_by_caller.set(True)
+    try:
+        yield
+    finally:
+        _stats_rebuilt_by_caller.reset(token)
+
+@receiver(post_delete, sender=ProjectFile)
+def drop_file_from_stats(sender, instance: ProjectFile, origin=None, **kwargs):
+    if _stats_rebuilt_by_caller.get():
+        return
+    # deleting the whole project cascades to its stats row; nothing to keep in step
+    if isinstance(origin, Project) or (isinstance(origin, QuerySet) and origin.model is Project):
+        return
+    ProjectStats.apply_change(instance.project_id, instance.rollup(), None, instance.path)
+
+@receiver(post_delete, sender=Project)
+def drop_export_cache(sender, instance: Project, **kwargs):
+    purge_export_cache(instance.pk)
@@ -0,0 +1,63 @@
+import io
+import tarfile
+import zipfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+from community.parsing import build_project_summary, parse_project_files
+
+# no django_db mark: any query in these tests fails them
+
+FILES = {
+    "app/main.py": "def main():\n    helper()\n",
+    "app/util.py": "def helper():\n    pass\n",
+    "web/site.css": ".btn { color: red; }\n#hero { margin: 0; }\n",
+    "web/index.html": '<div id="hero"><a class="btn">go</a></div>\n',
+    "web/app.js": "function start(){ main(); }\n",
+}
+
+
+def _zip(files):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as z:
+        for name, text in files.items():
+            z.writestr(name, text)
+        z.writestr("logo.png", b"\x89PNG\x00\x01")
+    return buf.getvalue()
+
+
+def _tar(files):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz") as tf:
+        for name, text in files.items():
+            data = text.encode()
+            info = tarfile.TarInfo(f"./{name}")
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+def test_zip_graph_matches_project_parser(client):
+    r = client.post(reverse("community:analyze-archive"), {"file": SimpleUploadedFile("a.zip", _zip(FILES))})
+    assert r.status_code == 200
+    assert r.json() == {"graph": parse_project_files(FILES)}
+    ids = {n["id"] for n in r.json()["graph"]["nodes"]}
+    assert {"py.def:main", "py.def:helper", "css.class:btn", "css.id:hero"} <= ids
+
+
+def test_raw_tar_summary(client):
+    url = reverse("community:analyze-archive") + "?view=summary"
+    r = client.post(url, data=_tar(FILES), content_type="application/gzip")
+    assert r.status_code == 200
+    summary = r.json()["summary"]
+    assert summary == build_project_summary(FILES)
+    assert summary["html_usage"] == [{"file": "web/index.html", "classes": ["btn"], "ids": ["hero"]}]
+
+
+def test_bad_requests(client):
+    url = reverse("community:analyze-archive")
+    assert client.post(url).status_code == 400
+    assert client.post(url + "?view=nope", {"file": SimpleUploadedFile("a.zip", _zip(FILES))}).status_code == 400
+    r = client.post(url, data=b"not an archive at all", content_type="application/octet-stream")
+    assert r.status_code == 400
@@ -0,0 +1,87 @@
+import json
+import pytest
+from django.db.models import F
+from django.urls import reverse
+
+from community.models import Project, User, ProjectFile
+from community.search import ILikeContains, TrigramIndex, required_literals, search_project
+
+pytestmark = pytest.mark.django_db
+
+
+def _project():
+    u = User.objects.create_user(username="alice", password="x")
+    p = Project.objects.create(name="searchproj", creator=u)
+    ProjectFile.objects.create(project=p, path="src/app.py", content="import os\n\ndef handler(event):\n    return Handler(event)\n")
+    ProjectFile.objects.create(project=p, path="src/util.py", content="def helper():\n    pass\n")
+    ProjectFile.objects.create(project=p, path="web/app.js", content="function handler(){}\nhandler();\n")
+    return p
+
+
+def test_substring_search_with_line_numbers(client):
+    p = _project()
+    url = reverse("community:project-code-search", args=[p.id])
+    r = client.get(url, {"q": "handler"})
+    assert r.status_code == 200
+    data = r.json()
+    hits = [(h["path"], h["line"]) for h in data["results"]]
+    # case-sensitive by default, ordered by path then line
+    assert hits == [("src/app.py", 3), ("web/app.js", 1), ("web/app.js", 2)]
+    first = data["results"][0]
+    assert first["snippet"][first["match"]["start"]:first["match"]["end"]] == "handler"
+    assert data["has_more"] is False
+
+
+def test_ignore_case_regex_and_path_filter(client):
+    p = _project()
+    url = reverse("community:project-code-search", args=[p.id])
+    r = client.get(url, {"q": r"handler\(event\)", "regex": "1", "ignore_case": "1", "path": "src/*.py"})
+    assert r.status_code == 200
+    assert [(h["path"], h["line"]) for h in r.json()["results"]] == [("src/app.py", 3), ("src/app.py", 4)]
+
+
+def test_paging_and_stream(client):
+    p = _project()
+    url = reverse("community:project-code-search", args=[p.id])
+    r = client.get(url, {"q": "handler", "per_page": 2, "page": 1})
+    assert r.json()["has_more"] is True
+    r = client.get(url, {"q": "handler", "per_page": 2, "page": 2})
+    assert [(h["path"], h["line"]) for h in r.json()["results"]] == [("web/app.js", 2)]
+
+    r = client.get(url, {"q": "def", "stream": "1"})
+    assert r["Content-Type"] == "application/x-ndjson"
+    lines = [json.loads(x) for x in b"".join(r.streaming_content).decode().splitlines()]
+    assert [h["path"] for h in lines] == ["src/app.py", "src/util.py"]
+
+
+def test_bad_queries_400(client):
+    p = _project()
+    url = reverse("community:project-code-search", args=[p.id])
+    assert client.get(url).status_code == 400
+    assert client.get(url, {"q": "(", "regex": "1"}).status_code == 400
+
+
+def test_index_sees_edits():
+    p = _project()
+    assert list(search_project(p.id, "brand_new")) == []
+    pf = ProjectFile.objects.get(project=p, path="src/util.py")
+    pf.content = "brand_new = 1\n"
+    pf.save()
+    assert [h["path"] for h in search_project(p.id, "brand_new")] == ["src/util.py"]
+
+
+def test_required_literals_and_trigram_candidates():
+    assert required_literals("foo.bar", regex=False) == ["foo.bar"]
+    assert required_literals(r"foo\.bar(x|y)baz", regex=True) == ["foo.bar", "baz"]
+    assert required_literals("a|b", regex=True) == []
+
+    index = TrigramIndex([(1, "a.py", "Hello World"), (2, "b.py", "goodbye")])
+    assert index.candidates(["world"]) == {1}
+    assert index.candidates(["xyz"]) == set()
+    assert index.candidates(["ab"]) is None  # too short to narrow
+
+
+def test_ignore_case_candidates_use_ilike():
+    # the trigram index is on plain `content`: UPPER(content) LIKE ... would bypass it
+    sql = str(ProjectFile.objects.filter(ILikeContains(F("content"), "a_%b")).query)
+    assert 'ILIKE %a\\_\\%b%' in sql and "UPPER" not in sql
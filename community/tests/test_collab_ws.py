@@ -0,0 +1,196 @@
+import asyncio
+import random
+
+import pytest
+from asgiref.sync import sync_to_async
+from channels.testing import WebsocketCommunicator
+from rest_framework_simplejwt.tokens import AccessToken
+
+from community import collab
+from community.collab import OpError, apply, transform
+from flowchart.asgi import application
+from community.models import Project, ProjectFile, User
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def _random_op(rnd, text):
+    op, pos = [], 0
+    while pos < len(text):
+        n = rnd.randint(1, len(text) - pos)
+        op.append(n if rnd.random() < 0.6 else -n)
+        if rnd.random() < 0.4:
+            op.append(rnd.choice(["x", "yz", "é😀"]))
+        pos += n
+    if rnd.random() < 0.5:
+        op.append("end")
+    return collab.normalize(op)
+
+
+def test_transform_converges():
+    rnd = random.Random(3)
+    for _ in range(300):
+        text = "".join(rnd.choice("abc\n") for _ in range(rnd.randint(0, 20)))
+        a, b = _random_op(rnd, text), _random_op(rnd, text)
+        a1, b1 = transform(a, b)
+        assert apply(apply(text, a), b1) == apply(apply(text, b), a1)
+
+    assert transform(["x", 2], ["y", 2]) == (["x", 3], [1, "y", 2])  # a's insert goes first
+    with pytest.raises(OpError):
+        apply("abc", [2])
+    with pytest.raises(OpError):
+        collab.normalize([1, 0])
+
+
+def _proj_with_file():
+    u = User.objects.create_user(username="co", password="x")
+    p = Project.objects.create(name="co", creator=u)
+    ProjectFile.objects.create(project=p, path="src/a.py", content="x = 1\n")
+    return u, p
+
+
+async def _open(user, p, path="src/a.py"):
+    token = str(AccessToken.for_user(user))
+    comm = WebsocketCommunicator(application, f"/ws/projects/{p.id}/files/{path}/?token={token}")
+    connected, code = await comm.connect()
+    return comm, connected, code
+
+
+def _content(p):
+    return ProjectFile.objects.get(project=p, path="src/a.py").content
+
+
+@pytest.mark.asyncio
+async def test_concurrent_edits_merge_and_save_once_on_leave(settings):
+    settings.CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+    settings.COLLAB_SAVE_DELAY = 60
+    u, p = await sync_to_async(_proj_with_file)()
+
+    a, ok, _ = await _open(u, p)
+    assert ok and await a.receive_json_from() == {"type": "doc.init", "rev": 0, "content": "x = 1\n"}
+    b, ok, _ = await _open(u, p)
+    assert ok and (await b.receive_json_from())["rev"] == 0
+
+    # both edit revision 0; b's op arrives after a's was applied
+    await a.send_json_to({"type": "op", "rev": 0, "op": ["# a\n", 6]})
+    assert await a.receive_json_from() == {"type": "ack", "rev": 1}
+    await b.send_json_to({"type": "op", "rev": 0, "op": [4, -1, "2", 1]})
+    assert (await b.receive_json_from())["op"] == ["# a\n", 6]
+    assert await b.receive_json_from() == {"type": "ack", "rev": 2}
+    moved = await a.receive_json_from()
+    assert moved["rev"] == 2 and moved["op"] == [8, "2", -1, 1]  # shifted past a's insert, in canonical order
+
+    for i in range(20):
+        await a.send_json_to({"type": "op", "rev": 2 + i, "op": [10 + i, "."]})
+        assert (await a.receive_json_from())["type"] == "ack"
+    assert await sync_to_async(_content)(p) == "x = 1\n"  # nothing written while editing
+
+    await a.disconnect()
+    assert await sync_to_async(_content)(p) == "x = 1\n"  # b is still there
+    await b.disconnect()
+    assert await sync_to_async(_content)(p) == "# a\nx = 2\n" + "." * 20
+
+
+@pytest.mark.asyncio
+async def test_debounced_save_and_rejections(settings):
+    settings.CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+    settings.COLLAB_SAVE_DELAY = 0.05
+    u, p = await sync_to_async(_proj_with_file)()
+    other = await sync_to_async(User.objects.create_user)(username="outsider", password="x")
+
+    _, ok, code = await _open(other, p)
+    assert not ok and code == 4001
+    _, ok, code = await _open(u, p, "nope.py")
+    assert not ok and code == 4004
+
+    a, ok, _ = await _open(u, p)
+    await a.receive_json_from()
+    await a.send_json_to({"type": "op", "rev": 0, "op": [6, "y = 2\n"]})
+    await a.receive_json_from()
+    await asyncio.sleep(0.3)
+    assert await sync_to_async(_content)(p) == "x = 1\ny = 2\n"
+
+    await a.send_json_to({"type": "op", "rev": 0, "op": [3]})  # does not fit the document
+    assert (await a.receive_json_from())["type"] == "error"
+    resync = await a.receive_json_from()
+    assert resync == {"type": "doc.init", "rev": 1, "content": "x = 1\ny = 2\n"}
+    await a.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_outside_save_wins_and_editors_reload(settings):
+    settings.CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+    settings.COLLAB_SAVE_DELAY = 60
+    u, p = await sync_to_async(_proj_with_file)()
+
+    a, _, _ = await _open(u, p)
+    await a.receive_json_from()
+    await a.send_json_to({"type": "op", "rev": 0, "op": [6, "y = 2\n"]})
+    assert (await a.receive_json_from())["type"] == "ack"
+
+    def upload():
+        pf = ProjectFile.objects.get(project=p, path="src/a.py")
+        pf.content = "uploaded\n"
+        pf.save(update_fields=["content"])
+    await sync_to_async(upload)()
+
+    doc = collab._documents[(p.id, "src/a.py")]
+    await doc.flush()
+    assert await sync_to_async(_content)(p) == "uploaded\n"
+    assert await a.receive_json_from() == {"type": "doc.init", "rev": 2, "content": "uploaded\n"}
+
+    # an op against the old text is refused; one against the reload is saved
+    await a.send_json_to({"type": "op", "rev": 1, "op": [12, "!"]})
+    assert (await a.receive_json_from())["type"] == "error"
+    assert (await a.receive_json_from())["rev"] == 2
+    await a.send_json_to({"type": "op", "rev": 2, "op": [9, "!"]})
+    assert (await a.receive_json_from())["type"] == "ack"
+    await a.disconnect()
+    assert await sync_to_async(_content)(p) == "uploaded\n!"
+
+
+def test_offsets_are_utf16_units_like_ot_js():
+    text = "a😀b\n"  # ot.js sees length 5: the emoji is a surrogate pair
+    assert collab.units(text) == 5
+    assert apply(text, [3, "!", 2]) == "a😀!b\n"
+    assert apply(text, [1, -2, 2]) == "ab\n"
+    with pytest.raises(OpError):
+        apply(text, [4, "!"])  # code points: one unit short
+    with pytest.raises(OpError):
+        apply(text, [2, "!", 3])  # between the two halves of the emoji
+    with pytest.raises(OpError):
+        collab.normalize(["\ud83d"])
+    a, b = ["😀", 5], [3, -1, 1]
+    a1, b1 = transform(a, b)
+    assert b1 == [5, -1, 1] and apply(apply(text, a), b1) == apply(apply(text, b), a1) == "😀a😀\n"
+
+
+@pytest.mark.asyncio
+async def test_failed_saves_are_retried_and_keep_the_document(settings, monkeypatch):
+    settings.CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+    settings.COLLAB_SAVE_DELAY = 0.05
+    u, p = await sync_to_async(_proj_with_file)()
+    real, failures = collab._persist, []
+
+    async def flaky(*args):
+        if len(failures) < 2:
+            failures.append(1)
+            raise RuntimeError("database is down")
+        return await real(*args)
+
+    monkeypatch.setattr(collab, "_persist", flaky)
+    a, _, _ = await _open(u, p)
+    await a.receive_json_from()
+    await a.send_json_to({"type": "op", "rev": 0, "op": [6, "🙂\n"]})
+    await a.receive_json_from()
+    await asyncio.sleep(0.02)
+    await a.disconnect()  # the timer's save is pending; this one fails too
+    key = (p.id, "src/a.py")
+    assert key in collab._documents and await sync_to_async(_content)(p) == "x = 1\n"
+
+    for _ in range(50):
+        await asyncio.sleep(0.05)
+        if key not in collab._documents:
+            break
+    assert len(failures) == 2 and key not in collab._documents
+    assert await sync_to_async(_content)(p) == "x = 1\n🙂\n"
@@ -47,7 +47,7 @@ def test_upload_zip__graph_created__list_files__download_zip(client):
     dl = client.get(url_dl)
     assert dl.status_code == 200
     assert dl["Content-Type"] == "application/zip"
-    with zipfile.ZipFile(io.BytesIO(dl.content)) as zf:
+    with zipfile.ZipFile(io.BytesIO(b"".join(dl.streaming_content))) as zf:
         names = set(zf.namelist())
         assert names == set(files.keys())
         assert zf.read("src/app.py").decode("utf-8").startswith('print("hello")')
@@ -33,7 +33,7 @@ def test_download_project_returns_zip(client, project):
     assert resp.status_code == 200
     assert resp["Content-Type"] == "application/zip"
     # Inspect zip contents
-    zdata = io.BytesIO(resp.content)
+    zdata = io.BytesIO(b"".join(resp.streaming_content))
     with zipfile.ZipFile(zdata) as zf:
         names = set(zf.namelist())
     assert {"README.md", "src/app.py"} <= names
@@ -0,0 +1,121 @@
+import io
+import os
+import zipfile
+
+import pytest
+from django.urls import reverse
+
+from community import export
+from community.export import ZipStreamWriter, compress_member, iter_project_zip, DEFLATED, STORED
+from community.models import Project, User, ProjectFile, ProjectStats
+
+pytestmark = pytest.mark.django_db
+
+
+def _project(n=30):
+    u = User.objects.create_user(username="exp", password="x")
+    p = Project.objects.create(name="exportproj", creator=u)
+    for i in range(n):
+        ProjectFile.objects.create(project=p, path=f"src/m{i:03}.py", content=f"def f{i}():\n    return {i}\n" * 20)
+    ProjectFile.objects.create(project=p, path="docs/ünï.md", content="héllo\n")
+    return p
+
+
+def _read(data):
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.testzip() is None
+        return {i.filename: (i.compress_type, zf.read(i).decode()) for i in zf.infolist()}
+
+
+@pytest.mark.parametrize("compression,method", [("deflate", DEFLATED), ("stored", STORED)])
+@pytest.mark.parametrize("workers", [1, 3])
+def test_iter_project_zip_roundtrip(compression, method, workers):
+    p = _project()
+    chunks = list(iter_project_zip(p.id, compression=compression, workers=workers))
+    assert len(chunks) == 32  # one chunk per member plus the central directory
+    files = _read(b"".join(chunks))
+    assert list(files)[0] == "docs/ünï.md"  # ordered by path
+    assert files["src/m007.py"] == (method, "def f7():\n    return 7\n" * 20)
+    assert files["docs/ünï.md"][1] == "héllo\n"
+
+
+def test_writer_empty_archive():
+    assert _read(ZipStreamWriter().finish()) == {}
+    w = ZipStreamWriter()
+    data = w.member(*compress_member("a.txt", "", DEFLATED, 9)) + w.finish()
+    assert _read(data) == {"a.txt": (DEFLATED, "")}
+
+
+def test_download_params(client):
+    p = _project(n=2)
+    url = reverse("community:project-download-zip", args=[p.id])
+    r = client.get(url, {"compression": "stored"})
+    assert r.status_code == 200 and r.streaming
+    assert {m for m, _ in _read(b"".join(r.streaming_content)).values()} == {STORED}
+    assert client.get(url, {"compression": "bzip2"}).status_code == 400
+    assert client.get(url, {"level": "12"}).status_code == 400
+
+
+def test_download_is_cached_per_content_version(client, settings, django_assert_max_num_queries):
+    p = _project(n=3)
+    url = reverse("community:project-download-zip", args=[p.id])
+
+    first = client.get(url)
+    body = b"".join(first.streaming_content)
+    etag = first["ETag"]
+    assert (settings.EXPORT_CACHE_DIR / str(p.id)).is_dir()
+
+    # second request: served from disk, no file rows read
+    with django_assert_max_num_queries(2):
+        again = client.get(url)
+    assert again["ETag"] == etag and again["Accept-Ranges"] == "bytes"
+    assert int(again["Content-Length"]) == len(body)
+    assert b"".join(again.streaming_content) == body
+
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    # an edit moves the version: new ETag, new content, old artifact dropped
+    pf = ProjectFile.objects.get(project=p, path="src/m000.py")
+    pf.content = "changed\n"
+    pf.save()
+    fresh = client.get(url)
+    assert fresh["ETag"] != etag
+    assert _read(b"".join(fresh.streaming_content))["src/m000.py"][1] == "changed\n"
+    assert len(list((settings.EXPORT_CACHE_DIR / str(p.id)).glob("*.zip"))) == 1
+
+    p.delete()
+    assert not (settings.EXPORT_CACHE_DIR / str(p.id)).exists()
+
+
+def test_rebuilds_of_a_version_are_byte_identical(monkeypatch):
+    p = _project(n=3)
+    version = ProjectStats.objects.get(project_id=p.id).version
+    path = export.build_artifact(p.id, version)
+    with open(path, "rb") as f:
+        first = f.read()
+
+    # the cached file is lost and rebuilt a day later: same bytes, so a resumed Range still fits
+    os.remove(path)
+    later = export.time.time() + 86400
+    monkeypatch.setattr(export.time, "time", lambda: later)
+    with open(export.build_artifact(p.id, version), "rb") as f:
+        assert f.read() == first
+
+
+def test_download_ranges(client):
+    p = _project(n=3)
+    url = reverse("community:project-download-zip", args=[p.id])
+    # a Range on a cold cache builds the artifact first
+    r = client.get(url, HTTP_RANGE="bytes=10-19")
+    assert r.status_code == 206
+    full = b"".join(client.get(url).streaming_content)
+    assert b"".join(r.streaming_content) == full[10:20]
+    assert r["Content-Range"] == f"bytes 10-19/{len(full)}"
+
+    r = client.get(url, HTTP_RANGE="bytes=-5")
+    assert b"".join(r.streaming_content) == full[-5:]
+    r = client.get(url, HTTP_RANGE=f"bytes={len(full)}-")
+    assert r.status_code == 416 and r["Content-Range"] == f"bytes */{len(full)}"
+    # If-Range with a stale validator gets the whole file
+    r = client.get(url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"')
+    assert r.status_code == 200 and b"".join(r.streaming_content) == full
@@ -0,0 +1,89 @@
+import json
+
+import pytest
+from django.urls import reverse
+
+from community.edits import EditError, apply_text_edits
+from community.models import Project, ProjectFile, User, content_hash
+
+pytestmark = pytest.mark.django_db
+
+
+def _edit(sl, sc, el, ec, text):
+    return {"range": {"start": {"line": sl, "character": sc}, "end": {"line": el, "character": ec}}, "newText": text}
+
+
+def test_apply_text_edits_like_lsp():
+    text = "def a():\n    return 1\r\nx = 'é😀z'\n"
+    # ranges refer to the original text, whatever order they come in
+    out = apply_text_edits(text, [_edit(1, 11, 1, 12, "2"), _edit(0, 4, 0, 5, "b")])
+    assert out == "def b():\n    return 2\r\nx = 'é😀z'\n"
+    # utf-16: the emoji is two code units, so "z" sits at character 8
+    assert apply_text_edits(text, [_edit(2, 8, 2, 9, "Z")]) == text.replace("z'", "Z'")
+    assert apply_text_edits(text, [_edit(2, 7, 2, 8, "Z")], "utf-32") == text.replace("z'", "Z'")
+    # inserts at one position keep their order; positions past the end clamp
+    assert apply_text_edits("ab", [_edit(0, 1, 0, 1, "1"), _edit(0, 1, 0, 1, "2")]) == "a12b"
+    assert apply_text_edits("ab\n", [_edit(0, 99, 0, 99, "!"), _edit(9, 0, 9, 0, "end")]) == "ab!\nend"
+
+    with pytest.raises(EditError):
+        apply_text_edits(text, [_edit(0, 0, 0, 5, ""), _edit(0, 3, 0, 4, "")])
+    with pytest.raises(EditError):
+        apply_text_edits(text, [{"range": {"start": {"line": -1, "character": 0}, "end": {}}, "newText": ""}])
+
+
+@pytest.fixture
+def pf():
+    u = User.objects.create_user(username="ed", password="x")
+    p = Project.objects.create(name="ed", creator=u)
+    return ProjectFile.objects.create(project=p, path="src/big.py", content="".join(f"v{i} = {i}\n" for i in range(5000)))
+
+
+def _patch(client, pf, body, etag=None, query=""):
+    url = reverse("community:project-file-detail", args=[pf.project_id, pf.path]) + query
+    headers = {"HTTP_IF_MATCH": etag} if etag else {}
+    return client.patch(url, data=json.dumps(body), content_type="application/json", **headers)
+
+
+def test_patch_edits_against_if_match(client, pf):
+    base = pf.content_hash
+    r = _patch(client, pf, {"edits": [_edit(4999, 8, 4999, 12, "last")]}, etag=base)
+    assert r.status_code == 200, r.content
+    data = r.json()
+    assert data["saved"] is True and "content" not in data
+
+    stored = ProjectFile.objects.get(pk=pf.pk)
+    assert stored.content.endswith("v4999 = last\n")
+    assert r["ETag"] == stored.content_hash == content_hash(stored.content)
+
+    # the old base is stale now
+    r = _patch(client, pf, {"edits": [_edit(0, 0, 0, 0, "#")]}, etag=base)
+    assert r.status_code == 412 and r["ETag"] == stored.content_hash
+
+
+def test_patch_edits_needs_if_match_and_valid_edits(client, pf):
+    assert _patch(client, pf, {"edits": []}).status_code == 428
+    assert _patch(client, pf, {"edits": "nope"}, etag=pf.content_hash).status_code == 400
+    r = _patch(client, pf, {"edits": [_edit(0, 0, 0, 0, "# x\n")]}, etag=pf.content_hash, query="?preview=1")
+    assert r.json()["saved"] is False
+    assert ProjectFile.objects.get(pk=pf.pk).content == pf.content
+
+
+def test_patch_with_content_still_replaces(client, pf):
+    r = _patch(client, pf, {"content": "x = 1"})
+    assert r.status_code == 200 and r.json()["content"] == "x = 1\n"
+
+
+def test_patch_edits_lose_to_a_save_made_while_formatting(client, pf, monkeypatch):
+    from community import views
+
+    def format_slowly(path, text):
+        # another writer saves the file while this request is formatting, unlocked
+        other = ProjectFile.objects.get(pk=pf.pk)
+        other.content = "uploaded = True\n"
+        other.save(update_fields=["content"])
+        return text, "black"
+
+    monkeypatch.setattr(views, "format_for_path", format_slowly)
+    r = _patch(client, pf, {"edits": [_edit(0, 0, 0, 0, "# x\n")]}, etag=pf.content_hash, query="?format=1")
+    assert r.status_code == 412 and r["ETag"] == content_hash("uploaded = True\n")
+    assert ProjectFile.objects.get(pk=pf.pk).content == "uploaded = True\n"
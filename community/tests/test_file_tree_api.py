@@ -6,7 +6,7 @@ import pytest
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
 
-from community.models import Project, User, ProjectFile
+from community.models import Project, ProjectDir, ProjectFile, ProjectStats, User
 
 
 pytestmark = pytest.mark.django_db
@@ -135,3 +135,108 @@ def test_tree_from_github_import(client, monkeypatch):
 
     api = _find_child(tree, "api", "dir"); assert api
     assert _find_child(api, "server.py", "file")
+
+
+def _lazy(client, p, **params):
+    r = client.get(reverse("community:project-file-tree", args=[p.id]), params)
+    assert r.status_code == 200, r.content
+    return r.json()
+
+
+def test_lazy_listing_returns_immediate_children_with_counts(client):
+    u = User.objects.create_user(username="lazy", password="x")
+    p = Project.objects.create(name="mono", creator=u)
+    up = reverse("community:project-upload-zip", args=[p.id])
+    client.post(up, {"file": SimpleUploadedFile("m.zip", _build_zip({
+        "README.md": "r\n",
+        "src/app.py": "x\n",
+        "src/lib/a.py": "a\n",
+        "src/lib/b.py": "b\n",
+        "src/lib/deep/c.py": "c\n",
+        "docs/index.md": "d\n",
+    }))})
+
+    root = _lazy(client, p, prefix="")
+    assert root["file_count"] == 6 and root["total_children"] == 3
+    assert [(c["name"], c["type"]) for c in root["children"]] == [("docs", "dir"), ("src", "dir"), ("README.md", "file")]
+    src = root["children"][1]
+    assert src == {"name": "src", "path": "src", "type": "dir", "file_count": 4, "child_count": 2}
+    assert "children" not in src
+
+    lib = _lazy(client, p, prefix="src/lib/")
+    assert lib["prefix"] == "src/lib" and lib["file_count"] == 3
+    assert [c["path"] for c in lib["children"]] == ["src/lib/deep", "src/lib/a.py", "src/lib/b.py"]
+    assert lib["children"][1]["language"] == "python" and lib["children"][1]["size"] == 2
+
+    nested = _lazy(client, p, prefix="src", depth=3)
+    deep = nested["children"][0]["children"][0]
+    assert deep["path"] == "src/lib/deep" and [c["name"] for c in deep["children"]] == ["c.py"]
+
+    page1 = _lazy(client, p, prefix="src/lib", per_page=2)
+    page2 = _lazy(client, p, prefix="src/lib", per_page=2, page=2)
+    assert page1["has_more"] and not page2["has_more"]
+    assert [c["name"] for c in page1["children"] + page2["children"]] == ["deep", "a.py", "b.py"]
+
+    r = client.get(reverse("community:project-file-tree", args=[p.id]), {"prefix": "nope"})
+    assert r.status_code == 400
+
+
+def test_directory_counts_follow_single_file_writes(client):
+    u = User.objects.create_user(username="dirs", password="x")
+    p = Project.objects.create(name="dirs", creator=u)
+    a = ProjectFile.objects.create(project=p, path="a/b/one.py", content="1\n")
+    ProjectFile.objects.create(project=p, path="a/two.py", content="2\n")
+    assert [c["file_count"] for c in _lazy(client, p, prefix="")["children"]] == [2]
+
+    a.path = "c/one.py"  # move out of a/b: a/b disappears, c appears
+    a.save()
+    root = _lazy(client, p, prefix="")
+    assert [(c["name"], c["file_count"]) for c in root["children"]] == [("a", 1), ("c", 1)]
+    assert _lazy(client, p, prefix="a")["children"] == [
+        {"name": "two.py", "path": "a/two.py", "type": "file", "size": 2, "language": "python"},
+    ]
+
+    a.delete()
+    assert [c["name"] for c in _lazy(client, p, prefix="")["children"]] == ["a"]
+
+
+def test_full_tree_is_cached_per_version(client, django_assert_num_queries):
+    u = User.objects.create_user(username="cached", password="x")
+    p = Project.objects.create(name="cached", creator=u)
+    ProjectFile.objects.create(project=p, path="x/y.txt", content="y\n")
+    url = reverse("community:project-file-tree", args=[p.id])
+    assert client.get(url).json()["total_files"] == 1
+    with django_assert_num_queries(2):  # project + version; the tree comes from the cache
+        assert client.get(url).json()["total_files"] == 1
+    ProjectFile.objects.create(project=p, path="z.txt", content="z\n")
+    assert client.get(url).json()["total_files"] == 2
+
+
+def _dirs(p):
+    return sorted(ProjectDir.objects.filter(project=p).values_list("path", "parent", "file_count", "child_files",
+                                                                    "child_dirs"))
+
+
+def test_bulk_writes_move_directories_by_their_delta(monkeypatch):
+    from community.ingest import apply_sync, sync_files, write_files
+
+    u = User.objects.create_user(username="delta", password="x")
+    p = Project.objects.create(name="delta", creator=u)
+    write_files(p, [(f"pkg{i % 3}/sub{i % 2}/m{i}.py", "x\n") for i in range(30)] + [("top.py", "t\n")])
+
+    def no_full_rebuild(project_id):
+        raise AssertionError("bulk writes must not rebuild every directory")
+
+    full = ProjectDir.rebuild
+    monkeypatch.setattr(ProjectDir, "rebuild", no_full_rebuild)
+    apply_sync(p, [("pkg0/sub0/m0.py", "changed\n"), ("new/deep/er/a.py", "a\n"), ("pkg1/b.py", "b\n")],
+               delete=["pkg2/sub0/m2.py", "pkg2/sub0/m8.py", "pkg2/sub0/m14.py", "pkg2/sub0/m20.py",
+                       "pkg2/sub0/m26.py", "top.py", "missing.py"])
+    sync_files(p, [("pkg0/sub0/m0.py", "changed\n"), ("pkg1/b.py", "b\n"), ("other/c.py", "c\n")],
+               delete_missing=True)
+    delta = _dirs(p)
+
+    monkeypatch.setattr(ProjectDir, "rebuild", full)
+    ProjectStats.rebuild(p.id)
+    assert delta == _dirs(p)
+    assert [d[0] for d in delta] == ["other", "pkg0", "pkg0/sub0", "pkg1"]
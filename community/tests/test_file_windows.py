@@ -0,0 +1,114 @@
+import random
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from community import lines
+from community.lines import STEP, FileWindow
+from community.models import Project, ProjectFile, User
+
+pytestmark = pytest.mark.django_db
+
+
+def _text(n=1000):
+    rnd = random.Random(7)
+    ends = ["\n", "\r\n", "\r", "\u2028"]
+    return "".join(f"line {i} é€ {'x' * rnd.randint(0, 40)}{rnd.choice(ends)}" for i in range(1, n + 1))
+
+
+@pytest.fixture
+def big(settings):
+    settings.LINE_INDEX_MIN_BYTES = 1024  # index even this small test file
+    u = User.objects.create_user(username="win", password="x")
+    p = Project.objects.create(name="win", creator=u)
+    text = _text()
+    ProjectFile.objects.create(project=p, path="gen/big.txt", content=text)
+    return p, text
+
+
+def _url(p, path="gen/big.txt"):
+    return reverse("community:project-file-detail", args=[p.id, path])
+
+
+def test_line_windows_match_splitlines(client, big):
+    p, text = big
+    lines = text.splitlines(keepends=True)
+    r = client.get(_url(p), {"lines": "10:12"})
+    data = r.json()
+    assert (data["start"], data["end"], data["total_lines"]) == (10, 12, 1000)
+    assert data["content"] == "".join(lines[9:12])
+    assert r["ETag"] == ProjectFile.objects.get(project=p).content_hash
+
+    rnd = random.Random(1)
+    for _ in range(50):
+        a = rnd.randint(1, 1000)
+        b = rnd.randint(a, 1000)
+        assert client.get(_url(p), {"lines": f"{a}:{b}"}).json()["content"] == "".join(lines[a - 1:b])
+    assert client.get(_url(p), {"lines": "999:"}).json()["content"] == "".join(lines[998:])
+    assert client.get(_url(p), {"lines": "64"}).json()["content"] == lines[63]
+    assert client.get(_url(p), {"lines": "5000:"}).json()["content"] == ""
+    assert client.get(_url(p), {"lines": "x"}).status_code == 400
+
+
+def test_window_reads_only_the_span(big):
+    p, text = big
+    FileWindow.for_file(p.id, "gen/big.txt").lines(1, 1)  # builds and stores the index
+    assert ProjectFile.objects.get(project=p).line_offsets["step"] == STEP
+
+    window = FileWindow.for_file(p.id, "gen/big.txt")
+    with CaptureQueriesContext(connection) as ctx:
+        window.lines(500, 502)
+    assert len(ctx.captured_queries) == 1
+    assert "SUBSTR" in ctx.captured_queries[0]["sql"].upper()
+
+
+def test_byte_ranges(client, big):
+    p, text = big
+    data = text.encode("utf-8")
+    r = client.get(_url(p), {"raw": "1"})
+    assert r.content == data and r["Accept-Ranges"] == "bytes"
+
+    rnd = random.Random(2)
+    for _ in range(30):
+        a = rnd.randint(0, len(data) - 1)
+        b = rnd.randint(a, len(data) - 1)
+        r = client.get(_url(p), {"raw": "1"}, HTTP_RANGE=f"bytes={a}-{b}")
+        assert r.status_code == 206 and r.content == data[a:b + 1]
+        assert r["Content-Range"] == f"bytes {a}-{b}/{len(data)}"
+
+    assert client.get(_url(p), {"raw": "1"}, HTTP_RANGE="bytes=-10").content == data[-10:]
+    assert client.get(_url(p), {"raw": "1"}, HTTP_RANGE=f"bytes={len(data)}-").status_code == 416
+    r = client.get(_url(p), {"raw": "1"}, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE="stale")
+    assert r.status_code == 200 and r.content == data
+
+
+def test_index_is_dropped_by_writes(client, big):
+    p, _ = big
+    client.get(_url(p), {"lines": "1:2"})
+    pf = ProjectFile.objects.get(project=p)
+    assert pf.line_offsets is not None
+    pf.content = "a\nb\n" * 600
+    pf.save(update_fields=["content"])
+    assert ProjectFile.objects.get(pk=pf.pk).line_offsets is None
+    assert client.get(_url(p), {"lines": "1200"}).json()["content"] == "b\n"
+
+
+def test_index_is_not_stored_over_a_newer_save(big, monkeypatch):
+    p, _ = big
+    pf = ProjectFile.objects.get(project=p)
+    real = lines.build_offsets
+
+    def save_meanwhile(text):
+        # another writer lands between reading the content and storing its index
+        pf.content = "a\nb\n" * 600
+        pf.save(update_fields=["content"])
+        return real(text)
+
+    monkeypatch.setattr(lines, "build_offsets", save_meanwhile)
+    FileWindow.for_file(p.id, "gen/big.txt").lines(1, 1)
+    assert ProjectFile.objects.get(pk=pf.pk).line_offsets is None
+
+    monkeypatch.setattr(lines, "build_offsets", real)
+    assert FileWindow.for_file(p.id, "gen/big.txt").lines(1200, 1200)[0] == "b\n"
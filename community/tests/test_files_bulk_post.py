@@ -0,0 +1,74 @@
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from community import bulk
+from community.models import Project, ProjectFile, User, content_hash
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def proj():
+    u = User.objects.create_user(username="bulk", password="x")
+    p = Project.objects.create(name="bulk", creator=u)
+    ProjectFile.objects.create(project=p, path="README.md", content="# hi\n")
+    for i in range(5):
+        ProjectFile.objects.create(project=p, path=f"src/m{i}.py", content=f"x = {i}\ny = 1\n")
+    ProjectFile.objects.create(project=p, path="src/web/app.js", content="go()\n")
+    return p
+
+
+def _post(client, p, payload):
+    r = client.post(reverse("community:project-files-bulk", args=[p.id]),
+                    data=json.dumps(payload), content_type="application/json")
+    if r.status_code != 200:
+        return r, None
+    assert r["Content-Type"] == "application/x-ndjson"
+    body = b"".join(r.streaming_content).decode()
+    return r, [json.loads(line) for line in body.splitlines()]
+
+
+def test_paths_then_globs_as_ndjson(client, proj):
+    _, items = _post(client, proj, {"paths": ["src/m3.py", "nope.txt", "README.md"], "globs": ["src/*.py"]})
+    assert [i["path"] for i in items] == [
+        "src/m3.py", "nope.txt", "README.md", "src/m0.py", "src/m1.py", "src/m2.py", "src/m4.py",
+    ]
+    assert items[1] == {"path": "nope.txt", "found": False}
+    assert items[0] == {
+        "path": "src/m3.py", "found": True, "content": "x = 3\ny = 1\n",
+        "hash": content_hash("x = 3\ny = 1\n"), "size": 12, "lines": 2, "language": "python",
+    }
+
+
+def test_metadata_only_and_known_hashes_skip_content(client, proj):
+    _, items = _post(client, proj, {"globs": ["src/**"], "fields": ["hash", "size", "lines"]})
+    assert [i["path"] for i in items][-1] == "src/web/app.js"
+    assert all("content" not in i and set(i) == {"path", "found", "hash", "size", "lines"} for i in items)
+
+    known = {"src/m0.py": content_hash("x = 0\ny = 1\n"), "src/m1.py": "stale"}
+    _, items = _post(client, proj, {"paths": ["src/m0.py", "src/m1.py"], "known": known, "fields": ["content"]})
+    assert items == [
+        {"path": "src/m0.py", "found": True, "unchanged": True},
+        {"path": "src/m1.py", "found": True, "content": "x = 1\ny = 1\n"},
+    ]
+
+
+def test_large_batches_are_chunked(proj, monkeypatch):
+    monkeypatch.setattr(bulk, "FETCH_CHUNK", 2)
+    paths = [f"missing{i}" for i in range(3000)] + ["README.md"]
+    with CaptureQueriesContext(connection) as ctx:
+        items = list(bulk.iter_bulk_files(proj.id, paths))
+    assert len(items) == 3001 and items[-1]["found"] is True
+    assert len(ctx.captured_queries) == 1501 + 1  # one per chunk of 2, plus the content of the one hit
+
+
+def test_bad_payloads(client, proj, settings):
+    assert _post(client, proj, {})[0].status_code == 400
+    assert _post(client, proj, {"paths": "a.py"})[0].status_code == 400
+    assert _post(client, proj, {"paths": ["a.py"], "fields": ["secret"]})[0].status_code == 400
+    settings.FILES_BULK_MAX_PATHS = 2
+    assert _post(client, proj, {"paths": ["a", "b", "c"]})[0].status_code == 400
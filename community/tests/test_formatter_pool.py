@@ -0,0 +1,64 @@
+import json
+
+import pytest
+from django.urls import reverse
+
+from community import formatters
+from community.formatters import FormatterBusy, FormatterPool
+from community.models import Project, ProjectFile, User
+
+
+@pytest.fixture
+def pool():
+    p = FormatterPool(workers=1, timeout=20, queue_max=0)
+    yield p
+    p.close()
+
+
+def test_pool_formats_in_warm_workers(pool):
+    assert pool.run("a.py", "x=1\n") == ("x = 1\n", "black")
+    assert pool.run("a.py", "def  f( ):\n  return  1\n") == ("def f():\n    return 1\n", "black")
+    assert pool.stats() == {
+        "workers": 1, "busy": 0, "queued": 0, "completed": 2, "timeouts": 0, "rejected": 0, "restarts": 0,
+    }
+
+
+def test_saturated_pool_rejects(pool):
+    worker = pool._checkout()  # the only worker is busy
+    with pytest.raises(FormatterBusy):
+        pool.run("a.py", "x=1\n")
+    assert pool.stats()["rejected"] == 1
+    pool._checkin(worker)
+
+
+def test_overrunning_job_is_dropped_and_worker_replaced(pool):
+    pool.run("a.py", "x=1\n")
+    pool.timeout = 0.05
+    slow = "y=2\n" * 20000  # takes Black well over a second
+    assert pool.run("a.py", slow) == (slow, None)
+    assert pool.stats()["timeouts"] == 1 and pool.stats()["restarts"] == 1
+    pool.timeout = 20
+    assert pool.run("a.py", "z=3\n") == ("z = 3\n", "black")
+
+
+def test_black_is_not_imported_by_the_web_process():
+    # formatters no longer imports it; only the workers (or the inline runner) do
+    assert not hasattr(formatters, "black")
+    assert formatters.format_for_path("notes.md", "x=1") == ("x=1", None)
+
+
+@pytest.mark.django_db
+def test_put_answers_503_when_saturated(client, monkeypatch):
+    u = User.objects.create_user(username="fmt", password="x")
+    p = Project.objects.create(name="fmt", creator=u)
+    ProjectFile.objects.create(project=p, path="main.py", content="x=1\n")
+
+    def busy(path, content):
+        raise FormatterBusy()
+
+    monkeypatch.setattr("community.views.format_for_path", busy)
+    url = reverse("community:project-file-detail", args=[p.id, "main.py"])
+    r = client.put(url + "?format=1", data=json.dumps({"content": "y=2"}), content_type="application/json")
+    assert r.status_code == 503 and r["Retry-After"] == "1"
+    assert ProjectFile.objects.get(project=p).content == "x=1\n"
+    assert client.get(reverse("community:formatter-stats")).json()["workers"] >= 1
@@ -148,7 +148,7 @@ async def test_full_e2e_zip_flow(settings):
     # ----- Download zip & verify persisted edit on Python file -----
     dl_url = reverse("community:project-download-zip", args=[proj.id])
     r = await ac.get(dl_url); assert r.status_code == 200
-    z = zipfile.ZipFile(io.BytesIO(r.content))
+    z = zipfile.ZipFile(io.BytesIO(b"".join([c async for c in r.streaming_content])))
     with z.open("scripts/broken.py") as f:
         assert f.read().decode("utf-8") == (py_fixed.rstrip("\n") + "\n")
 
@@ -237,7 +237,7 @@ async def test_full_e2e_github_flow(settings, monkeypatch):
     # Download zip reflects current state
     dl_url = reverse("community:project-download-zip", args=[proj.id])
     r = await ac.get(dl_url); assert r.status_code == 200
-    z = zipfile.ZipFile(io.BytesIO(r.content))
+    z = zipfile.ZipFile(io.BytesIO(b"".join([c async for c in r.streaming_content])))
     assert "server/api.py" in z.namelist()
 
     await ws.disconnect()
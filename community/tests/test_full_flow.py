@@ -111,7 +111,7 @@ async def test_full_flow_upload_edit_chat_download(settings):
     resp = await ac.get(dl_url)
     assert resp.status_code == 200
     assert resp.headers["Content-Type"] == "application/zip"
-    z = zipfile.ZipFile(io.BytesIO(resp.content))
+    z = zipfile.ZipFile(io.BytesIO(b"".join([c async for c in resp.streaming_content])))
     with z.open("app.py") as f:
         assert f.read().decode("utf-8") == new_content
 
@@ -133,7 +133,7 @@ async def test_full_flow_github_import_edit_chat_download(monkeypatch, settings)
     dl_url = reverse("community:project-download-zip", args=[project.id])
     resp = await ac.get(dl_url)
     assert resp.status_code == 200
-    z = zipfile.ZipFile(io.BytesIO(resp.content))
+    z = zipfile.ZipFile(io.BytesIO(b"".join([c async for c in resp.streaming_content])))
     with z.open("README.md") as f:
         assert f.read().decode("utf-8") == new_md
 
@@ -131,7 +131,7 @@ def test_full_flow_graph_chat_edit_download(client):
     r_dl = client.get(f"/api/community/projects/{project.id}/download.zip")
     assert r_dl.status_code == 200
     assert r_dl["Content-Type"] == "application/zip"
-    with zipfile.ZipFile(io.BytesIO(r_dl.content)) as zf:
+    with zipfile.ZipFile(io.BytesIO(b"".join(r_dl.streaming_content))) as zf:
         names = set(zf.namelist())
         assert names == set(files.keys())
         # file content should be updated to new_src
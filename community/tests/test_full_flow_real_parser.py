@@ -118,7 +118,7 @@ async def test_full_flow_real_parser(monkeypatch, settings):
     dl_url = reverse("community:project-download-zip", args=[proj.id])
     r = await ac.get(dl_url)
     assert r.status_code == 200
-    z = zipfile.ZipFile(io.BytesIO(r.content))
+    z = zipfile.ZipFile(io.BytesIO(b"".join([c async for c in r.streaming_content])))
     with z.open("README.md") as f:
         assert f.read().decode("utf-8") == new_md
 
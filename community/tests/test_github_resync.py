@@ -0,0 +1,137 @@
+import io
+import json
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from django.urls import reverse
+
+from community.models import GithubSource, Project, ProjectFile, ProjectStats, User
+
+pytestmark = pytest.mark.django_db
+
+SHA1 = "1" * 40
+SHA2 = "2" * 40
+
+
+def _zipball(sha, files):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as z:
+        for path, text in files.items():
+            z.writestr(f"owner-repo-{sha[:7]}/{path}", text)
+        z.comment = sha.encode()
+    return buf.getvalue()
+
+
+class FakeGithub:
+    """Serves commits/<ref> (sha media type, ETag) and zipball/<sha>; records requests."""
+
+    def __init__(self):
+        self.head = SHA1
+        self.trees = {}
+        self.requests = []
+
+    def publish(self, sha, files):
+        self.head = sha
+        self.trees[sha] = _zipball(sha, files)
+
+
+@pytest.fixture
+def fake_github(settings):
+    gh = FakeGithub()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            gh.requests.append((self.path, self.headers.get("If-None-Match")))
+            etag = f'"{gh.head}"'
+            if self.path == "/repos/owner/repo/commits/main":
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                body = gh.head.encode()
+                self.send_response(200)
+                self.send_header("ETag", etag)
+            elif self.path.startswith("/repos/owner/repo/zipball/"):
+                ref = self.path.rsplit("/", 1)[1]
+                body = gh.trees.get(gh.head if ref == "main" else ref)
+                if body is None:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+            else:
+                self.send_response(404)
+                self.end_headers()
+                return
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    settings.GITHUB_API_URL = f"http://127.0.0.1:{server.server_address[1]}"
+    yield gh
+    server.shutdown()
+    server.server_close()
+
+
+def _import(client, p):
+    url = reverse("community:project-import-github", args=[p.id])
+    r = client.post(url, data=json.dumps({"repo_url": "https://github.com/owner/repo", "ref": "main"}),
+                    content_type="application/json")
+    assert r.status_code == 200, r.content
+    return r.json()
+
+
+def test_resync_writes_only_the_delta(client, fake_github):
+    u = User.objects.create_user(username="sync", password="x")
+    p = Project.objects.create(name="mirror", creator=u)
+    files = {f"src/m{i}.py": f"v = {i}\n" for i in range(5)}
+    fake_github.publish(SHA1, files)
+
+    first = _import(client, p)
+    assert (first["written"], first["commit"]) == (5, SHA1)
+    src = GithubSource.objects.get(project=p)
+    assert (src.owner, src.repo, src.ref, src.commit_sha) == ("owner", "repo", "main", SHA1)
+
+    # nothing moved upstream: one commit lookup, no zipball, then 304 on the stored ETag
+    fake_github.requests.clear()
+    version = ProjectStats.version_for(p.id)
+    assert _import(client, p)["up_to_date"] is True
+    assert _import(client, p)["up_to_date"] is True
+    assert fake_github.requests == [
+        ("/repos/owner/repo/commits/main", None),
+        ("/repos/owner/repo/commits/main", f'"{SHA1}"'),
+    ]
+    assert ProjectStats.version_for(p.id) == version
+
+    # one edit, one removal, one addition
+    files["src/m0.py"] = "v = 'changed'\n"
+    del files["src/m1.py"]
+    files["src/new.py"] = "n = 1\n"
+    fake_github.publish(SHA2, files)
+    fake_github.requests.clear()
+    untouched = ProjectFile.objects.get(project=p, path="src/m2.py")
+
+    second = _import(client, p)
+    assert (second["written"], second["unchanged"], second["deleted"], second["commit"]) == (2, 3, 1, SHA2)
+    assert fake_github.requests[-1] == (f"/repos/owner/repo/zipball/{SHA2}", None)
+    assert set(ProjectFile.objects.filter(project=p).values_list("path", flat=True)) == set(files)
+    assert ProjectFile.objects.get(project=p, path="src/m0.py").content == "v = 'changed'\n"
+    assert ProjectFile.objects.get(pk=untouched.pk).content_hash == untouched.content_hash
+    assert ProjectStats.objects.get(project=p).file_count == 5
+    assert GithubSource.objects.get(project=p).commit_sha == SHA2
+
+
+def test_import_of_another_repo_does_not_delete(client, fake_github):
+    u = User.objects.create_user(username="sync2", password="x")
+    p = Project.objects.create(name="mixed", creator=u)
+    ProjectFile.objects.create(project=p, path="local.txt", content="mine\n")
+    fake_github.publish(SHA1, {"a.py": "a = 1\n"})
+    assert _import(client, p)["deleted"] == 0
+    assert ProjectFile.objects.filter(project=p, path="local.txt").exists()
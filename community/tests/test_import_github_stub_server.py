@@ -0,0 +1,98 @@
+import io
+import json
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from django.urls import reverse
+
+from community.ingest import ingest_zipball
+from community.models import Project, User, ProjectFile
+
+pytestmark = pytest.mark.django_db
+
+
+def _zipball():
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as z:
+        z.writestr("repo-abc123/", "")
+        z.writestr("repo-abc123/app.py", "print('hi')\n" * 2000)
+        z.writestr("repo-abc123/web/index.html", "<h1>hi</h1>\n")
+        z.writestr("repo-abc123/web/css/site.css", ".a{}\n")
+        z.writestr("repo-abc123/webapp/x.js", "x\n")
+        z.writestr("repo-abc123/logo.png", b"\x89PNG\x00\x00")
+    return buf.getvalue()
+
+
+@pytest.fixture
+def github_stub(settings):
+    data = _zipball()
+    seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            seen.append((self.path, self.headers.get("Authorization")))
+            if self.path != "/repos/owner/repo/zipball/main":
+                self.send_response(404)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/zip")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            for i in range(0, len(data), 1000):  # arrive in several pieces
+                self.wfile.write(data[i:i + 1000])
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    settings.GITHUB_API_URL = f"http://127.0.0.1:{server.server_address[1]}/"
+    settings.GITHUB_SPOOL_MEMORY_BYTES = 512  # force the spool onto disk
+    yield seen
+    server.shutdown()
+    server.server_close()
+
+
+def _import(client, project, **body):
+    url = reverse("community:project-import-github", args=[project.id])
+    return client.post(url, data=json.dumps({"repo_url": "https://github.com/owner/repo", **body}),
+                       content_type="application/json")
+
+
+def _project():
+    u = User.objects.create_user(username="gh", password="x")
+    return Project.objects.create(name="gh", creator=u)
+
+
+def test_import_from_stub_server(client, github_stub):
+    p = _project()
+    r = _import(client, p, ref="main", token="t0k")
+    assert r.status_code == 200, r.content
+    assert r.json()["imported_files"] == 4
+    assert set(ProjectFile.objects.filter(project=p).values_list("path", flat=True)) == {
+        "app.py", "web/index.html", "web/css/site.css", "webapp/x.js",
+    }
+    assert github_stub == [("/repos/owner/repo/zipball/main", "Bearer t0k")]
+
+
+def test_import_subdir_from_stub_server(client, github_stub):
+    p = _project()
+    r = _import(client, p, ref="main", subdir="/web/")
+    assert r.status_code == 200
+    # webapp/ shares the prefix text but is not below web/
+    assert sorted(ProjectFile.objects.filter(project=p).values_list("path", flat=True)) == [
+        "css/site.css", "index.html",
+    ]
+
+
+def test_missing_ref_is_400(client, github_stub):
+    assert _import(client, _project(), ref="nope").status_code == 400
+
+
+def test_ingest_zipball_without_repacking():
+    p = _project()
+    assert ingest_zipball(p, io.BytesIO(_zipball()), subdir="web/css")["written"] == 1
+    assert ProjectFile.objects.get(project=p).path == "site.css"
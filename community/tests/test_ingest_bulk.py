@@ -0,0 +1,200 @@
+import io
+import zipfile
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from community.models import Project, User, ProjectFile, ProjectStats
+
+pytestmark = pytest.mark.django_db
+
+
+def _zip(files) -> io.BytesIO:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as z:
+        for path, content in files:
+            z.writestr(path, content)
+    buf.seek(0)
+    return buf
+
+
+@pytest.fixture
+def proj(db):
+    u = User.objects.create_user(username="alice", password="x")
+    return Project.objects.create(name="bulk", creator=u)
+
+
+def test_ingest_zip_batches_queries(proj):
+    files = [(f"src/m{i}.py", f"x = {i}\n") for i in range(50)]
+    with CaptureQueriesContext(connection) as ctx:
+        assert proj.ingest_zip(_zip(files), batch_size=20) == 50
+    inserts = [q for q in ctx.captured_queries if q["sql"].startswith("INSERT INTO \"community_projectfile\"")]
+    assert len(inserts) == 3  # 20 + 20 + 10
+    assert len(ctx.captured_queries) < 15
+
+    st = ProjectStats.objects.get(project=proj)
+    assert (st.file_count, st.total_lines, st.languages) == (50, 50, {"python": 50})
+
+
+def test_ingest_zip_upserts_existing_and_skips_binary(proj):
+    proj.add_text_file("README.md", "old\n")
+    files = [
+        ("README.md", "new\n"),
+        ("dup.txt", "first"),
+        ("dup.txt", "second"),
+        ("logo.png", "\x89PNG"),
+        ("bin.dat", b"\xff\xfe\x00"),
+    ]
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as z:
+        for path, content in files:
+            z.writestr(path, content)
+    assert proj.ingest_zip(buf) == 3  # only the last dup.txt is read, bin.dat skipped
+
+    assert proj.get_file_content("README.md") == "new\n"
+    assert proj.get_file_content("dup.txt") == "second"
+    assert ProjectFile.objects.filter(project=proj).count() == 3
+    pf = ProjectFile.objects.get(project=proj, path="README.md")
+    assert (pf.size, pf.line_count, pf.language) == (4, 1, "md")
+
+
+def test_zip_bomb_ratio_rejected_and_nothing_written(proj, settings):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as z:
+        z.writestr("ok.py", "x = 1\n")
+        z.writestr("bomb.txt", "0" * (4 * 1024 * 1024))  # ~1000:1
+    from community.ingest import ArchiveRejected
+    with pytest.raises(ArchiveRejected):
+        proj.ingest_zip(io.BytesIO(buf.getvalue()))
+    assert not ProjectFile.objects.filter(project=proj).exists()
+
+    settings.INGEST_MAX_COMPRESSION_RATIO = 10_000
+    settings.INGEST_MAX_TOTAL_BYTES = 1024 * 1024
+    with pytest.raises(ArchiveRejected):
+        proj.ingest_zip(io.BytesIO(buf.getvalue()))
+
+
+def test_oversized_and_binary_members_skipped(proj, settings):
+    settings.INGEST_MAX_MEMBER_BYTES = 1000
+    big_text = "a" * 2000
+    files = [("big.txt", big_text), ("img.bin", b"GIF89a\x00\x01" + b"x" * 50000), ("small.txt", "hi")]
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as z:
+        for path, content in files:
+            z.writestr(path, content)
+    assert proj.ingest_zip(buf) == 1
+    assert proj.project_tree() == ["small.txt"]
+
+
+def test_read_text_stops_after_binary_sniff():
+    from community.ingest import IngestLimits, read_text
+
+    limits = IngestLimits()
+    fh = io.BytesIO(b"\x00" + b"y" * 100_000)
+    assert read_text(fh, limits) is None
+    assert limits.used == 8192  # only the sniff window was inflated
+    assert read_text(io.BytesIO("héllo".encode() * 20_000), IngestLimits()) == "héllo" * 20_000
+
+
+def test_upload_bad_archives_400(client, proj, settings):
+    from django.urls import reverse
+    from django.core.files.uploadedfile import SimpleUploadedFile
+
+    url = reverse("community:project-upload-zip", args=[proj.id])
+    r = client.post(url, {"file": SimpleUploadedFile("x.zip", b"not a zip")})
+    assert r.status_code == 400
+
+    settings.INGEST_MAX_TOTAL_BYTES = 10
+    r = client.post(url, {"file": SimpleUploadedFile("x.zip", _zip([("a.txt", "0123456789abc")]).getvalue())})
+    assert r.status_code == 400
+
+
+@pytest.mark.parametrize("workers", [2, 5])
+def test_parallel_ingest_matches_serial(proj, workers):
+    from community.ingest import iter_zip_texts, iter_zip_texts_parallel, zip_opener
+
+    files = [(f"pkg{i % 7}/m{i}.py", f"value = {i}\n" * (i % 13 + 1)) for i in range(120)]
+    files += [("bin.dat", b"\x00\x01"), ("pkg3/m3.py", "override\n")]
+    data = _zip(files).getvalue()
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        serial = list(iter_zip_texts(zf))
+    with zip_opener(io.BytesIO(data)) as open_zip:
+        parallel = list(iter_zip_texts_parallel(open_zip, workers))
+        with open_zip() as shared:
+            pass
+    assert shared.fp is None  # the shared ZipFile is closed with the block
+    assert sorted(parallel) == sorted(serial)
+    assert dict(parallel)["pkg3/m3.py"] == "override\n"
+
+    assert proj.ingest_zip(io.BytesIO(data), workers=workers, batch_size=16) == 120
+    assert proj.get_file_content("pkg5/m5.py") == "value = 5\n" * 6
+    assert ProjectStats.objects.get(project=proj).file_count == 120
+
+
+def test_parallel_ingest_reopens_paths_and_propagates_rejection(proj, tmp_path, settings):
+    from community.ingest import ArchiveRejected, iter_zip_texts_parallel, zip_opener
+
+    path = tmp_path / "a.zip"
+    path.write_bytes(_zip([(f"f{i}.txt", "x" * 1000) for i in range(40)]).getvalue())
+    opens = []
+    with zip_opener(str(path)) as opener:
+        counting = lambda: opens.append(1) or opener()  # noqa: E731
+        assert len(list(iter_zip_texts_parallel(counting, 4))) == 40
+    assert len(opens) == 5  # one to plan, one per worker
+
+    settings.INGEST_MAX_TOTAL_BYTES = 20_000
+    settings.INGEST_QUEUE_BYTES = 2000
+    with pytest.raises(ArchiveRejected):
+        proj.ingest_zip(str(path), workers=4)
+    assert not ProjectFile.objects.filter(project=proj).exists()
+
+
+def test_abandoned_parallel_reader_stops_workers(settings):
+    import threading
+    from community.ingest import iter_zip_texts_parallel, zip_opener
+
+    settings.INGEST_QUEUE_BYTES = 1
+    with zip_opener(_zip([(f"f{i}.txt", "x") for i in range(50)])) as open_zip:
+        it = iter_zip_texts_parallel(open_zip, 3)
+        next(it)
+        it.close()
+    assert not [t for t in threading.enumerate() if t.name.startswith("zip-ingest-")]
+
+
+def test_parallel_readers_hold_a_bounded_amount_of_text(settings, monkeypatch):
+    import time
+    from community import ingest
+
+    settings.INGEST_QUEUE_BYTES = 3000
+    peak = []
+    acquire = ingest._ByteBudget.acquire
+
+    def tracking(self, n, stop):
+        ok = acquire(self, n, stop)
+        peak.append(self.used)
+        return ok
+
+    monkeypatch.setattr(ingest._ByteBudget, "acquire", tracking)
+    with ingest.zip_opener(_zip([(f"f{i}.txt", "x" * 1000) for i in range(30)])) as open_zip:
+        for _ in ingest.iter_zip_texts_parallel(open_zip, 4):
+            time.sleep(0.002)  # a slow writer: readers run ahead until the budget stops them
+    assert len(peak) == 30 and max(peak) <= 3000
+
+
+def test_delete_paths_sends_post_delete_and_rebuilds_stats_once(proj, monkeypatch):
+    from django.db.models.signals import post_delete
+    from community.ingest import delete_paths
+
+    proj.ingest_zip(_zip([(f"f{i}.txt", "x\n" * i) for i in range(1, 6)]))
+    seen = []
+    handler = lambda sender, instance, **kw: seen.append(instance.path)  # noqa: E731
+    post_delete.connect(handler, sender=ProjectFile, weak=False)
+    applied = []
+    monkeypatch.setattr(ProjectStats, "apply_change", lambda *a, **kw: applied.append(a))
+    try:
+        assert delete_paths(proj, ["f1.txt", "f3.txt", "nope.txt"], batch_size=1) == 2
+    finally:
+        post_delete.disconnect(handler, sender=ProjectFile)
+    assert sorted(seen) == ["f1.txt", "f3.txt"] and applied == []
+    stats = ProjectStats.objects.get(project=proj)
+    assert (stats.file_count, stats.total_lines) == (3, 2 + 4 + 5)
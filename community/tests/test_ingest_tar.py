@@ -0,0 +1,114 @@
+import io
+import tarfile
+import zipfile
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+from community.ingest import ArchiveRejected, iter_tar_texts
+from community.models import Project, ProjectFile, User
+
+pytestmark = pytest.mark.django_db
+
+
+def _tar(files, mode="w:gz"):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode=mode) as tf:
+        for name, data in files:
+            info = tarfile.TarInfo(name)
+            if data is None:
+                info.type = tarfile.DIRTYPE
+                tf.addfile(info)
+                continue
+            data = data.encode() if isinstance(data, str) else data
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+        link = tarfile.TarInfo("./link.py")
+        link.type, link.linkname = tarfile.SYMTYPE, "src/app.py"
+        tf.addfile(link)
+    return buf.getvalue()
+
+
+FILES = [("./src", None), ("./src/app.py", "print('hi')\n"), ("./README.md", "# r\n"), ("./img.png", b"\x89PNG\x00")]
+
+
+@pytest.fixture
+def proj():
+    u = User.objects.create_user(username="ci", password="x")
+    return Project.objects.create(name="ci", creator=u)
+
+
+def _paths(p):
+    return sorted(ProjectFile.objects.filter(project=p).values_list("path", flat=True))
+
+
+@pytest.mark.parametrize("mode", ["w", "w:gz", "w:bz2", "w:xz"])
+def test_multipart_tar_upload(client, proj, mode):
+    url = reverse("community:project-upload-zip", args=[proj.id])
+    r = client.post(url, {"file": SimpleUploadedFile("a.tar", _tar(FILES, mode))})
+    assert r.status_code == 200 and r.json() == {"ingested": 2}
+    assert _paths(proj) == ["README.md", "src/app.py"]
+
+
+def test_raw_body_tar_gz_and_zip(client, proj):
+    url = reverse("community:project-upload-zip", args=[proj.id])
+    r = client.post(url, data=_tar(FILES), content_type="application/gzip")
+    assert r.status_code == 200 and r.json() == {"ingested": 2}
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as z:
+        z.writestr("z.py", "z = 1\n")
+    r = client.post(url, data=buf.getvalue(), content_type="application/zip")
+    assert r.status_code == 200 and r.json() == {"ingested": 1}
+    assert _paths(proj) == ["README.md", "src/app.py", "z.py"]
+
+    r = client.post(url, data=b"garbage" * 100, content_type="application/octet-stream")
+    assert r.status_code == 400
+
+
+class _Trickle(io.RawIOBase):
+    """Non-seekable source that records how much has been read."""
+
+    def __init__(self, data):
+        self.data, self.pos = data, 0
+
+    def readable(self):
+        return True
+
+    def read(self, n=-1):
+        n = len(self.data) - self.pos if n is None or n < 0 else min(n, 4096)
+        chunk = self.data[self.pos:self.pos + n]
+        self.pos += len(chunk)
+        return chunk
+
+
+def test_tar_is_consumed_as_a_stream():
+    files = [(f"f{i}.txt", f"{i}\n" * 2000) for i in range(50)]
+    src = _Trickle(_tar(files, "w"))
+    it = iter_tar_texts(src)
+    assert next(it)[0] == "f0.txt"
+    assert src.pos < len(src.data) // 10  # first row is ready long before the end
+    assert len(list(it)) == 49
+
+
+def test_tar_budgets_count_skipped_members(settings):
+    settings.INGEST_MAX_MEMBER_BYTES = 1000
+    settings.INGEST_MAX_TOTAL_BYTES = 50_000
+    data = _tar([("big.bin", b"\x00" * 60_000), ("ok.txt", "ok\n")], "w")
+    with pytest.raises(ArchiveRejected):
+        list(iter_tar_texts(io.BytesIO(data)))
+
+    settings.INGEST_MAX_TOTAL_BYTES = 10**9
+    settings.INGEST_MAX_COMPRESSION_RATIO = 10
+    bomb = _tar([("zeros.txt", "0" * (4 * 1024 * 1024))], "w:gz")
+    with pytest.raises(ArchiveRejected):
+        list(iter_tar_texts(io.BytesIO(bomb)))
+
+
+def test_tar_zst(client, proj):
+    zstandard = pytest.importorskip("zstandard")
+    data = zstandard.ZstdCompressor().compress(_tar(FILES, "w"))
+    url = reverse("community:project-upload-zip", args=[proj.id])
+    r = client.post(url, data=data, content_type="application/zstd")
+    assert r.status_code == 200 and r.json() == {"ingested": 2}
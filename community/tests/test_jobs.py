@@ -0,0 +1,162 @@
+import io
+import json
+import os
+import zipfile
+
+import pytest
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+from community import jobs
+from community.models import Job, Project, User, ProjectFile
+
+
+def _zip(n=3):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as z:
+        for i in range(n):
+            z.writestr(f"src/f{i}.py", f"x = {i}\n")
+    return buf.getvalue()
+
+
+def _project():
+    u = User.objects.create_user(username="jobs", password="x")
+    return Project.objects.create(name="jobs", creator=u)
+
+
+def _upload(client, p, data, query="?async=1"):
+    url = reverse("community:project-upload-zip", args=[p.id]) + query
+    return client.post(url, {"file": SimpleUploadedFile("a.zip", data, content_type="application/zip")})
+
+
+@pytest.fixture
+def inline_jobs(settings, tmp_path):
+    settings.JOB_RUNNER = "inline"
+    settings.JOB_SPOOL_DIR = str(tmp_path)
+    settings.INGEST_BATCH_SIZE = 2
+    return tmp_path
+
+
+@pytest.mark.django_db
+def test_async_upload_returns_job_and_reports_progress(client, inline_jobs):
+    p = _project()
+    layer = get_channel_layer()
+    channel = async_to_sync(layer.new_channel)()
+    async_to_sync(layer.group_add)(f"projectchat_{p.id}", channel)
+
+    r = _upload(client, p, _zip(3))
+    assert r.status_code == 202
+    body = r.json()
+    assert r["Location"] == body["status_url"]
+
+    job = client.get(body["status_url"]).json()
+    assert job["kind"] == "zip_upload" and job["status"] == "succeeded"
+    assert job["progress"]["files_done"] == job["progress"]["files_total"] == 3
+    assert job["result"] == {"ingested": 3}
+    assert ProjectFile.objects.filter(project=p).count() == 3
+    assert list(inline_jobs.iterdir()) == []  # spooled upload removed
+
+    events = []
+    while True:
+        try:
+            events.append(async_to_sync(layer.receive)(channel))
+        except Exception:
+            break
+        if events[-1]["job"]["status"] == "succeeded":
+            break
+    assert all(e["type"] == "job.progress" for e in events)
+    # running, start, two batches (2 + 1 files), finished
+    assert [e["job"]["progress"]["files_done"] for e in events] == [0, 0, 2, 3, 3]
+
+
+@pytest.mark.django_db
+def test_async_failures_are_recorded(client, inline_jobs, monkeypatch):
+    p = _project()
+    job = client.get(_upload(client, p, b"not a zip").json()["status_url"]).json()
+    assert job["status"] == "failed" and job["error"] == "Not a valid zip or tar archive"
+
+    class FakeResp:
+        status_code = 404
+
+    monkeypatch.setattr("community.views.requests.get", lambda *a, **k: FakeResp())
+    url = reverse("community:project-import-github", args=[p.id])
+    r = client.post(url, data=json.dumps({"repo_url": "https://github.com/o/r", "async": True, "token": "secret"}),
+                    content_type="application/json")
+    assert r.status_code == 202
+    job = Job.objects.get(pk=r.json()["job_id"])
+    assert (job.kind, job.status, job.error) == ("github_import", Job.FAILED, "Repository or ref not found")
+    assert "secret" not in json.dumps(job.params)
+
+
+@pytest.mark.django_db
+def test_job_detail_is_scoped_to_project(client, inline_jobs):
+    p = _project()
+    job_id = _upload(client, p, _zip(1)).json()["job_id"]
+    other = Project.objects.create(name="other", creator=p.creator)
+    assert client.get(reverse("community:project-job-detail", args=[other.id, job_id])).status_code == 404
+
+
+@pytest.mark.django_db(transaction=True)
+def test_thread_runner_finishes_in_background(client, settings, tmp_path):
+    settings.JOB_RUNNER = "thread"
+    settings.JOB_SPOOL_DIR = str(tmp_path)
+    p = _project()
+    jobs._EXECUTOR = None  # a pool of our own, to wait on below
+    r = _upload(client, p, _zip(4))
+    assert r.status_code == 202
+    jobs._executor().shutdown(wait=True)  # the job was submitted on commit; wait for it to run
+    jobs._EXECUTOR = None
+    job = client.get(r.json()["status_url"]).json()
+    assert job["status"] == "succeeded", job
+    assert ProjectFile.objects.filter(project=p).count() == 4
+
+
+@pytest.mark.django_db(transaction=True)
+def test_progress_is_visible_before_the_ingest_commits(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    from django.db import connection, transaction
+
+    from community.jobs import JobProgress
+
+    job = Job.objects.create(project=_project(), kind="upload")
+    # SQLite has a single writer, so progress is written in line there; act like a server database
+    monkeypatch.setattr(connection, "vendor", "postgresql")
+
+    def seen_elsewhere():  # another thread, so another connection
+        with ThreadPoolExecutor(1) as pool:
+            return pool.submit(lambda: Job.objects.values_list("files_done", flat=True).get(pk=job.pk)).result()
+
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            JobProgress(job).advance(3, 30)
+            assert seen_elsewhere() == 3
+            raise RuntimeError("ingest failed")
+    assert Job.objects.get(pk=job.pk).files_done == 3
+
+
+@pytest.mark.django_db
+def test_jobs_of_a_dead_process_are_failed_and_their_spool_swept(settings, tmp_path):
+    import subprocess
+    import time
+
+    settings.JOB_SPOOL_DIR = str(tmp_path)
+    p = _project()
+    dead = subprocess.Popen(["true"])
+    dead.wait()
+    host = jobs.worker_id().split(":")[0]
+    orphan = Job.objects.create(project=p, kind="zip_upload", status=Job.RUNNING, worker=f"{host}:{dead.pid}:gone")
+    mine = Job.objects.create(project=p, kind="zip_upload", status=Job.QUEUED, worker=jobs.worker_id())
+    elsewhere = Job.objects.create(project=p, kind="zip_upload", status=Job.RUNNING, worker="other-host:1:x")
+    old, fresh = tmp_path / "old.upload", tmp_path / "fresh.upload"
+    old.write_bytes(b"x")
+    fresh.write_bytes(b"x")
+    os.utime(old, (time.time() - 2 * 86400,) * 2)
+
+    assert jobs.recover_orphaned_jobs() == 1
+    orphan.refresh_from_db()
+    assert orphan.status == Job.FAILED and orphan.finished_at and "restarted" in orphan.error
+    assert Job.objects.get(pk=mine.pk).status == Job.QUEUED
+    assert Job.objects.get(pk=elsewhere.pk).status == Job.RUNNING
+    assert not old.exists() and fresh.exists()
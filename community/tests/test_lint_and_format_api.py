@@ -90,3 +90,52 @@ def test_lint_css_unbalanced_brace(client):
     diags = r.json().get("diagnostics", [])
     # our lightweight CSS linter should flag an error
     assert any(d.get("severity") == "error" for d in diags)
+
+
+def test_lint_results_are_cached_by_content(client, settings, monkeypatch):
+    from community import linters
+
+    settings.LINT_CACHE_SIZE = 2
+    linters.lint_cache.clear()
+    calls = []
+    real = linters.lint_js
+    monkeypatch.setattr(linters, "LINTERS", [((".js",), lambda path, text: calls.append(path) or real(path, text), "t")])
+
+    p = _create_project_with_file("a.js", "f(;\n")
+    url = reverse("community:project-file-detail", args=[p.id, "a.js"])
+    first = client.get(url + "?lint=1").json()["diagnostics"]
+    assert first and client.get(url + "?lint=1").json()["diagnostics"] == first
+    # same content under another name is the same entry
+    assert linters.lint_for_path("lib/b.js", "f(;\n") == first
+    assert calls == ["a.js"] and linters.lint_cache.hits == 2
+
+    for text in ("x\n", "y\n"):  # push it out of the LRU
+        linters.lint_for_path("c.js", text)
+    linters.lint_for_path("a.js", "f(;\n")
+    assert len(calls) == 4
+
+    settings.LINT_CACHE_PERSIST = True
+    linters.lint_for_path("a.js", "z(\n")
+    linters.lint_cache.clear()  # a fresh process still finds it in the shared cache
+    linters.lint_for_path("a.js", "z(\n")
+    assert len(calls) == 5
+
+
+def test_js_lint_skips_comments_and_template_literals():
+    from community.linters import lint_css, lint_js
+
+    clean = (
+        "// don't count (this\n"
+        "/* or [this */ const s = 'a{' + \"b)\\\"\";\n"
+        "const t = `x { ${ f(`in ${a[0]} (`) } ]`;\n"
+    )
+    assert lint_js("a.js", clean) == []
+    diags = lint_js("a.js", clean + "if (x) {\n  y(];\n")
+    assert [(d["message"], d["range"]["start"]) for d in diags] == [
+        ("Mismatched '(' vs ']'", {"line": 4, "character": 4}),
+        ("Unclosed '{'", {"line": 3, "character": 7}),
+        ("Unclosed '('", {"line": 4, "character": 3}),
+    ]
+    assert lint_js("a.js", "`${ (`") != []
+    # CSS has block comments only: a // inside url() is not one
+    assert lint_css("a.css", "a { b: url(http://x) } /* } */") == []
@@ -0,0 +1,78 @@
+import hashlib
+import io
+import json
+import zipfile
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+from community.models import Project, ProjectFile, ProjectStats, User
+
+pytestmark = pytest.mark.django_db
+
+
+def _h(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _project():
+    u = User.objects.create_user(username="desk", password="x")
+    p = Project.objects.create(name="desktop", creator=u)
+    for path, text in {"a.py": "a = 1\n", "b.py": "b = 1\n", "old.txt": "bye\n"}.items():
+        ProjectFile.objects.create(project=p, path=path, content=text)
+    return p
+
+
+def _post(client, name, p, body):
+    return client.post(reverse(f"community:{name}", args=[p.id]), data=json.dumps(body),
+                       content_type="application/json")
+
+
+def test_manifest_then_batched_upload(client):
+    p = _project()
+    local = {"a.py": "a = 1\n", "b.py": "b = 2\n", "new/c.py": "c = 3\n"}
+
+    r = _post(client, "project-sync-manifest", p, {"files": {k: _h(v) for k, v in local.items()}})
+    assert r.status_code == 200
+    diff = r.json()
+    assert (diff["missing"], diff["changed"], diff["delete"], diff["unchanged"]) == (
+        ["new/c.py"], ["b.py"], ["old.txt"], 1)
+
+    upload = {
+        "files": [{"path": k, "content": local[k], "hash": _h(local[k])} for k in diff["missing"] + diff["changed"]],
+        "delete": diff["delete"],
+    }
+    r = client.post(diff["upload_url"], data=json.dumps(upload), content_type="application/json")
+    assert r.status_code == 200
+    assert (r.json()["written"], r.json()["deleted"]) == (2, 1)
+
+    stored = dict(ProjectFile.objects.filter(project=p).values_list("path", "content"))
+    assert stored == local
+    assert ProjectStats.objects.get(project=p).file_count == 3
+
+    # the list form of the manifest now reports nothing to do
+    r = _post(client, "project-sync-manifest", p, {"files": [{"path": k, "hash": _h(v)} for k, v in local.items()]})
+    assert (r.json()["missing"], r.json()["changed"], r.json()["delete"]) == ([], [], [])
+
+
+def test_zip_upload_phase(client):
+    p = _project()
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as z:
+        z.writestr("b.py", "b = 'zip'\n")
+    url = reverse("community:project-sync-upload", args=[p.id])
+    r = client.post(url, {"file": SimpleUploadedFile("d.zip", buf.getvalue()), "delete": json.dumps(["a.py"])})
+    assert r.status_code == 200 and r.json()["written"] == 1
+    assert sorted(ProjectFile.objects.filter(project=p).values_list("path", flat=True)) == ["b.py", "old.txt"]
+
+
+def test_rejects_bad_input(client):
+    p = _project()
+    assert _post(client, "project-sync-manifest", p, {"files": {"a.py": "nothex"}}).status_code == 400
+    assert _post(client, "project-sync-manifest", p, {"files": "a.py"}).status_code == 400
+    bad_hash = {"files": [{"path": "a.py", "content": "x\n", "hash": _h("y\n")}]}
+    assert _post(client, "project-sync-upload", p, bad_hash).status_code == 400
+    both = {"files": [{"path": "a.py", "content": "x\n"}], "delete": ["a.py"]}
+    assert _post(client, "project-sync-upload", p, both).status_code == 400
+    assert ProjectFile.objects.get(project=p, path="a.py").content == "a = 1\n"
@@ -0,0 +1,100 @@
+import json
+import os
+
+import pytest
+from django.urls import reverse
+
+from community import lintpool
+from community.linters import lint_cache, run_linter
+from community.models import Project, ProjectFile, User, content_hash
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def proj():
+    lint_cache.clear()
+    u = User.objects.create_user(username="lint", password="x")
+    p = Project.objects.create(name="lint", creator=u)
+    ProjectFile.objects.create(project=p, path="README.md", content="# not linted\n")
+    ProjectFile.objects.create(project=p, path="src/ok.py", content="x = 1\n")
+    ProjectFile.objects.create(project=p, path="src/bad.py", content="def f(:\n")
+    ProjectFile.objects.create(project=p, path="web/app.js", content="go(\n")
+    ProjectFile.objects.create(project=p, path="web/site.css", content="a { }\n")
+    return p
+
+
+def _lint(client, p, payload=None, **query):
+    url = reverse("community:project-lint", args=[p.id])
+    if payload is None:
+        r = client.get(url, query)
+    else:
+        r = client.post(url, data=json.dumps(payload), content_type="application/json")
+    if r.status_code != 200:
+        return r, None
+    assert r["Content-Type"] == "application/x-ndjson"
+    items = [json.loads(line) for line in b"".join(r.streaming_content).decode().splitlines()]
+    return r, {i["path"]: i for i in items}
+
+
+def test_lints_every_file_on_the_pool(client, proj, settings):
+    settings.LINT_WORKERS = 2
+    _, items = _lint(client, proj)
+    assert set(items) == {"src/ok.py", "src/bad.py", "web/app.js", "web/site.css"}
+    assert items["src/ok.py"] == {"path": "src/ok.py", "hash": content_hash("x = 1\n"), "diagnostics": []}
+    assert items["src/bad.py"]["diagnostics"][0]["source"] == "python"
+    assert items["web/app.js"]["diagnostics"][0]["message"] == "Unclosed '('"
+
+    _, items = _lint(client, proj, prefix="web/")
+    assert set(items) == {"web/app.js", "web/site.css"}
+
+
+def test_known_and_cached_files_skip_the_linter(client, proj, settings, monkeypatch):
+    settings.LINT_RUNNER = "inline"
+    calls = []
+    real = lintpool.run_linter
+    monkeypatch.setattr(lintpool, "run_linter", lambda path, text: calls.append(path) or real(path, text))
+
+    _lint(client, proj, prefix="src/")
+    assert sorted(calls) == ["src/bad.py", "src/ok.py"]
+
+    calls.clear()
+    known = {"src/ok.py": content_hash("x = 1\n"), "web/app.js": "stale"}
+    _, items = _lint(client, proj, {"known": known})
+    assert items["src/ok.py"] == {"path": "src/ok.py", "hash": content_hash("x = 1\n"), "unchanged": True}
+    assert "diagnostics" in items["src/bad.py"]  # from the cache
+    assert sorted(calls) == ["web/app.js", "web/site.css"]
+
+
+def test_bad_payloads(client, proj):
+    assert _lint(client, proj, {"known": []})[0].status_code == 400
+    assert _lint(client, proj, {"prefix": 3})[0].status_code == 400
+
+
+def _crash_once(path, text):
+    """Runs in a pool worker: the first time it sees src/bad.py the worker dies."""
+    marker = os.environ["LINT_CRASH_MARKER"]
+    if path == "src/bad.py" and not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)
+    return run_linter(path, text)
+
+
+def test_a_crashed_pool_is_replaced(client, proj, settings, monkeypatch, tmp_path):
+    settings.LINT_WORKERS = 1
+    monkeypatch.setenv("LINT_CRASH_MARKER", str(tmp_path / "crashed"))
+    monkeypatch.setattr(lintpool, "run_linter", _crash_once)
+    lintpool._POOL = None  # workers must see the environment above
+    try:
+        _, items = _lint(client, proj)
+        assert (tmp_path / "crashed").exists()
+        assert all("diagnostics" in i for i in items.values()), items
+        assert items["src/bad.py"]["diagnostics"][0]["source"] == "python"
+
+        lint_cache.clear()
+        _, items = _lint(client, proj)  # and the next request finds a working pool
+        assert all("diagnostics" in i for i in items.values())
+    finally:
+        if lintpool._POOL is not None:
+            lintpool._POOL.shutdown()
+        lintpool._POOL = None
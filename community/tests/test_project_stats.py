@@ -0,0 +1,67 @@
+import pytest
+from django.urls import reverse
+
+from community.models import Project, User, ProjectFile, ProjectStats
+
+pytestmark = pytest.mark.django_db
+
+
+def _stats(p):
+    return ProjectStats.objects.get(project=p)
+
+
+def test_stats_follow_create_update_delete():
+    u = User.objects.create_user(username="alice", password="x")
+    p = Project.objects.create(name="stats", creator=u)
+    assert _stats(p).file_count == 0
+
+    a = ProjectFile.objects.create(project=p, path="a.py", content="x = 1\ny = 2\n")
+    p.add_text_file("web/app.js", "run();\n")
+    st = _stats(p)
+    assert (st.file_count, st.total_lines, st.total_bytes) == (2, 3, 19)
+    assert st.languages == {"python": 1, "javascript": 1}
+    v = st.version
+
+    a.content = "é\n"
+    a.save(update_fields=["content"])
+    p.add_text_file("web/app.js", "run();\nstop();\n")  # update_or_create path
+    st = _stats(p)
+    assert (st.file_count, st.total_lines, st.total_bytes) == (2, 3, 18)
+    assert st.version > v
+
+    a.delete()
+    ProjectFile.objects.filter(project=p, path="web/app.js").delete()
+    st = _stats(p)
+    assert (st.file_count, st.total_lines, st.total_bytes, st.languages) == (0, 0, 0, {})
+
+
+def test_rebuild_matches_incremental():
+    u = User.objects.create_user(username="bob", password="x")
+    p = Project.objects.create(name="rebuild", creator=u)
+    p.add_text_file("a.css", ".a{}\n")
+    p.add_text_file("README", "hello\nworld\n")
+    before = _stats(p).as_dict()
+    after = ProjectStats.rebuild(p.id).as_dict()
+    for key in ("files", "bytes", "lines", "languages"):
+        assert before[key] == after[key]
+    assert after["languages"] == {"css": 1, "unknown": 1}
+
+
+def test_summary_rollups_and_bulk_listing(client):
+    u = User.objects.create_user(username="carol", password="x")
+    p1 = Project.objects.create(name="one", creator=u)
+    p2 = Project.objects.create(name="two", creator=u)
+    p1.add_text_file("a.py", "def f():\n    pass\n")
+    p2.add_text_file("b.html", "<p></p>\n")
+
+    data = client.get(reverse("community:project-summary", args=[p1.id])).json()
+    assert data["totals"] == {"files": 1, "lines": 2, "bytes": 18}
+    assert data["languages"] == {"python": 1}
+
+    r = client.get(reverse("community:project-stats-bulk"), {"ids": f"{p1.id},{p2.id},999999"})
+    assert r.status_code == 200
+    projects = r.json()["projects"]
+    assert set(projects) == {str(p1.id), str(p2.id)}
+    assert projects[str(p2.id)]["languages"] == {"html": 1}
+
+    assert client.get(reverse("community:project-stats-bulk"), {"ids": "x"}).status_code == 400
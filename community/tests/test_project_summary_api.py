@@ -66,3 +66,28 @@ def test_project_summary_after_github_import(client, monkeypatch):
     assert r.status_code == 200
 
 
+
+
+def test_graph_and_summary_share_one_parse(client, monkeypatch):
+    import community.parsing as parsing
+
+    u = User.objects.create_user(username="carol", password="x")
+    p = Project.objects.create(name="shared", creator=u)
+    ProjectFile.objects.create(project=p, path="a.py", content="def foo():\n    bar()\n")
+    ProjectFile.objects.create(project=p, path="b.js", content="function bar(){}")
+
+    calls = []
+    real = parsing.parse_code
+    monkeypatch.setattr(parsing, "parse_code", lambda lang, path, *a: calls.append(path) or real(lang, path, *a))
+
+    assert client.get(reverse("community:project-summary", args=[p.id])).status_code == 200
+    r = client.get(reverse("community:project-graph", args=[p.id]))
+    assert r.status_code == 200
+    assert any(n["id"] == "py.def:foo" for n in r.json()["graph"]["nodes"])
+    assert sorted(calls) == ["a.py", "b.js"]
+
+    # any write drops the shared analysis
+    ProjectFile.objects.create(project=p, path="c.py", content="def baz():\n    pass\n")
+    data = client.get(reverse("community:project-summary", args=[p.id])).json()
+    assert "baz" in [s["name"] for s in data["summary"]["symbols"]]
+    assert sorted(calls) == ["a.py", "a.py", "b.js", "b.js", "c.py"]
@@ -0,0 +1,171 @@
+import hashlib
+import io
+import os
+import zipfile
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from community.models import Project, ProjectFile, UploadSession, User
+from community.uploads import part_path, purge_abandoned_uploads
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def upload_dir(settings, tmp_path):
+    settings.UPLOAD_DIR = str(tmp_path)
+    settings.JOB_RUNNER = "inline"
+    return tmp_path
+
+
+def _archive():
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as z:  # stored: big enough for several chunks
+        for i in range(40):
+            z.writestr(f"src/m{i}.py", f"value = {i}\n" * 50)
+    return buf.getvalue()
+
+
+def _project():
+    u = User.objects.create_user(username="up", password="x")
+    return Project.objects.create(name="big", creator=u)
+
+
+def _put(client, url, data, offset, checksum=None):
+    checksum = checksum or hashlib.sha256(data).hexdigest()
+    return client.put(url, data=data, content_type="application/offset+octet-stream",
+                      HTTP_UPLOAD_OFFSET=str(offset), HTTP_UPLOAD_CHECKSUM=f"sha256 {checksum}")
+
+
+def _create(client, p, data, **extra):
+    r = client.post(reverse("community:project-upload-create", args=[p.id]),
+                    data={"size": len(data), "filename": "big.zip", **extra}, content_type="application/json")
+    assert r.status_code == 201
+    return r["Location"], r.json()["upload_id"]
+
+
+def test_chunked_upload_resume_and_finalize(client, upload_dir):
+    p = _project()
+    data = _archive()
+    url, upload_id = _create(client, p, data, sha256=hashlib.sha256(data).hexdigest())
+    size = 4096
+
+    assert _put(client, url, data[:size], 0).json()["offset"] == size
+    # a corrupt chunk is discarded, the offset does not move
+    r = _put(client, url, data[size:2 * size], size, checksum="0" * 64)
+    assert r.status_code == 400 and r["Upload-Offset"] == str(size)
+    # sending from the wrong offset is refused with the offset to resume from
+    r = _put(client, url, data[3 * size:4 * size], 3 * size)
+    assert r.status_code == 409 and r.json()["offset"] == size
+
+    # "reconnect": ask where to resume, then send the rest
+    offset = int(client.get(url)["Upload-Offset"])
+    assert offset == size
+    while offset < len(data):
+        offset = _put(client, url, data[offset:offset + size], offset).json()["offset"]
+
+    finalize = reverse("community:project-upload-finalize", args=[p.id, upload_id])
+    r = client.post(finalize)
+    assert r.status_code == 200 and r.json()["ingested"] == 40
+    assert ProjectFile.objects.filter(project=p).count() == 40
+    assert UploadSession.objects.get(pk=upload_id).status == "complete"
+    assert list(upload_dir.iterdir()) == []
+    assert client.post(finalize).status_code == 409
+
+
+def test_finalize_checks_completeness_and_whole_file_hash(client, upload_dir):
+    p = _project()
+    data = _archive()
+    url, upload_id = _create(client, p, data, sha256="a" * 64)
+    finalize = reverse("community:project-upload-finalize", args=[p.id, upload_id])
+    _put(client, url, data[:100], 0)
+    assert client.post(finalize).status_code == 409  # incomplete
+
+    _put(client, url, data[100:], 100)
+    assert client.post(finalize).status_code == 400  # whole-file hash differs
+    assert UploadSession.objects.get(pk=upload_id).status == "failed"
+    assert not ProjectFile.objects.filter(project=p).exists()
+
+
+def test_chunk_validation_and_async_finalize(client, upload_dir):
+    p = _project()
+    data = _archive()
+    url, upload_id = _create(client, p, data)
+    r = client.put(url, data=data[:10], content_type="application/offset+octet-stream", HTTP_UPLOAD_OFFSET="0")
+    assert r.status_code == 400  # checksum header required
+    assert _put(client, url, data + b"extra", 0).status_code == 413
+    assert _put(client, url, data, 0).status_code == 200
+
+    r = client.post(reverse("community:project-upload-finalize", args=[p.id, upload_id]) + "?async=1")
+    assert r.status_code == 202
+    job = client.get(r.json()["status_url"]).json()
+    assert job["status"] == "succeeded" and job["result"] == {"ingested": 40}
+    assert list(upload_dir.iterdir()) == []
+
+
+def test_abort_removes_partial_file(client, upload_dir):
+    p = _project()
+    url, upload_id = _create(client, p, b"x" * 10)
+    _put(client, url, b"x" * 5, 0)
+    assert client.delete(url).status_code == 200
+    assert not UploadSession.objects.filter(pk=upload_id).exists()
+    assert list(upload_dir.iterdir()) == []
+
+
+def test_finalize_is_claimed_once(client, upload_dir):
+    p = _project()
+    data = _archive()
+    url, upload_id = _create(client, p, data)
+    _put(client, url, data, 0)
+
+    # another request is finalizing it: this one must neither ingest nor drop the file
+    UploadSession.objects.filter(pk=upload_id).update(status=UploadSession.FINALIZING)
+    r = client.post(reverse("community:project-upload-finalize", args=[p.id, upload_id]))
+    assert r.status_code == 409 and r.json()["detail"] == "Upload is finalizing"
+    assert _put(client, url, data[:10], 0).status_code == 409
+    assert not ProjectFile.objects.filter(project=p).exists()
+    assert os.path.exists(part_path(UploadSession.objects.get(pk=upload_id)))
+
+
+def test_abandoned_uploads_are_given_up(client, upload_dir):
+    p = _project()
+    old_url, old_id = _create(client, p, b"x" * 10)
+    _put(client, old_url, b"x" * 5, 0)
+    UploadSession.objects.filter(pk=old_id).update(updated_at=timezone.now() - timedelta(days=2))
+    (upload_dir / "dead.0.chunk").write_bytes(b"x")
+    os.utime(upload_dir / "dead.0.chunk", (0, 0))
+
+    # starting a new upload sweeps the old one
+    _, new_id = _create(client, p, b"y" * 10)
+    old = UploadSession.objects.get(pk=old_id)
+    assert old.status == "failed" and not os.path.exists(part_path(old))
+    assert [f.name for f in upload_dir.iterdir()] == [f"{UploadSession.objects.get(pk=new_id).pk.hex}.part"]
+    assert purge_abandoned_uploads() == 0
+
+
+def test_finalize_outcome_follows_the_ingest(client, upload_dir, monkeypatch):
+    p = _project()
+    data = b"not an archive at all"
+    url, upload_id = _create(client, p, data)
+    _put(client, url, data, 0)
+    # async: the upload is not "complete" until the job says so, and here it fails
+    r = client.post(reverse("community:project-upload-finalize", args=[p.id, upload_id]) + "?async=1")
+    assert r.status_code == 202
+    upload = UploadSession.objects.get(pk=upload_id)
+    assert upload.status == "failed" and upload.job_id == r.json()["job_id"]
+
+    # sync: an unexpected error fails the upload too, rather than leaving it finalizing
+    url, upload_id = _create(client, p, data)
+    _put(client, url, data, 0)
+
+    def broken(*args, **kwargs):
+        raise OSError("disk gone")
+
+    monkeypatch.setattr(Project, "ingest_archive", broken)
+    with pytest.raises(OSError):
+        client.post(reverse("community:project-upload-finalize", args=[p.id, upload_id]))
+    assert UploadSession.objects.get(pk=upload_id).status == "failed"
+    assert list(upload_dir.iterdir()) == []
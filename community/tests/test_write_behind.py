@@ -0,0 +1,88 @@
+import json
+
+import pytest
+from django.urls import reverse
+
+from community import writebehind
+from community.models import Project, ProjectFile, ProjectStats, User
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def wb(settings):
+    settings.FILE_WRITE_BEHIND = True
+    # the background thread never finds anything due; tests flush by hand
+    settings.FILE_WRITE_BEHIND_INTERVAL = 3600
+    settings.FILE_WRITE_BEHIND_IDLE = 3600
+    yield writebehind.buffer
+    writebehind.buffer.clear()
+
+
+@pytest.fixture
+def pf():
+    u = User.objects.create_user(username="wb", password="x")
+    p = Project.objects.create(name="wb", creator=u)
+    return ProjectFile.objects.create(project=p, path="notes.md", content="v0\n")
+
+
+def _url(pf):
+    return reverse("community:project-file-detail", args=[pf.project_id, pf.path])
+
+
+def _put(client, pf, text, **headers):
+    return client.put(_url(pf), data=json.dumps({"content": text}), content_type="application/json", **headers)
+
+
+def test_autosaves_coalesce_into_one_write(client, wb, pf):
+    version = ProjectStats.objects.get(project_id=pf.project_id).version
+    for i in range(1, 11):
+        r = _put(client, pf, f"v{i}")
+        assert r.status_code == 200 and r.json()["buffered"] is True
+    assert ProjectFile.objects.get(pk=pf.pk).content == "v0\n"
+
+    # reads see the latest save, and If-Match checks against it
+    r = client.get(_url(pf))
+    assert r.json()["content"] == "v10\n"
+    assert _put(client, pf, "stale", HTTP_IF_MATCH="nope").status_code == 412
+    assert _put(client, pf, "v11", HTTP_IF_MATCH=r["ETag"]).status_code == 200
+
+    assert writebehind.flush() == 1
+    stored = ProjectFile.objects.get(pk=pf.pk)
+    assert stored.content == "v11\n" and len(wb) == 0
+    assert ProjectStats.objects.get(project_id=pf.project_id).version == version + 1
+
+
+def test_project_reads_flush_and_other_writers_win(client, wb, pf):
+    _put(client, pf, "buffered")
+    r = client.post(reverse("community:project-files-bulk", args=[pf.project_id]),
+                    data=json.dumps({"paths": ["notes.md"]}), content_type="application/json")
+    assert json.loads(b"".join(r.streaming_content))["content"] == "buffered\n"
+    assert ProjectFile.objects.get(pk=pf.pk).content == "buffered\n"
+
+    _put(client, pf, "lost")
+    other = ProjectFile.objects.get(pk=pf.pk)
+    other.content = "uploaded\n"
+    other.save(update_fields=["content"])
+    assert client.get(_url(pf)).json()["content"] == "uploaded\n"
+    assert writebehind.flush() == 0
+    assert ProjectFile.objects.get(pk=pf.pk).content == "uploaded\n"
+
+
+def test_off_by_default(client, pf):
+    r = _put(client, pf, "direct")
+    assert "buffered" not in r.json()
+    assert ProjectFile.objects.get(pk=pf.pk).content == "direct\n"
+
+
+def test_save_after_another_writer_is_based_on_the_new_row(client, wb, pf):
+    _put(client, pf, "buffered")
+    other = ProjectFile.objects.get(pk=pf.pk)
+    other.content = "uploaded\n"
+    other.save(update_fields=["content"])
+
+    r = client.get(_url(pf))
+    assert r.json()["content"] == "uploaded\n"
+    assert _put(client, pf, "mine", HTTP_IF_MATCH=r["ETag"]).status_code == 200
+    assert writebehind.flush() == 1
+    assert ProjectFile.objects.get(pk=pf.pk).content == "mine\n"
@@ -0,0 +1,127 @@
+# community/tree.py
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import ProjectDir, ProjectFile, ProjectStats
+
+MAX_DEPTH = 10
+
+
+def tree_cache_key(project_id: int, version: int) -> str:
+    return f"project-tree:{project_id}:{version}"
+
+
+def build_tree(paths: Iterable[str]) -> Dict[str, Any]:
+    """Nested {"name", "type", "children"} dict of all paths; dirs first, then files, by name."""
+    root = {"name": "", "type": "dir", "children": {}}
+
+    for p in paths:
+        parts = p.split("/")
+        node = root
+        for i, part in enumerate(parts):
+            is_file = (i == len(parts) - 1)
+            bucket = node["children"]
+            if part not in bucket:
+                bucket[part] = {"name": part, "type": "file" if is_file else "dir", "children": {} if not is_file else None}
+            node = bucket[part]
+
+    def to_list(n):
+        if n["type"] == "file":
+            return {"name": n["name"], "type": "file"}
+        children = [to_list(c) for c in n["children"].values()]
+        # sort dirs first, then files, alpha
+        children.sort(key=lambda x: (x["type"] != "dir", x["name"]))
+        return {"name": n["name"] or "/", "type": "dir", "children": children}
+
+    return to_list(root)
+
+
+def full_tree(project_id: int) -> Dict[str, Any]:
+    """{"tree", "total_files"}, cached per content version (ProjectStats.version)."""
+    key = tree_cache_key(project_id, ProjectStats.version_for(project_id))
+    data = cache.get(key)
+    if data is None:
+        paths = list(ProjectFile.objects.filter(project_id=project_id).values_list("path", flat=True))
+        data = {"tree": build_tree(paths), "total_files": len(paths)}
+        cache.set(key, data, getattr(settings, "PROJECT_TREE_CACHE_SECONDS", 3600))
+    return data
+
+
+# -------------------------
+# Lazy listing (ProjectDir)
+# -------------------------
+
+def _dir_entry(d: ProjectDir) -> Dict[str, Any]:
+    return {"name": d.name, "path": d.path, "type": "dir",
+            "file_count": d.file_count, "child_count": d.child_dirs + d.child_files}
+
+
+def _file_entry(path: str, size: int, language: str) -> Dict[str, Any]:
+    return {"name": path.rpartition("/")[2], "path": path, "type": "file", "size": size, "language": language}
+
+
+_FILE_COLUMNS = ("path", "size", "language")
+
+
+def _expand(project_id: int, entries: List[Dict[str, Any]], levels: int) -> None:
+    """Fill "children" of the dir entries, `levels` deep; one query per kind and level."""
+    frontier = {e["path"]: e for e in entries if e["type"] == "dir"}
+    for _ in range(levels):
+        if not frontier:
+            return
+        for e in frontier.values():
+            e["children"] = []
+        nxt = {}
+        dirs = ProjectDir.objects.filter(project_id=project_id, parent__in=list(frontier)).order_by("path")
+        for d in dirs:
+            entry = _dir_entry(d)
+            frontier[d.parent]["children"].append(entry)
+            nxt[d.path] = entry
+        files = (ProjectFile.objects.filter(project_id=project_id, directory__in=list(frontier))
+                 .order_by("path").values_list("directory", *_FILE_COLUMNS))
+        for directory, *row in files:
+            frontier[directory]["children"].append(_file_entry(*row))
+        frontier = nxt
+
+
+def list_dir(project_id: int, prefix: str = "", depth: int = 1, offset: int = 0,
+             limit: int = 200) -> Dict[str, Any] | None:
+    """
+    Immediate children of directory `prefix` ("" = root), dirs first then
+    files, each by name; `offset`/`limit` page over them. With depth > 1
+    sub-directories on the page carry their own children that many levels
+    down. Reads only the rows listed, via the ProjectDir and
+    (project, directory, path) indexes. None if `prefix` is not a directory.
+    """
+    prefix = prefix.strip("/")
+    depth = min(max(depth, 1), MAX_DEPTH)
+    dirs = ProjectDir.objects.filter(project_id=project_id, parent=prefix).order_by("path")
+    files = ProjectFile.objects.filter(project_id=project_id, directory=prefix).order_by("path")
+    if prefix:
+        node = ProjectDir.objects.filter(project_id=project_id, path=prefix).first()
+        if node is None:
+            return None
+        file_count, n_dirs, n_files = node.file_count, node.child_dirs, node.child_files
+    else:
+        stats = ProjectStats.objects.filter(project_id=project_id).first()
+        n_dirs, n_files = dirs.count(), files.count()
+        file_count = stats.file_count if stats else ProjectFile.objects.filter(project_id=project_id).count()
+
+    children = [_dir_entry(d) for d in dirs[offset:offset + limit]] if offset < n_dirs else []
+    room = limit - len(children)
+    if room > 0:
+        start = max(offset - n_dirs, 0)
+        children += [_file_entry(*row) for row in files.values_list(*_FILE_COLUMNS)[start:start + room]]
+    _expand(project_id, children, depth - 1)
+    return {
+        "prefix": prefix,
+        "depth": depth,
+        "file_count": file_count,
+        "total_children": n_dirs + n_files,
+        "has_more": offset + limit < n_dirs + n_files,
+        "children": children,
+    }
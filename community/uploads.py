@@ -0,0 +1,171 @@
+# community/uploads.py
+from __future__ import annotations
+
+import glob
+import hashlib
+import logging
+import os
+import re
+import shutil
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import UploadSession
+
+log = logging.getLogger(__name__)
+
+READ_CHUNK = 64 * 1024
+_CHECKSUM_RE = re.compile(r"^sha256[ =]([0-9a-fA-F]{64})$")
+
+
+class ChunkRejected(ValueError):
+    """A chunk that can't be applied; `status` is the HTTP status to answer with."""
+
+    def __init__(self, detail: str, status: int = 400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status = status
+
+
+def upload_dir() -> str:
+    path = str(getattr(settings, "UPLOAD_DIR", None) or os.path.join(settings.MEDIA_ROOT, "uploads"))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def max_upload_bytes() -> int:
+    return int(getattr(settings, "UPLOAD_MAX_BYTES", 4 * 1024 ** 3))
+
+
+def max_chunk_bytes() -> int:
+    return int(getattr(settings, "UPLOAD_MAX_CHUNK_BYTES", 64 * 1024 ** 2))
+
+
+def abandon_seconds() -> int:
+    """An upload that has not moved for this long is given up and its bytes removed."""
+    return int(getattr(settings, "UPLOAD_ABANDON_SECONDS", 24 * 3600))
+
+
+def part_path(upload: UploadSession) -> str:
+    return os.path.join(upload_dir(), f"{upload.pk.hex}.part")
+
+
+def create_part(upload: UploadSession) -> None:
+    open(part_path(upload), "wb").close()
+
+
+def remove_part(upload: UploadSession) -> None:
+    try:
+        os.remove(part_path(upload))
+    except FileNotFoundError:
+        pass
+
+
+def parse_checksum(header: str | None) -> str:
+    """`Upload-Checksum: sha256 <hex>` (or sha256=<hex>) -> lowercase hex digest."""
+    m = _CHECKSUM_RE.match((header or "").strip())
+    if not m:
+        raise ChunkRejected("Upload-Checksum header required: 'sha256 <hex digest>'")
+    return m.group(1).lower()
+
+
+def check_chunk(upload: UploadSession, length: int, offset: int) -> None:
+    """Raise ChunkRejected unless a chunk of `length` bytes at `offset` fits the upload as it is now."""
+    if offset != upload.offset:
+        raise ChunkRejected(f"Upload-Offset {offset} does not match current offset {upload.offset}", status=409)
+    if length <= 0:
+        raise ChunkRejected("Empty chunk")
+    if length > max_chunk_bytes():
+        raise ChunkRejected(f"Chunk larger than {max_chunk_bytes()} bytes", status=413)
+    if offset + length > upload.size:
+        raise ChunkRejected("Chunk runs past the declared upload size", status=413)
+
+
+def receive_chunk(upload: UploadSession, stream, length: int, checksum: str) -> str:
+    """
+    Read `length` bytes from `stream` into a file of their own next to the
+    part file and return its path. The bytes are hashed as they arrive; a
+    short or corrupt chunk (checksum mismatch) is removed again and
+    rejected. Runs without the row lock: however slow the client, nobody
+    waits on it, and the part file is not touched until commit_chunk.
+    """
+    staged = os.path.join(upload_dir(), f"{upload.pk.hex}.{uuid.uuid4().hex}.chunk")
+    digest = hashlib.sha256()
+    received = 0
+    try:
+        with open(staged, "wb") as fh:
+            while received < length:
+                data = stream.read(min(READ_CHUNK, length - received))
+                if not data:
+                    break
+                digest.update(data)
+                fh.write(data)
+                received += len(data)
+        if received != length or digest.hexdigest() != checksum:
+            raise ChunkRejected("Chunk checksum mismatch" if received == length else "Chunk truncated")
+    except BaseException:
+        discard_chunk(staged)
+        raise
+    return staged
+
+
+def commit_chunk(upload: UploadSession, staged: str, offset: int) -> int:
+    """
+    Copy a verified chunk into the part file at `offset` and return the new
+    offset; the part file only ever holds verified chunks. Caller holds the
+    row lock, has re-checked the offset and saves the new one.
+    """
+    with open(staged, "rb") as src, open(part_path(upload), "r+b") as fh:
+        fh.seek(offset)
+        shutil.copyfileobj(src, fh, READ_CHUNK * 16)
+        fh.flush()
+        os.fsync(fh.fileno())
+        return fh.tell()
+
+
+def discard_chunk(staged: str) -> None:
+    try:
+        os.remove(staged)
+    except FileNotFoundError:
+        pass
+
+
+def file_sha256(upload: UploadSession) -> str:
+    digest = hashlib.sha256()
+    with open(part_path(upload), "rb") as fh:
+        for data in iter(lambda: fh.read(READ_CHUNK * 16), b""):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def purge_abandoned_uploads(seconds: int | None = None) -> int:
+    """
+    Give up uploads that are still open (or stuck finalizing) but have not
+    moved for `seconds` (default abandon_seconds()): they are marked failed
+    and their part files removed, as are chunk files left behind by
+    requests that died while receiving. Returns the number of uploads given up.
+    """
+    seconds = abandon_seconds() if seconds is None else seconds
+    cutoff = timezone.now() - timedelta(seconds=seconds)
+    stale = UploadSession.objects.filter(
+        status__in=[UploadSession.OPEN, UploadSession.FINALIZING], updated_at__lt=cutoff)
+    count = 0
+    for upload in stale.only("pk"):
+        # only if nobody touched it since the query above
+        if UploadSession.objects.filter(pk=upload.pk, updated_at__lt=cutoff).update(
+                status=UploadSession.FAILED, updated_at=timezone.now()):
+            remove_part(upload)
+            count += 1
+    for staged in glob.glob(os.path.join(upload_dir(), "*.chunk")):
+        try:
+            if os.path.getmtime(staged) < time.time() - seconds:
+                discard_chunk(staged)
+        except FileNotFoundError:
+            pass
+    if count:
+        log.info("gave up %d abandoned upload(s)", count)
+    return count
@@ -9,18 +9,35 @@ urlpatterns = [
     path("projects/<int:project_id>/upload-zip/", views.upload_zip, name="project-upload-zip"),
     path("projects/<int:project_id>/download.zip", views.download_project, name="project-download-zip"),
 
+    # Resumable chunked uploads
+    path("projects/<int:project_id>/uploads/", views.project_upload_create, name="project-upload-create"),
+    path("projects/<int:project_id>/uploads/<uuid:upload_id>/", views.project_upload_detail, name="project-upload-detail"),
+    path("projects/<int:project_id>/uploads/<uuid:upload_id>/finalize/", views.project_upload_finalize, name="project-upload-finalize"),
+
+    # Manifest sync (client posts path -> hash, then uploads only the delta)
+    path("projects/<int:project_id>/sync/manifest/", views.project_sync_manifest, name="project-sync-manifest"),
+    path("projects/<int:project_id>/sync/upload/", views.project_sync_upload, name="project-sync-upload"),
+
     # Files
     path("projects/<int:project_id>/files/bulk/", views.project_files_bulk, name="project-files-bulk"),
     path("projects/<int:project_id>/files/tree/", views.project_file_tree, name="project-file-tree"),
+    path("projects/<int:project_id>/search/", views.project_code_search, name="project-code-search"),
+    path("projects/<int:project_id>/lint/", views.project_lint, name="project-lint"),
     re_path(r"^projects/(?P<project_id>\d+)/files/(?P<path>.+)/$", views.project_file_detail, name="project-file-detail"),
 
     # Graph & summary
     path("projects/<int:project_id>/graph/", views.project_graph, name="project-graph"),
     path("projects/<int:project_id>/summary", views.project_summary, name="project-summary"),
+    path("projects/stats/", views.project_stats_bulk, name="project-stats-bulk"),
+    path("analyze/", views.analyze_archive, name="analyze-archive"),
+    path("formatters/stats/", views.formatter_stats, name="formatter-stats"),
 
     # GitHub import
     path("projects/<int:project_id>/import/github/", views.project_import_github, name="project-import-github"),
 
+    # Background jobs (async uploads / imports)
+    path("projects/<int:project_id>/jobs/<int:job_id>/", views.project_job_detail, name="project-job-detail"),
+
     # Threads (direct thread API used in error tests)
     path("threads/<int:thread_id>/messages/add/", views.thread_add_message, name="thread-add-message"),
 
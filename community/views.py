@@ -1,36 +1,68 @@
 # community/views.py
 
 # --- standard library ---
-import hashlib
-import io
 import json
+import os
 import re
+import tarfile
+import tempfile
 import zipfile
+import zlib
+from itertools import islice
 
 # --- third-party ---
 import requests
-from asgiref.sync import async_to_sync
+from asgiref.sync import async_to_sync, sync_to_async
 from channels.layers import get_channel_layer
 
 # --- Django ---
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
 from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import F
 from django.http import (
+    FileResponse,
     HttpResponse,
     HttpResponseBadRequest,
     HttpResponseForbidden,
+    HttpResponseNotModified,
     JsonResponse,
+    StreamingHttpResponse,
 )
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_GET, require_POST, require_http_methods
 
 # --- local ---
-from .formatters import format_for_path
+from .bulk import BULK_FIELDS, iter_bulk_files, max_bulk_paths
+from .edits import EditError, apply_text_edits
+from .export import COMPRESSIONS, build_artifact, cached_artifact, export_etag, iter_project_zip_cached
+from .formatters import FormatterBusy, format_for_path, formatter_pool
+from .ingest import (
+    ArchiveRejected, apply_sync, diff_manifest, ingest_zipball, iter_archive_texts, iter_zip_texts,
+)
+from .jobs import JobFailed, JobProgress, ensure_recovered, remove_spooled, spool_upload, start_job
+from .lines import FileWindow
 from .linters import lint_for_path
-from .models import Message, Project, ProjectFile, Thread
-from .parsing import build_project_summary, parse_project_files
+from .lintpool import iter_project_lint
+from .models import (
+    GithubSource, Job, Message, Project, ProjectFile, ProjectStats, Thread, UploadSession, content_hash,
+)
+from .parsing import (
+    analysis_cache_key, analyze_files, analyze_project_files, graph_from_analysis, summary_from_analysis,
+)
+from .search import SearchQueryError, search_project
+from .tree import full_tree, list_dir
+from .uploads import (
+    ChunkRejected, check_chunk, commit_chunk, create_part, discard_chunk, file_sha256, max_upload_bytes,
+    parse_checksum, part_path, purge_abandoned_uploads, receive_chunk, remove_part,
+)
+from . import writebehind
 from importlib import import_module
 
 
@@ -38,22 +70,479 @@ _GITHUB_RE = re.compile(
     r"^https?://github\.com/(?P<owner>[^/]+)/(?P<repo>[^/]+?)(?:\.git)?(?:/|$)"
 )
 
+def _wants_async(request, payload: dict | None = None) -> bool:
+    flag = request.GET.get("async") or request.POST.get("async") or (payload or {}).get("async")
+    return str(flag).lower() in ("1", "true", "yes", "on")
+
+
+def _job_accepted(job: Job) -> JsonResponse:
+    url = reverse("community:project-job-detail", args=[job.project_id, job.pk])
+    resp = JsonResponse({"job_id": job.pk, "status": job.status, "status_url": url}, status=202)
+    resp["Location"] = url
+    return resp
+
+
+# bodies sent as-is (not multipart) are read as a stream; only tar can be
+# ingested without buffering, a raw zip is spooled first (see ingest_archive)
+_RAW_ARCHIVE_TYPES = {
+    "application/x-tar", "application/gzip", "application/x-gzip", "application/x-bzip2",
+    "application/x-xz", "application/zstd", "application/x-zstd", "application/zip",
+    "application/octet-stream",
+}
+_ARCHIVE_ERRORS = (zipfile.BadZipFile, tarfile.TarError, EOFError, zlib.error)
+
+
+def _ingest_upload_job(job: Job, progress: JobProgress, path: str) -> dict:
+    try:
+        count = job.project.ingest_archive(path, progress=progress)
+    except zipfile.BadZipFile:
+        raise JobFailed("Not a valid zip file")
+    except _ARCHIVE_ERRORS:
+        raise JobFailed("Not a valid zip or tar archive")
+    except ArchiveRejected as e:
+        raise JobFailed(str(e))
+    finally:
+        remove_spooled(path)
+    return {"ingested": count}
+
+
+def _finalize_upload_job(job: Job, progress: JobProgress, upload_id: str) -> dict:
+    """_ingest_upload_job for a resumable upload, which ends COMPLETE or FAILED with it."""
+    upload = UploadSession.objects.get(pk=upload_id)
+    status = UploadSession.FAILED
+    try:
+        result = _ingest_upload_job(job, progress, part_path(upload))
+        status = UploadSession.COMPLETE
+        return result
+    finally:
+        UploadSession.objects.filter(pk=upload.pk).update(status=status, job=job, updated_at=timezone.now())
+
+
+@csrf_exempt
 @require_POST
 def upload_zip(request, project_id: int):
+    """
+    Upload a zip, tar, tar.gz/.bz2/.xz or tar.zst archive (format sniffed):
+      - multipart form field "file", or
+      - the raw request body with an archive Content-Type (e.g.
+        application/gzip); tar bodies are ingested while they are read.
+    With ?async=1 the archive is spooled to disk and ingested by a
+    background job: 202 + job id (see project_job_detail).
+    """
     project = get_object_or_404(Project, pk=project_id)
-    zip_file = request.FILES.get("file")
-    if not zip_file:
+    upload = request.FILES.get("file")
+    if upload is None and request.content_type in _RAW_ARCHIVE_TYPES:
+        upload = request  # HttpRequest is a readable stream over the body
+    if upload is None:
         return HttpResponseBadRequest("Missing file")
-    count = project.ingest_zip(zip_file)
+    if _wants_async(request):
+        name = getattr(upload, "name", "") if upload is not request else ""
+        size = getattr(upload, "size", None) if upload is not request else None
+        job = start_job(project, "zip_upload", _ingest_upload_job, spool_upload(upload),
+                        params={"name": name, "size": size}, user=request.user)
+        return _job_accepted(job)
+    try:
+        count = project.ingest_archive(upload)
+    except zipfile.BadZipFile:
+        return HttpResponseBadRequest("Not a valid zip file")
+    except _ARCHIVE_ERRORS:
+        return HttpResponseBadRequest("Not a valid zip or tar archive")
+    except ArchiveRejected as e:
+        return HttpResponseBadRequest(str(e))
     return JsonResponse({"ingested": count})
 
+
+def _upload_response(upload: UploadSession, status: int = 200) -> JsonResponse:
+    resp = JsonResponse(upload.as_dict(), status=status)
+    resp["Upload-Offset"] = str(upload.offset)
+    resp["Upload-Length"] = str(upload.size)
+    return resp
+
+
+def _chunk_rejected(upload: UploadSession, e: ChunkRejected) -> JsonResponse:
+    resp = JsonResponse({"detail": e.detail, "offset": upload.offset}, status=e.status)
+    resp["Upload-Offset"] = str(upload.offset)
+    return resp
+
+
+@csrf_exempt
+@require_POST
+def project_upload_create(request, project_id: int):
+    """
+    Start a resumable upload.
+    POST JSON: {"size": <bytes>, "filename": "...", "sha256": "<hex of whole file>"}  (sha256 optional)
+    -> 201 {"upload_id", "offset": 0, ...}; then PUT chunks to the upload URL.
+    Uploads idle for UPLOAD_ABANDON_SECONDS are given up here, in passing.
+    """
+    project = get_object_or_404(Project, pk=project_id)
+    purge_abandoned_uploads()
+    try:
+        payload = json.loads(request.body or "{}")
+    except json.JSONDecodeError:
+        return JsonResponse({"detail": "Invalid JSON"}, status=400)
+    size = payload.get("size")
+    if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+        return JsonResponse({"detail": "'size' must be a positive integer"}, status=400)
+    if size > max_upload_bytes():
+        return JsonResponse({"detail": f"Uploads are limited to {max_upload_bytes()} bytes"}, status=413)
+    sha256 = (payload.get("sha256") or "").lower()
+    if sha256 and not _SHA256_RE.match(sha256):
+        return JsonResponse({"detail": "'sha256' must be a hex digest"}, status=400)
+
+    upload = UploadSession.objects.create(
+        project=project, size=size, sha256=sha256, filename=str(payload.get("filename") or "")[:255],
+        created_by=request.user if request.user.is_authenticated else None,
+    )
+    create_part(upload)
+    resp = _upload_response(upload, status=201)
+    resp["Location"] = reverse("community:project-upload-detail", args=[project.id, upload.pk])
+    return resp
+
+
+@csrf_exempt
+@require_http_methods(["GET", "HEAD", "PUT", "DELETE"])
+def project_upload_detail(request, project_id: int, upload_id):
+    """
+    GET/HEAD -> current offset (body + Upload-Offset header): where to resume
+    PUT      -> one chunk as the raw body, headers:
+                  Upload-Offset:   byte offset of the chunk (must equal the current offset, else 409)
+                  Upload-Checksum: sha256 <hex digest of the chunk>
+                a bad or truncated chunk is discarded (400); resend from the returned offset
+    DELETE   -> abort and drop the stored bytes
+    """
+    upload = get_object_or_404(UploadSession, pk=upload_id, project_id=project_id)
+    if request.method in ("GET", "HEAD"):
+        return _upload_response(upload)
+    if request.method == "DELETE":
+        remove_part(upload)
+        upload.delete()
+        return JsonResponse({"deleted": True})
+
+    try:
+        offset = int(request.headers.get("Upload-Offset", ""))
+        length = int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        return JsonResponse({"detail": "Upload-Offset header must be an integer"}, status=400)
+    if upload.status != UploadSession.OPEN:
+        return JsonResponse({"detail": f"Upload is {upload.status}"}, status=409)
+    try:
+        checksum = parse_checksum(request.headers.get("Upload-Checksum"))
+        check_chunk(upload, length, offset)
+        # the body is read with no lock held; the row is locked only to append the verified chunk
+        staged = receive_chunk(upload, request, length, checksum)
+    except ChunkRejected as e:
+        return _chunk_rejected(upload, e)
+    try:
+        with transaction.atomic():
+            upload = UploadSession.objects.select_for_update().get(pk=upload.pk)
+            if upload.status != UploadSession.OPEN:
+                return JsonResponse({"detail": f"Upload is {upload.status}"}, status=409)
+            try:
+                check_chunk(upload, length, offset)  # another request may have sent it meanwhile
+            except ChunkRejected as e:
+                return _chunk_rejected(upload, e)
+            upload.offset = commit_chunk(upload, staged, offset)
+            upload.save(update_fields=["offset", "updated_at"])
+    finally:
+        discard_chunk(staged)
+    return _upload_response(upload)
+
+
+@csrf_exempt
+@require_POST
+def project_upload_finalize(request, project_id: int, upload_id):
+    """
+    Once every byte is in: verify the whole-file sha256 (if given at
+    create) and ingest the assembled archive (zip or tar, see upload_zip).
+    ?async=1 hands it to a background job instead: 202 + job id.
+    409 if bytes are missing or the upload is already being finalized.
+    """
+    upload = get_object_or_404(UploadSession, pk=upload_id, project_id=project_id)
+    # claim it: of concurrent finalizes exactly one moves the row on, the rest get 409
+    claimed = UploadSession.objects.filter(pk=upload.pk, status=UploadSession.OPEN, offset=F("size")).update(
+        status=UploadSession.FINALIZING, updated_at=timezone.now())
+    if not claimed:
+        upload.refresh_from_db()
+        if upload.status != UploadSession.OPEN:
+            return JsonResponse({"detail": f"Upload is {upload.status}"}, status=409)
+        return JsonResponse({"detail": "Upload incomplete", "offset": upload.offset}, status=409)
+    upload.status = UploadSession.FINALIZING
+
+    if _wants_async(request):
+        try:
+            checked = not upload.sha256 or file_sha256(upload) == upload.sha256
+        except BaseException:
+            _fail_upload(upload)
+            raise
+        if not checked:
+            _fail_upload(upload)
+            return JsonResponse({"detail": "File checksum mismatch"}, status=400)
+        # the upload stays FINALIZING until the job has ingested it (or failed to)
+        job = start_job(upload.project, "zip_upload", _finalize_upload_job, str(upload.pk),
+                        params={"name": upload.filename, "size": upload.size, "upload_id": str(upload.pk)},
+                        user=request.user)
+        UploadSession.objects.filter(pk=upload.pk).update(job=job)
+        return _job_accepted(job)
+
+    upload.status = UploadSession.FAILED  # whatever goes wrong below, unless the ingest gets through
+    try:
+        if upload.sha256 and file_sha256(upload) != upload.sha256:
+            return JsonResponse({"detail": "File checksum mismatch"}, status=400)
+        count = upload.project.ingest_archive(part_path(upload))
+    except (ArchiveRejected, *_ARCHIVE_ERRORS) as e:
+        detail = str(e) if isinstance(e, ArchiveRejected) else "Not a valid zip or tar archive"
+        return JsonResponse({"detail": detail}, status=400)
+    else:
+        upload.status = UploadSession.COMPLETE
+        return JsonResponse({"ingested": count, "upload_id": str(upload.pk)})
+    finally:
+        upload.save(update_fields=["status", "updated_at"])
+        remove_part(upload)
+
+
+def _fail_upload(upload: UploadSession) -> None:
+    upload.status = UploadSession.FAILED
+    upload.save(update_fields=["status", "updated_at"])
+    remove_part(upload)
+
+
+async def _async_chunks(chunks):
+    end = object()
+    while True:
+        chunk = await sync_to_async(next, thread_sensitive=True)(chunks, end)
+        if chunk is end:
+            break
+        yield chunk
+
+
+def _streaming_response(request, chunks, content_type: str) -> StreamingHttpResponse:
+    """
+    Wrap a sync iterator for streaming. Under ASGI Django would otherwise
+    buffer a sync iterator whole (list()) before sending, so pull it chunk
+    by chunk from the sync thread instead.
+    """
+    if isinstance(request, ASGIRequest):
+        return StreamingHttpResponse(_async_chunks(chunks), content_type=content_type)
+    return StreamingHttpResponse(chunks, content_type=content_type)
+
+
+class _RangeReader:
+    """File-like window [start, start + length) over an open file, for 206 responses."""
+
+    def __init__(self, fh, start: int, length: int):
+        fh.seek(start)
+        self._fh = fh
+        self._left = length
+
+    def read(self, n: int = -1) -> bytes:
+        if self._left <= 0:
+            return b""
+        n = self._left if n is None or n < 0 else min(n, self._left)
+        data = self._fh.read(n)
+        self._left -= len(data)
+        return data
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+def _parse_range(header: str, size: int):
+    """Single 'bytes=a-b' / 'bytes=a-' / 'bytes=-n' range -> (start, end) inclusive; "invalid" if unsatisfiable."""
+    m = re.fullmatch(r"\s*bytes=(\d*)-(\d*)\s*", header or "")
+    if not m or m.group(1) == m.group(2) == "":
+        return None  # malformed or multi-range: ignore it and send everything
+    if m.group(1) == "":
+        suffix = int(m.group(2))
+        if suffix == 0:
+            return "invalid"
+        return max(size - suffix, 0), size - 1
+    start = int(m.group(1))
+    end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+    if start >= size or end < start:
+        return "invalid"
+    return start, end
+
+
+def _file_response(request, path: str, filename: str, content_type: str, etag: str):
+    """
+    FileResponse (sendfile-capable under WSGI) with ETag, Accept-Ranges and
+    single-range support honouring If-Range.
+    """
+    fh = open(path, "rb")
+    size = os.fstat(fh.fileno()).st_size
+    wanted = request.headers.get("Range")
+    if_range = request.headers.get("If-Range")
+    rng = _parse_range(wanted, size) if wanted and (not if_range or if_range == etag) else None
+
+    if rng == "invalid":
+        fh.close()
+        resp = HttpResponse(status=416)
+        resp["Content-Range"] = f"bytes */{size}"
+    elif rng is None:
+        resp = FileResponse(fh, as_attachment=True, filename=filename, content_type=content_type)
+    else:
+        start, end = rng
+        resp = FileResponse(_RangeReader(fh, start, end - start + 1), as_attachment=True,
+                            filename=filename, content_type=content_type)
+        resp.status_code = 206
+        resp["Content-Range"] = f"bytes {start}-{end}/{size}"
+        resp["Content-Length"] = str(end - start + 1)
+    resp["Accept-Ranges"] = "bytes"
+    resp["ETag"] = etag
+    if resp.streaming and isinstance(request, ASGIRequest):
+        resp.streaming_content = _async_chunks(iter(resp.streaming_content))
+    return resp
+
+
+def _etag_matches(header: str | None, etag: str) -> bool:
+    if not header:
+        return False
+    return header.strip() == "*" or etag in [t.strip().removeprefix("W/") for t in header.split(",")]
+
+
 def download_project(request, project_id: int):
+    """
+    The project as a zip.
+      ?compression=deflate|stored   (default deflate)
+      ?level=0-9                    deflate level (default 6)
+
+    Archives are cached on disk per (content version, compression, level):
+    a cached one is served as a file with Range/If-Range support; otherwise
+    the zip streams out while it is compressed and lands in the cache.
+    Any file write moves the version, so stale archives are never served.
+    """
     project = get_object_or_404(Project, pk=project_id)
-    data = project.as_zip_bytes()
-    resp = HttpResponse(data, content_type="application/zip")
-    resp["Content-Disposition"] = f'attachment; filename="{project.name}.zip"'
+    writebehind.flush(project.id)
+    compression = request.GET.get("compression", "deflate")
+    if compression not in COMPRESSIONS:
+        return HttpResponseBadRequest("compression must be 'deflate' or 'stored'")
+    try:
+        level = int(request.GET.get("level", 6))
+    except ValueError:
+        return HttpResponseBadRequest("level must be an integer 0-9")
+    if not 0 <= level <= 9:
+        return HttpResponseBadRequest("level must be an integer 0-9")
+
+    version = ProjectStats.version_for(project.id)
+    etag = export_etag(project.id, version, compression, level)
+    if _etag_matches(request.headers.get("If-None-Match"), etag):
+        resp = HttpResponseNotModified()
+        resp["ETag"] = etag
+        return resp
+
+    filename = f"{project.name}.zip"
+    path = cached_artifact(project.id, version, compression, level)
+    if path is None and request.headers.get("Range"):
+        path = build_artifact(project.id, version, compression, level)
+    if path is not None:
+        return _file_response(request, path, filename, "application/zip", etag)
+
+    chunks = iter_project_zip_cached(project.id, version, compression=compression, level=level)
+    resp = _streaming_response(request, chunks, "application/zip")
+    resp["Content-Disposition"] = f'attachment; filename="{filename}"'
+    resp["ETag"] = etag
     return resp
 
+
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+_MAX_PATH = ProjectFile._meta.get_field("path").max_length
+
+
+def _valid_path(path) -> bool:
+    return isinstance(path, str) and 0 < len(path) <= _MAX_PATH and not path.endswith("/")
+
+
+@csrf_exempt
+@require_POST
+def project_sync_manifest(request, project_id: int):
+    """
+    Phase 1 of a client sync.
+    POST JSON: {"files": {"<path>": "<sha256 of UTF-8 content>", ...}}
+           or  {"files": [{"path": "...", "hash": "..."}, ...]}
+    -> {"missing": [...], "changed": [...], "delete": [...], "unchanged": n, "upload_url": ...}
+    The client then sends only missing + changed (and the deletes it agrees
+    with) to project_sync_upload.
+    """
+    project = get_object_or_404(Project, pk=project_id)
+    try:
+        payload = json.loads(request.body or "{}")
+    except json.JSONDecodeError:
+        return JsonResponse({"detail": "Invalid JSON"}, status=400)
+
+    entries = payload.get("files")
+    if isinstance(entries, list):
+        try:
+            entries = {e["path"]: e["hash"] for e in entries}
+        except (TypeError, KeyError):
+            return JsonResponse({"detail": "files entries need 'path' and 'hash'"}, status=400)
+    if not isinstance(entries, dict):
+        return JsonResponse({"detail": "'files' must be a manifest of path -> sha256"}, status=400)
+    for path, digest in entries.items():
+        if not _valid_path(path) or not isinstance(digest, str) or not _SHA256_RE.match(digest.lower()):
+            return JsonResponse({"detail": f"Invalid manifest entry for {path!r}"}, status=400)
+
+    diff = diff_manifest(project, {path: digest.lower() for path, digest in entries.items()})
+    return JsonResponse({
+        "project_id": project.id,
+        **diff,
+        "upload_url": reverse("community:project-sync-upload", args=[project.id]),
+    })
+
+
+@csrf_exempt
+@require_POST
+def project_sync_upload(request, project_id: int):
+    """
+    Phase 2 of a client sync: one batched write, applied atomically.
+      JSON:      {"files": [{"path": "...", "content": "...", "hash": "..."?}], "delete": ["...", ...]}
+      multipart: "file" = zip of just the files to write, "delete" = JSON list of paths
+    A given "hash" must match the content (catches truncated/mangled uploads).
+    """
+    project = get_object_or_404(Project, pk=project_id)
+
+    if "file" in request.FILES:
+        try:
+            delete = json.loads(request.POST.get("delete") or "[]")
+        except json.JSONDecodeError:
+            return JsonResponse({"detail": "'delete' must be a JSON list"}, status=400)
+        items = None
+    else:
+        try:
+            payload = json.loads(request.body or "{}")
+        except json.JSONDecodeError:
+            return JsonResponse({"detail": "Invalid JSON"}, status=400)
+        delete = payload.get("delete") or []
+        items = []
+        for entry in payload.get("files") or []:
+            path = entry.get("path") if isinstance(entry, dict) else None
+            content = entry.get("content") if isinstance(entry, dict) else None
+            if not _valid_path(path) or not isinstance(content, str):
+                return JsonResponse({"detail": "files entries need 'path' and string 'content'"}, status=400)
+            if entry.get("hash") and str(entry["hash"]).lower() != content_hash(content):
+                return JsonResponse({"detail": f"Hash mismatch for {path!r}"}, status=400)
+            items.append((path, content))
+
+    if not isinstance(delete, list) or not all(_valid_path(p) for p in delete):
+        return JsonResponse({"detail": "'delete' must be a list of paths"}, status=400)
+
+    try:
+        if items is None:
+            with zipfile.ZipFile(request.FILES["file"]) as zf:
+                if set(delete) & {i.filename for i in zf.infolist()}:
+                    return JsonResponse({"detail": "A path cannot be both written and deleted"}, status=400)
+                result = apply_sync(project, iter_zip_texts(zf), delete)
+        else:
+            if set(delete) & {path for path, _ in items}:
+                return JsonResponse({"detail": "A path cannot be both written and deleted"}, status=400)
+            result = apply_sync(project, items, delete)
+    except zipfile.BadZipFile:
+        return JsonResponse({"detail": "Not a valid zip file"}, status=400)
+    except ArchiveRejected as e:
+        return JsonResponse({"detail": str(e)}, status=400)
+
+    return JsonResponse({"project_id": project.id, **result, "version": ProjectStats.version_for(project.id)})
+
+
 @require_POST
 def thread_add_message(request, thread_id: int):
     thread = get_object_or_404(Thread, pk=thread_id)
@@ -77,7 +566,59 @@ def thread_add_message(request, thread_id: int):
     return JsonResponse({"message_id": msg.pk})
 
 def _etag_for_text(text: str) -> str:
-    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+    return content_hash(text)
+
+_LINES_RE = re.compile(r"^(\d*)(:?)(\d*)$")
+
+
+def _flag(request, name: str) -> bool:
+    return request.GET.get(name) in ("1", "true", "yes", "on")
+
+
+def _file_window(request, project: Project, path: str):
+    """?lines= and ?raw=1 reads, served through the file's line-offset index (community.lines)."""
+    window = FileWindow.for_file(project.id, path)
+    if window is None:
+        return HttpResponseBadRequest("File not found")
+    etag = window.content_hash
+
+    if "lines" in request.GET:
+        m = _LINES_RE.match(request.GET["lines"].strip())
+        if not m or not (m.group(1) or m.group(3)):
+            return HttpResponseBadRequest("lines must look like 'start:end', 'start:', ':end' or 'n'")
+        start = int(m.group(1) or 1)
+        if m.group(2):
+            end = int(m.group(3)) if m.group(3) else None
+        else:
+            end = start
+        text, start, end = window.lines(start, end)
+        resp = JsonResponse({
+            "project_id": project.id,
+            "path": path,
+            "start": start,
+            "end": end,
+            "total_lines": window.line_count,
+            "content": text,
+        })
+        resp["ETag"] = etag
+        return resp
+
+    wanted = request.headers.get("Range")
+    if_range = request.headers.get("If-Range")
+    rng = _parse_range(wanted, window.size) if wanted and (not if_range or if_range == etag) else None
+    if rng == "invalid":
+        resp = HttpResponse(status=416)
+        resp["Content-Range"] = f"bytes */{window.size}"
+    elif rng is None:
+        resp = HttpResponse(window.content().encode("utf-8"), content_type="text/plain; charset=utf-8")
+    else:
+        start, end = rng
+        resp = HttpResponse(window.byte_range(start, end), status=206, content_type="text/plain; charset=utf-8")
+        resp["Content-Range"] = f"bytes {start}-{end}/{window.size}"
+    resp["Accept-Ranges"] = "bytes"
+    resp["ETag"] = etag
+    return resp
+
 
 @csrf_exempt
 @require_http_methods(["GET", "PUT", "PATCH"])
@@ -85,25 +626,47 @@ def project_file_detail(request, project_id: int, path: str):
     """
     GET   -> return file content (and ETag)
              query: ?lint=1  -> include diagnostics for current content
+                    ?lines=10:20 -> only lines 10..20 (1-based, inclusive; "10:" / ":20"
+                                    open-ended) plus total_lines
+                    ?raw=1  -> the bare UTF-8 content, honouring Range / If-Range
     PUT   -> replace entire content (JSON: {"content": "..."}), supports If-Match
-    PATCH -> same as PUT
+    PATCH -> same as PUT, or LSP-style text edits against the If-Match base:
+             {"edits": [{"range": {"start": {"line", "character"}, "end": {...}},
+                         "newText": "..."}, ...],
+              "positionEncoding": "utf-16" (default) | "utf-32"}
+             the answer carries the new ETag, not the content (unless ?format=1 changed it)
+
+    With FILE_WRITE_BEHIND on, a PUT is held in memory and written later,
+    coalesced with the saves after it (see writebehind.py); reads see it at once.
 
     Query flags for PUT/PATCH:
-      ?format=1   -> auto-format based on file type (e.g. Black for .py)
+      ?format=1   -> auto-format based on file type (e.g. Black for .py, in the formatter
+                     pool; 503 + Retry-After when that is saturated)
       ?preview=1  -> return formatted/diagnosed text WITHOUT saving
       ?lint=1     -> include diagnostics in response
     """
     project = get_object_or_404(Project, pk=project_id)
+    if request.method == "GET" and ("lines" in request.GET or _flag(request, "raw")):
+        writebehind.flush(project.id, path)
+        return _file_window(request, project, path)
+    files = ProjectFile.objects.all()
+    if request.method == "PATCH":
+        writebehind.flush(project.id, path)
+        files = files.defer("content")  # text edits re-read it under a row lock
     try:
-        pf = ProjectFile.objects.get(project=project, path=path)
+        pf = files.get(project=project, path=path)
     except ProjectFile.DoesNotExist:
         return HttpResponseBadRequest("File not found")
+    if request.method != "PATCH":
+        buffered = writebehind.buffer.get(pf)
+        if buffered is not None:
+            pf.content = buffered  # a save still waiting to be written behind
 
     if request.method == "GET":
         etag = _etag_for_text(pf.content)
         data = {"project_id": project.id, "path": pf.path, "content": pf.content}
         if request.GET.get("lint") in ("1", "true", "yes", "on"):
-            data["diagnostics"] = lint_for_path(path, pf.content)
+            data["diagnostics"] = lint_for_path(path, pf.content, None if buffered is not None else pf.content_hash)
         resp = JsonResponse(data)
         resp["ETag"] = etag
         return resp
@@ -114,6 +677,9 @@ def project_file_detail(request, project_id: int, path: str):
     except json.JSONDecodeError:
         return HttpResponseBadRequest("Invalid JSON")
 
+    if request.method == "PATCH" and isinstance(payload, dict) and "edits" in payload:
+        return _patch_file_edits(request, project, pf, payload)
+
     if "content" not in payload or not isinstance(payload["content"], str):
         return HttpResponseBadRequest("Missing or invalid 'content'")
 
@@ -140,7 +706,10 @@ def project_file_detail(request, project_id: int, path: str):
 
     tool = None
     if autoformat:
-        new_content, tool = format_for_path(path, new_content)
+        try:
+            new_content, tool = format_for_path(path, new_content)
+        except FormatterBusy:
+            return _formatter_busy()
 
     diagnostics = lint_for_path(path, new_content) if want_lint else []
 
@@ -158,26 +727,119 @@ def project_file_detail(request, project_id: int, path: str):
         resp["ETag"] = etag
         return resp
 
-    # Persist
-    pf.content = new_content
-    pf.save(update_fields=["content"])
+    # Persist (or leave it to the write-behind buffer, which coalesces autosaves)
+    buffered = writebehind.enabled()
+    if buffered:
+        writebehind.buffer.put(pf, new_content)
+        pf.content = new_content
+    else:
+        pf.content = new_content
+        pf.save(update_fields=["content"])
 
     etag = _etag_for_text(pf.content)
-    resp = JsonResponse({
+    data = {
         "project_id": project.id,
         "path": pf.path,
         "content": pf.content,
         "saved": True,
         "tool": tool or "none",
         "diagnostics": diagnostics,
-    })
+    }
+    if buffered:
+        data["buffered"] = True
+    resp = JsonResponse(data)
     resp["ETag"] = etag
     return resp
 
+def _formatter_busy() -> JsonResponse:
+    resp = JsonResponse({"detail": "Formatter is busy; retry shortly."}, status=503)
+    resp["Retry-After"] = "1"
+    return resp
+
+
 @require_GET
+def formatter_stats(request):
+    """Queue depth and counters of the formatter worker pool, for monitoring."""
+    return JsonResponse(formatter_pool().stats())
+
+
+def _patch_file_edits(request, project: Project, pf: ProjectFile, payload: dict):
+    """
+    PATCH with text edits. They are applied to the content as read, then
+    formatted and linted with no lock held; the save is a compare-and-swap
+    on content_hash (412 if the file moved meanwhile), so the If-Match base
+    can't be lost.
+    """
+    if_match = request.headers.get("If-Match")
+    if not if_match:
+        return JsonResponse({"detail": "If-Match with the base ETag is required for edits."}, status=428)
+    autoformat = request.GET.get("format") in ("1", "true", "yes", "on")
+    preview    = request.GET.get("preview") in ("1", "true", "yes", "on")
+    want_lint  = request.GET.get("lint") in ("1", "true", "yes", "on")
+
+    def mismatch(current: str) -> JsonResponse:
+        resp = JsonResponse({"detail": "ETag mismatch; file changed."}, status=412)
+        resp["ETag"] = current
+        return resp
+
+    pf = ProjectFile.objects.get(pk=pf.pk)
+    base = pf.content_hash or _etag_for_text(pf.content)
+    if if_match != base:
+        return mismatch(base)
+    try:
+        edited = apply_text_edits(pf.content, payload["edits"], payload.get("positionEncoding", "utf-16"))
+    except EditError as e:
+        return HttpResponseBadRequest(str(e))
+
+    new_content, tool = edited, None
+    if autoformat:
+        try:
+            new_content, tool = format_for_path(pf.path, edited)
+        except FormatterBusy:
+            return _formatter_busy()
+    diagnostics = lint_for_path(pf.path, new_content) if want_lint else []
+    if not preview:
+        with transaction.atomic():
+            stored = ProjectFile.objects.select_for_update().defer("content").get(pk=pf.pk)
+            current = stored.content_hash or _etag_for_text(stored.content)
+            if current != base:
+                return mismatch(current)
+            pf.content = new_content
+            pf.save(update_fields=["content"])
+
+    data = {
+        "project_id": project.id,
+        "path": pf.path,
+        "saved": not preview,
+        "preview": preview,
+        "size": len(new_content.encode("utf-8")) if preview else pf.size,
+        "tool": tool or "none",
+        "diagnostics": diagnostics,
+    }
+    if new_content != edited:
+        data["content"] = new_content  # the formatter changed it: the client can't derive it
+    resp = JsonResponse(data)
+    resp["ETag"] = _etag_for_text(new_content) if preview else pf.content_hash
+    return resp
+
+
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
 def project_files_bulk(request, project_id: int):
-    """GET /projects/<id>/files/bulk/?paths=a.py,b/c.py"""
+    """
+    GET  /projects/<id>/files/bulk/?paths=a.py,b/c.py
+    POST /projects/<id>/files/bulk/  JSON, for batches that don't fit a URL:
+      {"paths": [...], "globs": ["src/**/*.py", ...],
+       "fields": ["content", "hash", "size", "lines", "language"],   (default: all)
+       "known": {path: sha256}}   -> matching files come back "unchanged", without content
+    The POST answer is NDJSON, one object per file, streamed as rows are read
+    (see bulk.iter_bulk_files); leave "content" out of fields for metadata only.
+    """
     project = get_object_or_404(Project, pk=project_id)
+    writebehind.flush(project.id)
+    if request.method == "POST":
+        return _files_bulk_stream(request, project)
+
     raw = request.GET.get("paths", "")
     paths = [p for p in (s.strip() for s in raw.split(",")) if p]
     if not paths:
@@ -192,6 +854,114 @@ def project_files_bulk(request, project_id: int):
     return JsonResponse({"project_id": project.id, "files": result})
 
 
+def _str_list(value) -> bool:
+    return isinstance(value, list) and all(isinstance(v, str) for v in value)
+
+
+def _files_bulk_stream(request, project: Project):
+    try:
+        payload = json.loads(request.body or "{}")
+    except json.JSONDecodeError:
+        return HttpResponseBadRequest("Invalid JSON")
+    if not isinstance(payload, dict):
+        return HttpResponseBadRequest("Expected a JSON object")
+    paths = payload.get("paths", [])
+    globs = payload.get("globs", [])
+    fields = payload.get("fields", list(BULK_FIELDS))
+    known = payload.get("known", {})
+    if not _str_list(paths) or not _str_list(globs):
+        return HttpResponseBadRequest("'paths' and 'globs' must be lists of strings")
+    if not paths and not globs:
+        return HttpResponseBadRequest("Missing 'paths' or 'globs'")
+    if len(paths) + len(globs) > max_bulk_paths():
+        return HttpResponseBadRequest(f"At most {max_bulk_paths()} paths per request")
+    if not _str_list(fields) or not set(fields) <= set(BULK_FIELDS):
+        return HttpResponseBadRequest(f"'fields' must be a subset of {list(BULK_FIELDS)}")
+    if not isinstance(known, dict) or not all(isinstance(v, str) for v in known.values()):
+        return HttpResponseBadRequest("'known' must map paths to sha256 hex digests")
+
+    files = iter_bulk_files(project.id, paths, globs, fields=fields, known=known)
+    lines = (json.dumps(item) + "\n" for item in files)
+    return _streaming_response(request, lines, "application/x-ndjson")
+
+
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+def project_lint(request, project_id: int):
+    """
+    GET  /projects/<id>/lint/?prefix=src/
+    POST /projects/<id>/lint/  JSON {"prefix": "src/", "known": {path: sha256}}
+    Lints every file (under prefix) on the lint process pool and streams NDJSON,
+    one {"path", "hash", "diagnostics"} per file as each finishes. Files whose
+    hash is in "known" come back {"path", "hash", "unchanged": true} unlinted.
+    """
+    project = get_object_or_404(Project, pk=project_id)
+    writebehind.flush(project.id)
+    prefix, known = request.GET.get("prefix", ""), {}
+    if request.method == "POST":
+        try:
+            payload = json.loads(request.body or "{}")
+        except json.JSONDecodeError:
+            return HttpResponseBadRequest("Invalid JSON")
+        if not isinstance(payload, dict):
+            return HttpResponseBadRequest("Expected a JSON object")
+        prefix, known = payload.get("prefix", prefix), payload.get("known", {})
+        if not isinstance(prefix, str):
+            return HttpResponseBadRequest("'prefix' must be a string")
+        if not isinstance(known, dict) or not all(isinstance(v, str) for v in known.values()):
+            return HttpResponseBadRequest("'known' must map paths to sha256 hex digests")
+
+    lines = (json.dumps(item) + "\n" for item in iter_project_lint(project.id, prefix, known))
+    return _streaming_response(request, lines, "application/x-ndjson")
+
+
+@require_GET
+def project_code_search(request, project_id: int):
+    """
+    GET /projects/<id>/search/?q=needle
+      regex=1        -> treat q as a Python regex
+      ignore_case=1  -> case-insensitive match
+      path=<glob>    -> only files matching the glob (repeatable), e.g. src/*.py
+      page, per_page -> paging over hits (default 1 / 50, per_page max 500)
+      stream=1       -> NDJSON, one hit per line, sent as files are scanned
+    Each hit: {"path", "line" (1-based), "snippet", "match": {"start", "end"}}
+    """
+    project = get_object_or_404(Project, pk=project_id)
+    writebehind.flush(project.id)
+    query = request.GET.get("q", "")
+    regex = request.GET.get("regex") in ("1", "true", "yes", "on")
+    ignore_case = request.GET.get("ignore_case") in ("1", "true", "yes", "on")
+    stream = request.GET.get("stream") in ("1", "true", "yes", "on")
+    try:
+        page = max(int(request.GET.get("page", 1)), 1)
+        per_page = min(max(int(request.GET.get("per_page", 50)), 1), 500)
+    except ValueError:
+        return HttpResponseBadRequest("page and per_page must be integers")
+
+    try:
+        hits = search_project(
+            project.id, query, regex=regex, ignore_case=ignore_case,
+            globs=request.GET.getlist("path"),
+        )
+    except SearchQueryError as e:
+        return HttpResponseBadRequest(str(e))
+
+    offset = (page - 1) * per_page
+    if stream:
+        lines = (json.dumps(hit) + "\n" for hit in islice(hits, offset, offset + per_page))
+        return _streaming_response(request, lines, "application/x-ndjson")
+
+    results = list(islice(hits, offset, offset + per_page + 1))
+    return JsonResponse({
+        "project_id": project.id,
+        "query": query,
+        "page": page,
+        "per_page": per_page,
+        "has_more": len(results) > per_page,
+        "results": results[:per_page],
+    })
+
+
 def _user_in_project(user, project: Project) -> bool:
     if not getattr(user, "is_authenticated", False):
         return False
@@ -361,67 +1131,117 @@ def _parse_github_url(url: str):
     return m.group("owner"), m.group("repo")
 
 
-def _zip_strip_top(zip_bytes: bytes) -> bytes:
-    """
-    Repack a zip so files are at the root (GitHub zipballs have <repo>-<sha>/).
-    """
-    src = zipfile.ZipFile(io.BytesIO(zip_bytes))
-    out_buf = io.BytesIO()
-    dst = zipfile.ZipFile(out_buf, "w", compression=zipfile.ZIP_DEFLATED)
-
-    names = src.namelist()
-    if not names:
-        src.close(); dst.close()
-        return out_buf.getvalue()
-
-    top_prefix = names[0].split("/")[0]  # e.g., repo-<sha>
-    prefix = f"{top_prefix}/"
-
-    for name in names:
-        if name.endswith("/"):
-            continue
-        if name.startswith(prefix):
-            rel = name[len(prefix):]  # drop <repo>-<sha>/
-            dst.writestr(rel, src.read(name))
-
-    dst.close()
-    src.close()
-    return out_buf.getvalue()
+def _github_headers(token: str, accept: str = "application/vnd.github+json") -> dict:
+    headers = {"Accept": accept}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    return headers
 
 
-def _zip_only_subdir(zip_bytes: bytes, subdir: str) -> bytes:
+def _github_head_commit(api: str, source: GithubSource, token: str) -> tuple[str | None, str]:
+    """
+    Conditional lookup of the ref's current commit: (sha, etag). sha is ""
+    when GitHub answers 304 (nothing moved since source.etag) and None when
+    the lookup failed, in which case the caller just downloads.
     """
-    GitHub zipballs have a dynamic top-level folder: <repo>-<sha>/
-    This filters to a given subdir inside that, and rewrites paths to be relative
-    to the subdir root.
+    url = f"{api}/repos/{source.owner}/{source.repo}/commits/{source.ref or 'HEAD'}"
+    headers = _github_headers(token, accept="application/vnd.github.sha")
+    if source.etag:
+        headers["If-None-Match"] = source.etag
+    try:
+        r = requests.get(url, headers=headers, timeout=30)
+    except requests.RequestException:
+        return None, source.etag
+    if r.status_code == 304:
+        return "", source.etag
+    if r.status_code != 200:
+        return None, source.etag
+    return r.text.strip(), r.headers.get("ETag", "")
+
+
+def _github_import(project: Project, owner: str, repo: str, ref: str, subdir: str, token: str,
+                   progress: JobProgress | None = None) -> dict:
     """
-    src = zipfile.ZipFile(io.BytesIO(zip_bytes))
-    out_buf = io.BytesIO()
-    dst = zipfile.ZipFile(out_buf, "w", compression=zipfile.ZIP_DEFLATED)
+    Download the zipball and ingest it. Raises JobFailed with the client-facing detail.
 
-    # Normalize subdir (no leading slash)
+    Re-importing the same owner/repo/ref/subdir is incremental: the ref's
+    commit is checked first (If-None-Match on the stored ETag) and nothing is
+    downloaded when it hasn't moved; otherwise only files whose content hash
+    differs are written and files removed upstream are deleted.
+    """
+    api = getattr(settings, "GITHUB_API_URL", "https://api.github.com").rstrip("/")
     subdir = subdir.strip("/")
+    source = GithubSource.objects.filter(project=project).first()
+    resync = source is not None and source.matches(owner, repo, ref, subdir)
+    result = {"project_id": project.id, "owner": owner, "repo": repo, "ref": ref or "default"}
+
+    head, etag = None, ""
+    if resync and source.commit_sha:
+        head, etag = _github_head_commit(api, source, token)
+        if head == "" or head == source.commit_sha:
+            source.etag, source.synced_at = etag, timezone.now()
+            source.save(update_fields=["etag", "synced_at"])
+            return {**result, "imported_files": 0, "written": 0, "unchanged": 0, "deleted": 0,
+                    "commit": source.commit_sha, "up_to_date": True}
+
+    # GitHub zipball URL; ref optional (pinned to the resolved commit when we have it)
+    zip_url = f"{api}/repos/{owner}/{repo}/zipball"
+    if head or ref:
+        zip_url += f"/{head or ref}"
+
+    MAX_BYTES = 100 * 1024 * 1024
+    try:
+        r = requests.get(zip_url, headers=_github_headers(token), stream=True, timeout=30)
+    except requests.RequestException as e:
+        raise JobFailed(f"Failed to reach GitHub: {e}")
 
-    # The top-level prefix varies – detect from first item
-    # and then join with subdir to match entries.
-    names = src.namelist()
-    if not names:
-        src.close(); dst.close()
-        return out_buf.getvalue()
-    top_prefix = names[0].split("/")[0]  # e.g., repo-<sha>
-    wanted_prefix = f"{top_prefix}/{subdir}/"
+    if r.status_code == 404:
+        raise JobFailed("Repository or ref not found")
+    if r.status_code in (401, 403):
+        raise JobFailed("Unauthorized to access repository", status=403)
+    if r.status_code >= 400:
+        raise JobFailed(f"GitHub error: {r.status_code}")
+
+    # Spool to disk past GITHUB_SPOOL_MEMORY_BYTES and ingest straight from
+    # the downloaded archive (prefix/subdir handled on member names)
+    spool_max = int(getattr(settings, "GITHUB_SPOOL_MEMORY_BYTES", 8 * 1024 * 1024))
+    with tempfile.SpooledTemporaryFile(max_size=spool_max) as spool:
+        total = 0
+        for chunk in r.iter_content(chunk_size=64 * 1024):
+            if not chunk:
+                continue
+            total += len(chunk)
+            if total > MAX_BYTES:
+                raise JobFailed("Zip too large")
+            spool.write(chunk)
+        spool.seek(0)
 
-    for name in names:
-        if not name.endswith("/") and name.startswith(wanted_prefix):
-            rel = name[len(wanted_prefix):]  # strip top/subdir prefixes
-            data = src.read(name)
-            zi = zipfile.ZipInfo(rel)
-            dst.writestr(zi, data)
+        try:
+            synced = ingest_zipball(project, spool, subdir=subdir, delete_missing=resync, progress=progress)
+        except zipfile.BadZipFile:
+            raise JobFailed("GitHub returned an invalid zip")
+        except ArchiveRejected as e:
+            raise JobFailed(str(e))
+
+    commit = head or synced["commit"]
+    GithubSource.objects.update_or_create(
+        project=project,
+        defaults={"owner": owner, "repo": repo, "ref": ref, "subdir": subdir, "commit_sha": commit,
+                  "etag": etag if head else "", "synced_at": timezone.now()},
+    )
+    return {
+        **result,
+        "imported_files": synced["files"],
+        "written": synced["written"],
+        "unchanged": synced["unchanged"],
+        "deleted": synced["deleted"],
+        "commit": commit,
+        "up_to_date": False,
+    }
 
-    dst.close()
-    src.close()
-    return out_buf.getvalue()
 
+def _github_import_job(job: Job, progress: JobProgress, owner, repo, ref, subdir, token) -> dict:
+    return _github_import(job.project, owner, repo, ref, subdir, token, progress=progress)
 
 
 @csrf_exempt
@@ -432,7 +1252,8 @@ def project_import_github(request, project_id: int):
       "repo_url": "https://github.com/owner/repo",
       "ref": "main",            # optional
       "subdir": "app",          # optional
-      "token": "<gh_token>"     # optional, overrides settings.GITHUB_TOKEN
+      "token": "<gh_token>",    # optional, overrides settings.GITHUB_TOKEN
+      "async": true             # optional (or ?async=1): 202 + job id, import runs in the background
     }
     """
     project = get_object_or_404(Project, pk=project_id)
@@ -451,62 +1272,44 @@ def project_import_github(request, project_id: int):
     if not owner or not repo:
         return JsonResponse({"detail": "repo_url must be a valid GitHub repo URL"}, status=400)
 
-    # GitHub zipball URL; ref optional
-    zip_url = f"https://api.github.com/repos/{owner}/{repo}/zipball"
-    if ref:
-        zip_url += f"/{ref}"
+    if _wants_async(request, payload):
+        # the token is passed to the job but never stored on it
+        job = start_job(project, "github_import", _github_import_job, owner, repo, ref, subdir, token,
+                        params={"owner": owner, "repo": repo, "ref": ref, "subdir": subdir}, user=request.user)
+        return _job_accepted(job)
 
-    headers = {"Accept": "application/vnd.github+json"}
-    if token:
-        headers["Authorization"] = f"Bearer {token}"
-
-    MAX_BYTES = 100 * 1024 * 1024
     try:
-        r = requests.get(zip_url, headers=headers, stream=True, timeout=30)
-    except requests.RequestException as e:
-        return JsonResponse({"detail": f"Failed to reach GitHub: {e}"}, status=400)
+        result = _github_import(project, owner, repo, ref, subdir, token)
+    except JobFailed as e:
+        return JsonResponse({"detail": e.detail}, status=e.status)
+    return JsonResponse(result, status=200)
 
-    if r.status_code == 404:
-        return JsonResponse({"detail": "Repository or ref not found"}, status=400)
-    if r.status_code in (401, 403):
-        return JsonResponse({"detail": "Unauthorized to access repository"}, status=403)
-    if r.status_code >= 400:
-        return JsonResponse({"detail": f"GitHub error: {r.status_code}"}, status=400)
-
-    buf = io.BytesIO()
-    total = 0
-    for chunk in r.iter_content(chunk_size=8192):
-        if not chunk:
-            continue
-        total += len(chunk)
-        if total > MAX_BYTES:
-            return JsonResponse({"detail": "Zip too large"}, status=400)
-        buf.write(chunk)
-    zip_bytes = buf.getvalue()
-
-    if subdir:
-        zip_bytes = _zip_only_subdir(zip_bytes, subdir)
-    else:
-        zip_bytes = _zip_strip_top(zip_bytes)
 
-    count = project.ingest_zip(io.BytesIO(zip_bytes))
-    return JsonResponse(
-        {
-            "project_id": project.id,
-            "imported_files": count,
-            "owner": owner,
-            "repo": repo,
-            "ref": ref or "default",
-        },
-        status=200,
-    )
+@require_GET
+def project_job_detail(request, project_id: int, job_id: int):
+    ensure_recovered()  # a job orphaned by a restart must not poll as running forever
+    job = get_object_or_404(Job, pk=job_id, project_id=project_id)
+    return JsonResponse(job.as_dict())
 
 
+def _project_analysis(project: Project, files: dict | None = None) -> dict:
+    """
+    Shared single-pass analysis (see parsing.analyze_project_files), cached per
+    content version so loading graph + summary parses each file once.
+    """
+    key = analysis_cache_key(project.pk, ProjectStats.version_for(project.pk))
+    analysis = cache.get(key)
+    if analysis is None:
+        if files is None:
+            files = dict(ProjectFile.objects.filter(project=project).values_list("path", "content"))
+        analysis = analyze_project_files(files)
+        cache.set(key, analysis, getattr(settings, "PROJECT_ANALYSIS_CACHE_SECONDS", 3600))
+    return analysis
 
 @require_GET
 def project_graph(request, project_id: int):
     project = get_object_or_404(Project, pk=project_id)
-    files = {pf.path: pf.content for pf in ProjectFile.objects.filter(project=project)}
+    writebehind.flush(project.id)
 
     # Try to use codeparsers.parsers.parse_project if it exists / is monkeypatched
     try:
@@ -517,13 +1320,14 @@ def project_graph(request, project_id: int):
 
     try:
         if callable(parse_project_fn):
+            files = {pf.path: pf.content for pf in ProjectFile.objects.filter(project=project)}
             graph = parse_project_fn(files)  # tests may monkeypatch this
             if not isinstance(graph, dict) or "nodes" not in graph or "edges" not in graph:
                 graph = {"nodes": [], "edges": []}
         else:
             # Fall back to your local project parser, but be resilient to bad files
             try:
-                graph = parse_project_files(files)
+                graph = graph_from_analysis(_project_analysis(project))
             except Exception:
                 graph = {"nodes": [], "edges": []}
     except Exception:
@@ -533,79 +1337,103 @@ def project_graph(request, project_id: int):
 
 @require_GET
 def project_file_tree(request, project_id: int):
+    """
+    GET /projects/<id>/files/tree/
+      no params             -> the whole nested tree (cached per content version)
+      ?prefix=a/b&depth=1   -> only the children of a/b (root if empty), with
+                               counts; depth > 1 nests sub-folders that deep
+      page, per_page        -> paging over those children (default 1 / 200, max 1000)
+    """
     project = get_object_or_404(Project, pk=project_id)
+    writebehind.flush(project.id)
     # (optional) enforce access: if not _user_in_project(request.user, project): return HttpResponseForbidden("Not allowed")
 
-    paths = list(ProjectFile.objects.filter(project=project).values_list("path", flat=True))
-
-    # Build a nested tree from paths
-    root = {"name": "", "type": "dir", "children": {}}
-
-    for p in paths:
-        parts = p.split("/")
-        node = root
-        for i, part in enumerate(parts):
-            is_file = (i == len(parts) - 1)
-            bucket = node["children"]
-            if part not in bucket:
-                bucket[part] = {"name": part, "type": "file" if is_file else "dir", "children": {} if not is_file else None}
-            node = bucket[part]
-
-    def to_list(n):
-        if n["type"] == "file":
-            return {"name": n["name"], "type": "file"}
-        children = [to_list(c) for c in n["children"].values()]
-        # sort dirs first, then files, alpha
-        children.sort(key=lambda x: (x["type"] != "dir", x["name"]))
-        return {"name": n["name"] or "/", "type": "dir", "children": children}
-
-    tree = to_list(root)
-    return JsonResponse({"project_id": project.id, "tree": tree, "total_files": len(paths)})
-
-
-
-# community/views.py (near your existing project_summary)
-from collections import Counter  # keep this single import
+    if "prefix" not in request.GET and "depth" not in request.GET:
+        return JsonResponse({"project_id": project.id, **full_tree(project.id)})
 
-def _language_from_path(path: str) -> str:
-    ext = (path.rsplit(".", 1)[-1] if "." in path else "").lower()
-    return {
-        "py": "python",
-        "js": "javascript",
-        "html": "html",
-        "htm": "html",
-        "css": "css",
-    }.get(ext, ext or "unknown")
-
-def _count_lines(text: str) -> int:
-    if not text:
-        return 0
-    # count lines like editors do: splitlines then len
-    return len(text.splitlines())
+    try:
+        depth = int(request.GET.get("depth", 1))
+        page = max(int(request.GET.get("page", 1)), 1)
+        per_page = min(max(int(request.GET.get("per_page", 200)), 1), 1000)
+    except ValueError:
+        return HttpResponseBadRequest("depth, page and per_page must be integers")
+    listing = list_dir(project.id, request.GET.get("prefix", ""), depth=depth,
+                       offset=(page - 1) * per_page, limit=per_page)
+    if listing is None:
+        return HttpResponseBadRequest("Directory not found")
+    return JsonResponse({"project_id": project.id, "page": page, "per_page": per_page, **listing})
+
+
+def _project_stats(project: Project) -> ProjectStats:
+    try:
+        return project.stats
+    except ProjectStats.DoesNotExist:
+        return ProjectStats.rebuild(project.pk)
 
 @require_GET
 def project_summary(request, project_id: int):
     project = get_object_or_404(Project, pk=project_id)
-    files_qs = ProjectFile.objects.filter(project=project).values_list("path", "content")
-
-    file_paths = []
-    total_lines = 0
-    lang_counts = Counter()
-
-    for path, content in files_qs:
-        file_paths.append(path)
-        lang_counts[_language_from_path(path)] += 1
-        total_lines += _count_lines(content or "")
+    writebehind.flush(project.id)
+    stats = _project_stats(project)
+    file_paths = list(ProjectFile.objects.filter(project=project).values_list("path", flat=True))
 
-    # keep your original, parser-driven summary
-    files_map = {pf.path: pf.content for pf in ProjectFile.objects.filter(project=project)}
-    summary = build_project_summary(files_map)
+    # keep your original, parser-driven summary (shares the graph's analysis pass)
+    summary = summary_from_analysis(_project_analysis(project))
 
     return JsonResponse({
         "project_id": project.id,
         "summary": summary,                     # original payload
         "file_paths": file_paths,               # new: stable list of paths
-        "languages": dict(lang_counts),         # new: language histogram
-        "totals": {"files": len(file_paths), "lines": total_lines},  # new: rollups
+        "languages": stats.languages,           # new: language histogram
+        "totals": {                             # new: rollups (served from ProjectStats)
+            "files": stats.file_count,
+            "lines": stats.total_lines,
+            "bytes": stats.total_bytes,
+        },
+        "last_modified": stats.last_modified.isoformat() if stats.last_modified else None,
     })
 
+@require_GET
+def project_stats_bulk(request):
+    """GET /projects/stats/?ids=1,2,3 -> rollups for many projects in one query."""
+    raw = request.GET.get("ids", "")
+    try:
+        ids = [int(s) for s in raw.split(",") if s.strip()]
+    except ValueError:
+        return HttpResponseBadRequest("ids must be comma-separated integers")
+    if not ids:
+        return HttpResponseBadRequest("Missing 'ids' query parameter")
+    if len(ids) > 1000:
+        return HttpResponseBadRequest("At most 1000 ids per request")
+
+    rows = ProjectStats.objects.filter(project_id__in=ids)
+    return JsonResponse({"projects": {str(st.project_id): st.as_dict() for st in rows}})
+
+
+@csrf_exempt
+@require_POST
+def analyze_archive(request):
+    """
+    Graph or summary of an uploaded zip/tar without creating a project:
+      POST /analyze/?view=graph|summary   (default graph)
+    The archive comes as multipart field "file" or as the raw body (like
+    upload_zip). Members are parsed as they are read and only the derived
+    names are kept; nothing is written to the database.
+    """
+    view = request.GET.get("view", "graph")
+    if view not in ("graph", "summary"):
+        return HttpResponseBadRequest("view must be 'graph' or 'summary'")
+    upload = request.FILES.get("file")
+    if upload is None and request.content_type in _RAW_ARCHIVE_TYPES:
+        upload = request
+    if upload is None:
+        return HttpResponseBadRequest("Missing file")
+    try:
+        analysis = analyze_files(iter_archive_texts(upload))
+    except _ARCHIVE_ERRORS:
+        return HttpResponseBadRequest("Not a valid zip or tar archive")
+    except ArchiveRejected as e:
+        return HttpResponseBadRequest(str(e))
+    if view == "summary":
+        return JsonResponse({"summary": summary_from_analysis(analysis)})
+    return JsonResponse({"graph": graph_from_analysis(analysis)})
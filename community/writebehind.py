@@ -0,0 +1,168 @@
+# community/writebehind.py
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+from .models import ProjectFile, content_hash
+
+log = logging.getLogger(__name__)
+
+
+def enabled() -> bool:
+    """
+    Opt-in: PUTs to a file are kept in memory and written behind, coalesced.
+    The buffer lives in this process, so only the worker that took a PUT
+    sees its content before the flush: with several web workers, a read or
+    an If-Match on another one gets the stored row, and a save there
+    replaces the row and drops the buffered one. Enable it only when a
+    single worker serves the file API (or every request for a project is
+    routed to the same one).
+    """
+    return bool(getattr(settings, "FILE_WRITE_BEHIND", False))
+
+
+def flush_interval() -> float:
+    """A buffered file is written at the latest this many seconds after its first pending save."""
+    return float(getattr(settings, "FILE_WRITE_BEHIND_INTERVAL", 10.0))
+
+
+def flush_idle() -> float:
+    """...or as soon as it has had no new save for this many seconds."""
+    return float(getattr(settings, "FILE_WRITE_BEHIND_IDLE", 2.0))
+
+
+@dataclass
+class Pending:
+    content: str
+    base: str  # content_hash of the stored row the buffered content replaces
+    first: float
+    last: float
+    saves: int = 1
+
+
+class WriteBehind:
+    """
+    The latest unsaved content per (project, path). A run of saves to one file
+    becomes a single UPDATE, written by a background thread once the file goes
+    idle or has waited flush_interval(), and at process exit.
+
+    A flush only lands if the stored row still has the content the buffer was
+    based on; anything else that wrote the file meanwhile (an upload, a sync,
+    a text-edit PATCH, a PUT on another worker) wins and the buffered content
+    is dropped.
+
+    The buffer is per process; see enabled().
+    """
+
+    def __init__(self):
+        self._pending: Dict[Tuple[int, str], Pending] = {}
+        self._lock = threading.Lock()  # guards _pending
+        self._flushing = threading.Lock()  # one flush at a time, so a file is never written twice at once
+        self._thread: threading.Thread | None = None
+
+    def put(self, pf: ProjectFile, text: str) -> None:
+        now = time.monotonic()
+        key = (pf.project_id, pf.path)
+        with self._lock:
+            entry = self._pending.get(key)
+            base = pf.content_hash or content_hash(pf.content)
+            if entry is None or entry.base != base:
+                # nothing pending, or the row was rewritten since: start over from the row as it is now
+                self._pending[key] = Pending(text, base, now, now)
+            else:
+                entry.content, entry.last, entry.saves = text, now, entry.saves + 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._thread.start()
+
+    def get(self, pf: ProjectFile) -> str | None:
+        """Buffered content for this row, if any is still based on it."""
+        with self._lock:
+            entry = self._pending.get((pf.project_id, pf.path))
+        if entry is None or entry.base != pf.content_hash:
+            return None
+        return entry.content
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def flush(self, project_id: int | None = None, path: str | None = None, due_only: bool = False) -> int:
+        """Write pending files (all, one project's, or one file); returns how many were written."""
+        if not self._pending:
+            return 0
+        with self._flushing:
+            now = time.monotonic()
+            interval, idle = flush_interval(), flush_idle()
+            with self._lock:
+                batch = [
+                    (k, e.content, e.base, e.saves) for k, e in self._pending.items()
+                    if (project_id is None or k[0] == project_id)
+                    and (path is None or k[1] == path)
+                    and (not due_only or now - e.first >= interval or now - e.last >= idle)
+                ]
+            written = 0
+            for key, text, base, saves in batch:
+                try:
+                    ok = self._write(key, text, base, saves)
+                except Exception:
+                    log.exception("write-behind: saving %s in project %s failed; will retry", key[1], key[0])
+                    continue
+                written += ok
+                with self._lock:
+                    entry = self._pending.get(key)
+                    if entry is None:
+                        continue
+                    if entry.saves == saves or not ok:
+                        del self._pending[key]
+                    else:
+                        # saved again while we wrote: keep the newer content, now based on ours
+                        entry.base, entry.first, entry.saves = content_hash(text), time.monotonic(), entry.saves - saves
+            return written
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pending.clear()
+
+    def _write(self, key: Tuple[int, str], text: str, base: str, saves: int) -> bool:
+        project_id, path = key
+        with transaction.atomic():
+            pf = ProjectFile.objects.select_for_update().defer("content").filter(
+                project_id=project_id, path=path).first()
+            if pf is None or pf.content_hash != base:
+                log.info("write-behind: %s in project %s changed underneath, dropping %d buffered save(s)",
+                         path, project_id, saves)
+                return False
+            pf.content = text
+            pf.save(update_fields=["content"])
+        return True
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(max(0.05, min(flush_interval(), flush_idle()) / 2))
+            if not self._pending:
+                continue
+            close_old_connections()
+            try:
+                self.flush(due_only=True)
+            finally:
+                connection.close()
+
+
+buffer = WriteBehind()
+
+
+def flush(project_id: int | None = None, path: str | None = None) -> int:
+    """Make buffered saves visible to readers that go straight to the database."""
+    return buffer.flush(project_id, path)
+
+
+# pending saves must not die with the process
+atexit.register(flush)
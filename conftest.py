@@ -1,5 +1,6 @@
 import pytest
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from community.models import Project, Thread
 
 @pytest.fixture
@@ -21,3 +22,15 @@ def thread(db, user, other_user):
     t = Thread.objects.create(title="General")
     t.participants.add(user, other_user)
     return t
+
+@pytest.fixture(autouse=True)
+def _disk_caches_in_tmp(settings, tmp_path):
+    # export artifacts, job spool and partial uploads never land in the repo's media/
+    settings.EXPORT_CACHE_DIR = tmp_path / "export-cache"
+    settings.JOB_SPOOL_DIR = tmp_path / "job-spool"
+    settings.UPLOAD_DIR = tmp_path / "uploads"
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    # rolled-back tests reuse project ids, so version-keyed cache entries would leak between them
+    cache.clear()
@@ -4,7 +4,7 @@ from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
 from django.urls import path
 from channels.auth import AuthMiddlewareStack
-from community.consumers import ProjectChatConsumer
+from community.consumers import FileEditConsumer, ProjectChatConsumer
 from community.ws_auth import JwtQueryAuthMiddleware  # (see #2)
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "flowchart.settings")
@@ -16,6 +16,7 @@ application = ProtocolTypeRouter({
         AuthMiddlewareStack(
             URLRouter([
                 path("ws/chat/project/<int:project_id>/", ProjectChatConsumer.as_asgi()),
+                path("ws/projects/<int:project_id>/files/<path:path>/", FileEditConsumer.as_asgi()),
             ])
         )
     ),
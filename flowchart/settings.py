@@ -109,3 +109,91 @@ GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN", "")
 MONGO_URI = "mongodb://localhost:27017"
 MONGO_DB_NAME = "appdb"
 PRESENCE_TTL_SECONDS = 300  # auto-expire stale presence after 5 min
+
+# Code search: how many projects keep an in-process trigram index
+# (only used when the database is not Postgres)
+CODE_SEARCH_INDEX_CACHE_SIZE = 8
+
+# Parsed project analysis shared by the graph and summary endpoints
+PROJECT_ANALYSIS_CACHE_SECONDS = 3600
+# File tree responses, cached per project content version
+PROJECT_TREE_CACHE_SECONDS = 3600
+
+# Bulk file endpoints: most paths one request may name
+FILES_BULK_MAX_PATHS = 20000
+
+# Files at least this large get a line-offset index so line ranges are
+# served without reading the whole content
+LINE_INDEX_MIN_BYTES = 256 * 1024
+
+# Linting: per-process result cache entries, optionally also kept in the
+# Django cache (shared between workers) for LINT_CACHE_SECONDS.
+# "process" lints on a pool of LINT_WORKERS processes (0 = one per CPU);
+# "inline" lints in the request thread
+LINT_CACHE_SIZE = 4096
+LINT_CACHE_PERSIST = False
+LINT_CACHE_SECONDS = 7 * 24 * 3600
+LINT_RUNNER = "process"
+LINT_WORKERS = 0
+
+# Formatting: "pool" keeps FORMAT_WORKERS warm processes, each call bounded
+# by FORMAT_TIMEOUT seconds and refused (503) past FORMAT_QUEUE_MAX waiting;
+# "inline" formats in the request thread
+FORMAT_RUNNER = "pool"
+FORMAT_WORKERS = 2
+FORMAT_TIMEOUT = 5.0
+FORMAT_QUEUE_MAX = 8
+
+# Collaborative editing: seconds edits are coalesced before one save, and
+# operations kept for transforming late clients
+COLLAB_SAVE_DELAY = 2.0
+COLLAB_HISTORY = 500
+
+# Zip/archive ingestion: rows per INSERT ... ON CONFLICT batch, flushed
+# early once the batch holds INGEST_BATCH_BYTES of text
+INGEST_BATCH_SIZE = 500
+INGEST_BATCH_BYTES = 32 * 1024 * 1024
+# Zip-bomb guards: members above the per-member size are skipped; going over
+# the total inflated size or the compression ratio rejects the whole archive
+INGEST_MAX_MEMBER_BYTES = 20 * 1024 * 1024
+INGEST_MAX_TOTAL_BYTES = 1024 * 1024 * 1024
+INGEST_MAX_COMPRESSION_RATIO = 100
+
+# Zip export: threads compressing members in parallel (zlib releases the GIL)
+EXPORT_WORKERS = min(4, os.cpu_count() or 1)
+
+# GitHub import: API base (overridable for GitHub Enterprise / tests) and how
+# much of a zipball download is held in memory before spooling to a temp file
+GITHUB_API_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com")
+GITHUB_SPOOL_MEMORY_BYTES = 8 * 1024 * 1024
+
+# Background jobs (?async=1 uploads/imports): "thread" runs them on an
+# in-process pool of JOB_WORKERS; "inline" runs them inside the request
+JOB_RUNNER = "thread"
+JOB_WORKERS = 2
+JOB_SPOOL_DIR = MEDIA_ROOT / "job-spool"
+# Spooled uploads older than this belong to no live job and are swept
+JOB_SPOOL_MAX_AGE_SECONDS = 24 * 3600
+
+# Parallel zip ingest: reader threads inflating/decoding members (1 = serial)
+# and how much decoded text (characters) may wait for the DB writer
+INGEST_WORKERS = min(4, os.cpu_count() or 1)
+INGEST_QUEUE_BYTES = 32 * 1024 * 1024
+
+# Resumable uploads: where partial files live, total and per-chunk size caps,
+# and how long an idle upload is kept before it is abandoned
+UPLOAD_DIR = MEDIA_ROOT / "uploads"
+UPLOAD_MAX_BYTES = 4 * 1024 * 1024 * 1024
+UPLOAD_MAX_CHUNK_BYTES = 64 * 1024 * 1024
+UPLOAD_ABANDON_SECONDS = 24 * 3600
+
+# Finished export zips, one per (project, content version, compression, level)
+EXPORT_CACHE_DIR = MEDIA_ROOT / "export-cache"
+
+# Write-behind for file PUTs (autosave): saves are buffered in memory and
+# written once a file is idle for _IDLE seconds or waited _INTERVAL seconds.
+# The buffer is per process: other workers read the stored row meanwhile, so
+# enable it only with a single web worker
+FILE_WRITE_BEHIND = False
+FILE_WRITE_BEHIND_INTERVAL = 10.0
+FILE_WRITE_BEHIND_IDLE = 2.0